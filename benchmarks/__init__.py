@@ -0,0 +1 @@
+# deixa a pasta benchmarks tratada como pacote
@@ -0,0 +1,121 @@
+"""
+Mede a latência da busca de títulos (buscar_titulos) nos índices FTS5
+mantidos pelos gatilhos do banco, com títulos sintéticos de palavras
+acentuadas: título completo, título com a última palavra incompleta (busca
+enquanto se digita), título digitado sem acentos e título com um erro de
+digitação (busca aproximada). Informa a mediana e o percentil 95 de cada
+tipo de consulta e em quantas o título procurado aparece entre os
+resultados.
+
+Usa um banco temporário.
+
+Execução (na pasta raiz do projeto):
+    python -m benchmarks.bench_busca [quantidade_de_titulos]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.database import criar_engine, criar_tabelas, normalizar_titulo, salvar_catalogo_em_lote
+from src.models import Catalog
+from src.search import buscar_titulos
+
+CONSOANTES = ['', 'b', 'c', 'ch', 'd', 'f', 'g', 'j', 'l', 'lh', 'm', 'n', 'nh', 'p', 'qu',
+              'r', 'rr', 's', 'ss', 't', 'v', 'x', 'z', 'br', 'cr', 'pl', 'tr']
+VOGAIS = ['a', 'e', 'i', 'o', 'u', 'á', 'é', 'í', 'ó', 'ú', 'ã', 'õ', 'ê', 'ô', 'ão', 'ei', 'ou']
+N_CONSULTAS = 200
+
+
+def medir(funcao):
+    """
+    Executa uma função uma vez e devolve o tempo gasto e o resultado.
+
+    Parâmetros:
+        funcao (callable): Função sem parâmetros a ser medida.
+
+    Retorno:
+        tuple: (tempo_em_segundos, resultado).
+    """
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+def criar_catalogo_sintetico(n_titulos):
+    # Vocabulário de palavras de 1 a 4 sílabas, usadas com frequência de Zipf
+    gerador = np.random.default_rng(42)
+    silabas = [consoante + vogal for consoante in CONSOANTES for vogal in VOGAIS]
+    vocabulario = sorted({''.join(gerador.choice(silabas, gerador.integers(1, 5)))
+                          for _ in range(100_000)})
+    pesos = 1 / np.arange(1, len(vocabulario) + 1)
+    palavras = gerador.choice(vocabulario, size=n_titulos * 5, p=pesos / pesos.sum())
+    tamanhos = gerador.integers(1, 6, n_titulos)
+
+    catalog, vistos, posicao = Catalog(), set(), 0
+    for i, tamanho in enumerate(tamanhos):
+        titulo = ' '.join(palavras[posicao:posicao + tamanho]).capitalize()
+        posicao += tamanho
+        if titulo in vistos:
+            continue
+        vistos.add(titulo)
+        if i % 4:
+            catalog.adicionar_movie(titulo, 1950 + i % 75, 7.0, f'tt{i:08d}')
+        else:
+            catalog.adicionar_series(titulo, 1950 + i % 75, 1, 10, f'tt{i:08d}')
+    return catalog
+
+
+def com_erro(titulo, aleatorio):
+    # Troca uma letra da palavra mais longa do título (erro de digitação)
+    palavras = titulo.split()
+    k = max(range(len(palavras)), key=lambda i: len(palavras[i]))
+    palavra = palavras[k]
+    i = aleatorio.randrange(1, len(palavra))
+    palavras[k] = palavra[:i] + ('x' if palavra[i] != 'x' else 'y') + palavra[i + 1:]
+    return ' '.join(palavras)
+
+
+def main():
+    n_titulos = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    catalog = criar_catalogo_sintetico(n_titulos)
+    aleatorio = random.Random(42)
+    # Títulos de pelo menos duas palavras com uma palavra de 6+ letras
+    procurados = aleatorio.sample([item.title for item in catalog
+                                   if len(item.title.split()) >= 2
+                                   and max(map(len, item.title.split())) >= 6], N_CONSULTAS)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        db_url = f'sqlite:///{os.path.join(pasta, "bench.db")}'
+        engine = criar_engine(db_url)
+        criar_tabelas(engine)
+        tempo_gravacao, _ = medir(lambda: salvar_catalogo_em_lote(catalog, engine, tamanho_lote=5000))
+        tamanho_mb = os.path.getsize(os.path.join(pasta, 'bench.db')) / 1024 / 1024
+
+        consultas = {
+            'título completo': lambda t: t,
+            'última palavra incompleta': lambda t: t[:-2] if len(t.split()[-1]) > 3 else t,
+            'sem acentos': normalizar_titulo,
+            'erro de digitação': lambda t: com_erro(normalizar_titulo(t), aleatorio),
+        }
+        print(f'Títulos: {len(catalog)} (gravação com gatilhos: {tempo_gravacao:.1f} s, '
+              f'banco: {tamanho_mb:.0f} MB)')
+        for nome, transformar in consultas.items():
+            tempos, acertos = [], 0
+            for titulo in procurados:
+                consulta = transformar(titulo)
+                tempo, resultados = medir(lambda: buscar_titulos(consulta, db_url))
+                tempos.append(tempo * 1000)
+                acertos += any(r['title'] == titulo for r in resultados)
+            print(f'{nome:26s} mediana {np.percentile(tempos, 50):7.2f} ms   '
+                  f'p95 {np.percentile(tempos, 95):7.2f} ms   '
+                  f'encontrado em {acertos / len(procurados):6.1%}')
+            if nome in ('título completo', 'sem acentos'):
+                assert acertos == len(procurados), f'{nome}: título procurado fora dos resultados'
+
+
+if __name__ == '__main__':
+    main()
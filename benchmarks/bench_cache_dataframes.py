@@ -0,0 +1,73 @@
+"""
+Compara a carga da tabela 'movies' direto do banco (pd.read_sql) com a
+carga pelo cache de DataFrames em Arrow IPC (CacheDataFrames), a frio
+(arquivo ainda inexistente) e a quente (arquivo mapeado em memória).
+
+Usa um banco temporário com filmes sintéticos. Requer o pyarrow.
+
+Execução (na pasta raiz do projeto):
+    python -m benchmarks.bench_cache_dataframes [quantidade_de_filmes]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.analysis import CacheDataFrames, carregar_dataframe_movies
+from src.database import criar_engine, criar_tabelas, salvar_catalogo_em_lote
+from src.models import Catalog
+
+
+def medir(funcao):
+    """
+    Executa uma função uma vez e devolve o tempo gasto e o resultado.
+
+    Parâmetros:
+        funcao (callable): Função sem parâmetros a ser medida.
+
+    Retorno:
+        tuple: (tempo_em_segundos, resultado).
+    """
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    n_filmes = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    with tempfile.TemporaryDirectory() as pasta:
+        db_url = f'sqlite:///{os.path.join(pasta, "bench.db")}'
+        engine = criar_engine(db_url)
+        criar_tabelas(engine)
+
+        gerador = np.random.default_rng(42)
+        catalog = Catalog()
+        for i, (ano, nota) in enumerate(zip(gerador.integers(1920, 2025, n_filmes),
+                                            np.round(gerador.uniform(1.0, 10.0, n_filmes), 1))):
+            catalog.adicionar_movie(f'Filme {i}', int(ano), float(nota), f'tt{i:07d}')
+        salvar_catalogo_em_lote(catalog, engine, tamanho_lote=5000)
+
+        cache = CacheDataFrames(pasta=os.path.join(pasta, 'cache'))
+        tempo_sql, df_sql = medir(lambda: carregar_dataframe_movies(db_url))
+        tempo_frio, _ = medir(lambda: carregar_dataframe_movies(db_url, cache=cache))
+        tempo_quente, df_cache = medir(lambda: carregar_dataframe_movies(db_url, cache=cache))
+        assert cache.estatisticas == {'acertos': 1, 'faltas': 1}
+        # Com ou sem o cache, o mesmo DataFrame (tipos compactos só no arquivo)
+        pd.testing.assert_frame_equal(df_cache, df_sql)
+        tamanho_arquivo = os.path.getsize(os.path.join(cache.pasta, 'movies.arrow'))
+
+        print(f'Filmes: {n_filmes}')
+        print(f'Carga direto do banco:        {tempo_sql:8.3f} s')
+        print(f'Carga pelo cache (a frio):    {tempo_frio:8.3f} s')
+        print(f'Carga pelo cache (a quente):  {tempo_quente:8.3f} s '
+              f'({tempo_sql / tempo_quente:.0f}x)')
+        print(f'Memória do DataFrame:         {df_sql.memory_usage(deep=True).sum() / 1e6:8.1f} MB')
+        print(f'Arquivo do cache (compacto):  {tamanho_arquivo / 1e6:8.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
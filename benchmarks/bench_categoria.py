@@ -0,0 +1,66 @@
+"""
+Compara a classificação textual das notas linha a linha (apply com
+obter_categoria_textual) com a versão vetorizada (classificar_notas).
+
+Execução (na pasta raiz do projeto):
+    python -m benchmarks.bench_categoria [quantidade_de_linhas]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.analysis import classificar_notas, obter_categoria_textual, resumo_categoria_ano
+
+
+def medir(funcao, repeticoes = 3):
+    """
+    Executa uma função algumas vezes e devolve o menor tempo e o último resultado.
+
+    Parâmetros:
+        funcao (callable): Função sem parâmetros a ser medida.
+        repeticoes (int, opcional): Quantidade de execuções. Padrão: 3.
+
+    Retorno:
+        tuple: (melhor_tempo_em_segundos, resultado).
+    """
+    melhor = float('inf')
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    n_linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    gerador = np.random.default_rng(42)
+    df = pd.DataFrame({
+        'rating': np.round(gerador.uniform(1.0, 10.0, n_linhas), 1),
+        'year': gerador.integers(1920, 2025, n_linhas),
+    })
+
+    tempo_apply, categorias_apply = medir(lambda: df['rating'].apply(obter_categoria_textual), 1)
+    tempo_vetorizado, categorias_vetorizadas = medir(lambda: classificar_notas(df['rating']))
+
+    # As duas classificações precisam ser idênticas
+    assert (categorias_vetorizadas.astype(str) == categorias_apply).all()
+
+    tempo_resumo_obj, _ = medir(lambda: resumo_categoria_ano(df.assign(categoria=categorias_apply)))
+    tempo_resumo_cat, _ = medir(lambda: resumo_categoria_ano(df.assign(categoria=categorias_vetorizadas)))
+
+    print(f'Linhas: {n_linhas}')
+    print(f'Classificação com apply:        {tempo_apply:8.3f} s')
+    print(f'Classificação vetorizada:       {tempo_vetorizado:8.3f} s '
+          f'({tempo_apply / tempo_vetorizado:.0f}x)')
+    print(f'Memória da coluna (object):     {categorias_apply.memory_usage(deep=True) / 1e6:8.1f} MB')
+    print(f'Memória da coluna (categorica): {categorias_vetorizadas.memory_usage(deep=True) / 1e6:8.1f} MB')
+    print(f'Resumo categoria x ano (object):     {tempo_resumo_obj:8.3f} s')
+    print(f'Resumo categoria x ano (categorica): {tempo_resumo_cat:8.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Compara o caminho padrão da análise (SQLite + Pandas) com o backend
+DuckDB (src/analysis_duckdb.py) na consulta do Ex. 8, na classificação
+das notas do Ex. 9 (tabela inteira) e no resumo por categoria e ano do
+Ex. 10, lendo o banco SQLite e os arquivos Parquet da exportação, e
+confere que os resultados são idênticos.
+
+Usa um banco temporário com filmes sintéticos. Exige o duckdb e o pyarrow.
+
+Execução (na pasta raiz do projeto):
+    python -m benchmarks.bench_duckdb [quantidade_de_filmes] [threads_do_duckdb]
+"""
+import os
+import sys
+import tempfile
+
+import pandas as pd
+from sqlalchemy import DateTime
+
+from benchmarks.bench_resumo_materializado import criar_catalogo_sintetico, medir
+from src.analysis import (
+    adicionar_categoria,
+    carregar_dataframe_movies,
+    carregar_dataframe_series,
+    compactar_tipos,
+    consultar_movies,
+    resumo_categoria_ano,
+    FAIXAS_CATEGORIA_PADRAO,
+)
+from src.analysis_duckdb import AnaliseDuckDB
+from src.database import criar_engine, criar_tabelas, descartar_engines, salvar_catalogo_em_lote, MovieDB
+
+# Consulta do Ex. 8 (ver etapa_analyze)
+CONSULTA_EX8 = {'nota_min': 9.0, 'nota_min_inclusiva': False, 'ordenar_por': ['-rating', 'id'], 'limite': 5}
+
+
+def conferir(esperado, obtido, descricao):
+    # Mesmos valores, com colunas Arrow de um lado e numpy / object do outro.
+    # Datas: conforme o caminho, chegam como texto (pd.read_sql de um SELECT
+    # em texto, e o Parquet gravado a partir dele), datetime ou timestamp
+    datas = [coluna.name for coluna in MovieDB.__table__.columns
+             if isinstance(coluna.type, DateTime) and coluna.name in obtido.columns]
+
+    def normalizar(df):
+        df = df.reset_index(drop=True)
+        df = df.assign(**{nome: pd.to_datetime(df[nome], format='ISO8601').astype('datetime64[us]')
+                          for nome in datas}).astype(object)
+        return df.where(df.notna(), None)
+
+    try:
+        pd.testing.assert_frame_equal(normalizar(esperado), normalizar(obtido), check_dtype=False)
+    except AssertionError as erro:
+        raise AssertionError(f'{descricao}: resultados diferentes\n{erro}') from None
+
+
+def main():
+    n_filmes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'bench.db')
+        db_url = f'sqlite:///{caminho}'
+        engine = criar_engine(db_url)
+        criar_tabelas(engine)
+        salvar_catalogo_em_lote(criar_catalogo_sintetico(n_filmes), engine, tamanho_lote=5000)
+
+        # Caminho padrão: Ex. 8 no SQLite, Ex. 9 e 10 no Pandas sobre a tabela inteira
+        t_ex8, ex8 = medir(lambda: consultar_movies(db_url, **CONSULTA_EX8))
+        t_carga, df_movies = medir(lambda: carregar_dataframe_movies(db_url))
+        t_ex9, ex9 = medir(lambda: adicionar_categoria(df_movies.copy()))
+        # Resumo com os tipos compactos, como no resumo materializado (anos
+        # em Int16 nas colunas)
+        t_ex10, ex10 = medir(lambda: resumo_categoria_ano(adicionar_categoria(compactar_tipos(df_movies))))
+
+        # Parquet com os tipos de carregar_dataframe_movies, como na exportação
+        df_movies.to_parquet(os.path.join(pasta, 'movies.parquet'), index=False)
+        carregar_dataframe_series(db_url).to_parquet(os.path.join(pasta, 'series.parquet'), index=False)
+        descartar_engines()
+
+        print(f'Filmes: {n_filmes} | threads do DuckDB: {threads or "padrão (uma por núcleo)"}')
+        print(f'{"":28}{"Ex. 8":>10}{"Ex. 9":>10}{"Ex. 10":>10}')
+        print(f'{"SQLite + Pandas":28}{t_ex8:10.3f}{t_carga + t_ex9:10.3f}{t_carga + t_ex10:10.3f}'
+              f'   (carga da tabela: {t_carga:.3f} s)')
+
+        for fonte in ('sqlite', 'parquet'):
+            with AnaliseDuckDB(caminho, fonte=fonte, pasta_parquet=pasta, threads=threads) as analise:
+                d_ex8, resultado_ex8 = medir(lambda: analise.consultar_movies(**CONSULTA_EX8))
+                d_ex9, resultado_ex9 = medir(lambda: analise.consultar_movies(
+                    ordenar_por=['id'], faixas_categoria=FAIXAS_CATEGORIA_PADRAO
+                ))
+                d_ex10, resultado_ex10 = medir(lambda: analise.resumo_categoria_ano())
+
+            conferir(ex8, resultado_ex8, f'Ex. 8 ({fonte})')
+            conferir(ex9, resultado_ex9, f'Ex. 9 ({fonte})')
+            pd.testing.assert_frame_equal(ex10, resultado_ex10)
+            print(f'{"DuckDB (" + fonte + ")":28}{d_ex8:10.3f}{d_ex9:10.3f}{d_ex10:10.3f}')
+        print('Resultados idênticos: sim')
+
+
+if __name__ == '__main__':
+    main()
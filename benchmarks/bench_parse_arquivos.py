@@ -0,0 +1,55 @@
+"""
+Mede a extração de títulos de muitas páginas de ranking salvas em disco
+(extrair_rankings_arquivos) com 1, 2, 4... processos, até a quantidade
+de núcleos da máquina.
+
+As páginas são sintéticas, sem o JSON '__NEXT_DATA__', para exercitar
+o caminho mais pesado (BeautifulSoup percorrendo as tags da lista).
+
+Execução (na pasta raiz do projeto):
+    python -m benchmarks.bench_parse_arquivos [quantidade_de_paginas] [max_processos]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.paginas import gerar_pagina_ranking
+from src.scraping import extrair_rankings_arquivos
+
+
+def main():
+    n_paginas = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    max_processos = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for numero in range(n_paginas):
+            with open(os.path.join(pasta, f'ranking_{numero:05d}.html'), 'w', encoding='utf-8') as arquivo:
+                arquivo.write(gerar_pagina_ranking(numero))
+
+        quantidades = []
+        processos = 1
+        while processos < max_processos:
+            quantidades.append(processos)
+            processos *= 2
+        quantidades.append(max_processos)
+
+        print(f'Páginas: {n_paginas} | núcleos da máquina: {os.cpu_count()}')
+        referencia = tempo_um = None
+        for processos in quantidades:
+            inicio = time.perf_counter()
+            resultados = extrair_rankings_arquivos(pasta, max_workers=processos)
+            tempo = time.perf_counter() - inicio
+
+            # Mesma saída, na mesma ordem, para qualquer quantidade de processos
+            assert all(erro is None for _, _, erro in resultados)
+            if referencia is None:
+                referencia, tempo_um = resultados, tempo
+            assert resultados == referencia
+
+            print(f'{processos:3d} processo(s): {tempo:7.2f} s | '
+                  f'{n_paginas / tempo:7.1f} páginas/s | {tempo_um / tempo:4.1f}x')
+
+
+if __name__ == '__main__':
+    main()
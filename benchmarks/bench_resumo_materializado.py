@@ -0,0 +1,118 @@
+"""
+Compara o resumo de filmes por categoria e ano (Ex. 10) calculado com
+Pandas a partir da tabela 'movies' inteira com o lido da tabela
+'movies_resumo', mantida pelos gatilhos do banco, e confere que os dois
+são idênticos (verificar_resumo_materializado). Mede também o custo dos
+gatilhos na gravação em lote.
+
+Usa bancos temporários com filmes sintéticos.
+
+Execução (na pasta raiz do projeto):
+    python -m benchmarks.bench_resumo_materializado [quantidade_de_filmes]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from src.analysis import (
+    adicionar_categoria,
+    carregar_dataframe_movies,
+    compactar_tipos,
+    resumo_categoria_ano,
+    resumo_categoria_ano_materializado,
+)
+from src.database import GATILHOS_RESUMO_MOVIES, criar_engine, criar_tabelas, salvar_catalogo_em_lote
+from src.models import Catalog
+
+
+def medir(funcao):
+    """
+    Executa uma função uma vez e devolve o tempo gasto e o resultado.
+
+    Parâmetros:
+        funcao (callable): Função sem parâmetros a ser medida.
+
+    Retorno:
+        tuple: (tempo_em_segundos, resultado).
+    """
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+def verificar_resumo_materializado(db_url, faixas = None):
+    """
+    Confere o resumo lido de 'movies_resumo' com o calculado com Pandas
+    a partir da tabela 'movies' inteira (com os tipos compactos).
+
+    Parâmetros:
+        db_url (str): URL de conexão com o banco.
+        faixas (dict, opcional): Faixas de classificação (ver validar_faixas).
+
+    Retorno:
+        pandas.DataFrame: O resumo (idêntico nos dois caminhos).
+
+    Exceções:
+        ValueError: Se os dois resumos forem diferentes (com as diferenças
+        na mensagem).
+    """
+    materializado = resumo_categoria_ano_materializado(db_url, faixas)
+    df_movies = compactar_tipos(carregar_dataframe_movies(db_url))
+    calculado = resumo_categoria_ano(adicionar_categoria(df_movies, faixas))
+    try:
+        pd.testing.assert_frame_equal(materializado, calculado)
+    except AssertionError as erro:
+        raise ValueError(f'Resumo materializado diferente do calculado com Pandas:\n{erro}') from None
+    return materializado
+
+
+def criar_catalogo_sintetico(n_filmes):
+    gerador = np.random.default_rng(42)
+    catalog = Catalog()
+    for i, (ano, nota) in enumerate(zip(gerador.integers(1920, 2025, n_filmes),
+                                        np.round(gerador.uniform(1.0, 10.0, n_filmes), 1))):
+        catalog.adicionar_movie(f'Filme {i}', int(ano), float(nota), f'tt{i:07d}')
+    return catalog
+
+
+def main():
+    n_filmes = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    catalog = criar_catalogo_sintetico(n_filmes)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        # Gravação sem os gatilhos (referência) e com os gatilhos
+        engine_sem = criar_engine(f'sqlite:///{os.path.join(pasta, "sem_gatilhos.db")}')
+        criar_tabelas(engine_sem)
+        with engine_sem.begin() as conexao:
+            for nome in GATILHOS_RESUMO_MOVIES:
+                conexao.execute(text(f'DROP TRIGGER {nome}'))
+        tempo_sem, _ = medir(lambda: salvar_catalogo_em_lote(catalog, engine_sem, tamanho_lote=5000))
+
+        db_url = f'sqlite:///{os.path.join(pasta, "bench.db")}'
+        engine = criar_engine(db_url)
+        criar_tabelas(engine)
+        tempo_com, _ = medir(lambda: salvar_catalogo_em_lote(catalog, engine, tamanho_lote=5000))
+
+        tempo_pandas, _ = medir(lambda: resumo_categoria_ano(
+            adicionar_categoria(compactar_tipos(carregar_dataframe_movies(db_url)))
+        ))
+        tempo_materializado, _ = medir(lambda: resumo_categoria_ano_materializado(db_url))
+        verificar_resumo_materializado(db_url)
+
+        print(f'Filmes: {n_filmes}')
+        print(f'Gravação sem gatilhos:          {tempo_sem:8.3f} s')
+        print(f'Gravação com gatilhos:          {tempo_com:8.3f} s '
+              f'(+{(tempo_com / tempo_sem - 1) * 100:.0f}%)')
+        print(f'Resumo com Pandas (tabela toda): {tempo_pandas:8.3f} s')
+        print(f'Resumo materializado:            {tempo_materializado:8.3f} s '
+              f'({tempo_pandas / tempo_materializado:.0f}x)')
+        print('Resumos idênticos: sim')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Teste de carga do serviço do catálogo (src/service.py): 'concorrencia'
+clientes com conexões persistentes fazem, juntos, 'requisicoes'
+requisições com uma mistura de rotas (títulos pelo id, listas filtradas,
+o resumo por categoria e ano e séries), aceitando gzip e repetindo o ETag
+recebido ('If-None-Match') em parte delas. Informa requisições por
+segundo, a latência p50 / p99 e, ao fim, os contadores do cache do serviço.
+
+Sem URL, sobe o serviço em outro processo, com um banco temporário de
+filmes sintéticos; com URL, mede um serviço já em execução.
+
+Execução (na pasta raiz do projeto):
+    python -m benchmarks.bench_servico [concorrencia] [requisicoes] [url_do_servico]
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+
+from src.database import criar_engine, criar_tabelas, descartar_engines, salvar_catalogo_em_lote
+from src.models import Catalog
+
+N_FILMES = 100_000
+
+
+def criar_banco_sintetico(caminho, n_filmes):
+    gerador = np.random.default_rng(42)
+    catalog = Catalog()
+    for i, (ano, nota) in enumerate(zip(gerador.integers(1920, 2025, n_filmes),
+                                        np.round(gerador.uniform(1.0, 10.0, n_filmes), 1))):
+        catalog.adicionar_movie(f'Filme {i}', int(ano), float(nota), f'tt{i:07d}')
+    for i in range(n_filmes // 10):
+        catalog.adicionar_series(f'Série {i}', 1950 + i % 75, 1 + i % 9, 10 + i % 90, f'tt{n_filmes + i:07d}')
+    engine = criar_engine(f'sqlite:///{caminho}')
+    criar_tabelas(engine)
+    salvar_catalogo_em_lote(catalog, engine, tamanho_lote=5000)
+    descartar_engines()
+
+
+def sortear_caminho(aleatorio, n_filmes):
+    # Mistura de rotas: ids em toda a tabela (muitas faltas no cache) e
+    # listas com poucos filtros diferentes (muitos acertos)
+    sorteio = aleatorio.random()
+    if sorteio < 0.4:
+        return f'/movies/{aleatorio.randint(1, n_filmes)}'
+    if sorteio < 0.75:
+        nota = aleatorio.choice([6, 7, 8, 9])
+        ano = aleatorio.randrange(1920, 2025, 5)
+        return f'/movies?nota_min={nota}&ano_min={ano}&ano_max={ano + 4}&ordem=-rating&limite=50'
+    if sorteio < 0.9:
+        return '/resumo'
+    return f'/series?limite=20&deslocamento={aleatorio.randrange(0, 200, 20)}'
+
+
+async def requisitar(leitor, escritor, host, caminho, etag = None):
+    # Uma requisição GET na conexão aberta: (status, ETag, tamanho do corpo)
+    linhas = [f'GET {caminho} HTTP/1.1', f'Host: {host}', 'Accept-Encoding: gzip']
+    if etag:
+        linhas.append(f'If-None-Match: {etag}')
+    escritor.write(('\r\n'.join(linhas) + '\r\n\r\n').encode('latin-1'))
+    await escritor.drain()
+
+    status = int((await leitor.readline()).split()[1])
+    cabecalhos = {}
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b''):
+            break
+        nome, _, valor = linha.decode('latin-1').partition(':')
+        cabecalhos[nome.strip().lower()] = valor.strip()
+    corpo = await leitor.readexactly(int(cabecalhos.get('content-length', 0)))
+    return status, cabecalhos.get('etag'), len(corpo)
+
+
+async def cliente(host, porta, caminhos, latencias, status, etags, aleatorio):
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    try:
+        while caminhos:
+            caminho = caminhos.pop()
+            # Em 30% das repetições, o cliente envia o ETag que já tem
+            etag = etags.get(caminho) if aleatorio.random() < 0.3 else None
+            inicio = time.perf_counter()
+            codigo, etag_recebido, _ = await requisitar(leitor, escritor, host, caminho, etag)
+            latencias.append(time.perf_counter() - inicio)
+            status[codigo] = status.get(codigo, 0) + 1
+            if etag_recebido:
+                etags[caminho] = etag_recebido
+    finally:
+        escritor.close()
+
+
+async def carga(host, porta, concorrencia, n_requisicoes, n_filmes):
+    aleatorio = random.Random(42)
+    caminhos = [sortear_caminho(aleatorio, n_filmes) for _ in range(n_requisicoes)]
+    latencias, status, etags = [], {}, {}
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(host, porta, caminhos, latencias, status, etags, random.Random(i))
+                           for i in range(concorrencia)))
+    return time.perf_counter() - inicio, latencias, status
+
+
+def porta_livre():
+    with socket.socket() as soquete:
+        soquete.bind(('127.0.0.1', 0))
+        return soquete.getsockname()[1]
+
+
+def aguardar_servico(url, tempo_maximo = 30):
+    limite = time.monotonic() + tempo_maximo
+    while True:
+        try:
+            with urllib.request.urlopen(url + '/saude') as resposta:
+                return json.load(resposta)
+        except OSError:
+            if time.monotonic() > limite:
+                raise
+            time.sleep(0.2)
+
+
+def medir(url, concorrencia, n_requisicoes, n_filmes):
+    host, porta = url.removeprefix('http://').rstrip('/').split(':')
+    segundos, latencias, status = asyncio.run(carga(host, int(porta), concorrencia, n_requisicoes, n_filmes))
+    assert set(status) <= {200, 304}, f'Status inesperados: {status}'
+    latencias_ms = np.array(latencias) * 1000
+    print(f'Concorrência: {concorrencia} | requisições: {n_requisicoes} | status: {status}')
+    print(f'{n_requisicoes / segundos:8.0f} requisições/s   '
+          f'p50 {np.percentile(latencias_ms, 50):7.2f} ms   p99 {np.percentile(latencias_ms, 99):7.2f} ms')
+    saude = aguardar_servico(url)
+    acessos = saude['acertos_cache'] + saude['faltas_cache']
+    print(f'Cache do serviço: {saude["acertos_cache"]} acertos em {acessos} '
+          f'({saude["acertos_cache"] / max(acessos, 1):.0%}), {saude["nao_modificadas"]} respostas 304')
+
+
+def main():
+    concorrencia = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    n_requisicoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    if len(sys.argv) > 3:
+        aguardar_servico(sys.argv[3])
+        medir(sys.argv[3], concorrencia, n_requisicoes, N_FILMES)
+        return
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'bench.db')
+        criar_banco_sintetico(caminho, N_FILMES)
+        porta = porta_livre()
+        processo = subprocess.Popen(
+            [sys.executable, '-m', 'src.service', '--config', os.path.join(pasta, 'sem_config.json'),
+             '--banco', caminho, '--porta', str(porta)],
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            url = f'http://127.0.0.1:{porta}'
+            aguardar_servico(url)
+            medir(url, concorrencia, n_requisicoes, N_FILMES)
+        finally:
+            processo.terminate()
+            processo.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Compara a carga em etapas (todas as páginas extraídas, depois o catálogo
+inteiro, depois a gravação) com a carga em streaming (src/streaming.py),
+em que extração, catálogo e gravação rodam ligados por filas limitadas e
+cada página segue para o banco enquanto a próxima é extraída. Mede o
+tempo e, em uma execução a mais, o pico de memória alocada pelo Python
+(tracemalloc), mostra a ocupação e as esperas das filas e confere que os
+bancos ficam idênticos.
+
+Em seguida, faz o mesmo com a leitura dos datasets do IMDb
+(ingestion.ingerir_datasets) sem fila e com fila, em arquivos .tsv.gz
+sintéticos.
+
+Execução (na pasta raiz do projeto):
+    python -m benchmarks.bench_streaming [quantidade_de_paginas] [titulos_por_pagina] [tamanho_fila]
+"""
+import gzip
+import os
+import sqlite3
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.bench_resumo_materializado import medir
+from benchmarks.paginas import gerar_pagina_ranking
+from src.database import (
+    criar_engine,
+    criar_tabelas,
+    descartar_engines,
+    salvar_catalogo_em_lote,
+    salvar_catalogos_em_lote,
+)
+from src.ingestion import ingerir_datasets
+from src.models import criar_catalogo, gerar_catalogos
+from src.scraping import extrair_filmes_html
+from src.streaming import em_fila
+
+TAMANHO_LOTE = 500
+
+# Títulos nos datasets sintéticos
+N_TITULOS_DATASET = 200_000
+
+
+def medir_memoria(funcao):
+    # Pico de memória alocada em MB (em uma execução à parte: com o
+    # tracemalloc ativo, a execução fica bem mais lenta)
+    tracemalloc.start()
+    try:
+        funcao()
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+
+
+def banco_vazio(caminho):
+    engine = criar_engine(f'sqlite:///{caminho}')
+    criar_tabelas(engine)
+    return engine
+
+
+def extrair_paginas(caminhos, n_titulos):
+    # Um par ('movie', itens) por página, lida do disco só quando pedida
+    for caminho in caminhos:
+        with open(caminho, 'rb') as arquivo:
+            yield 'movie', extrair_filmes_html(arquivo.read(), n_titulos)
+
+
+def carga_em_etapas(caminhos, n_titulos, engine):
+    lista_filmes = []
+    for _, itens in extrair_paginas(caminhos, n_titulos):
+        lista_filmes.extend(itens)
+    return salvar_catalogo_em_lote(criar_catalogo(lista_filmes), engine, tamanho_lote=TAMANHO_LOTE)
+
+
+def carga_em_streaming(caminhos, n_titulos, engine, tamanho_fila, estatisticas):
+    paginas = em_fila(extrair_paginas(caminhos, n_titulos), tamanho_fila, estatisticas['extração'])
+    catalogos = em_fila(gerar_catalogos(paginas), tamanho_fila, estatisticas['catálogo'])
+    return salvar_catalogos_em_lote(catalogos, engine, tamanho_lote=TAMANHO_LOTE)
+
+
+def linhas_do_banco(caminho):
+    # Todas as colunas, menos 'updated_at' (hora da gravação)
+    with sqlite3.connect(caminho) as conexao:
+        linhas = []
+        for tabela in ('movies', 'series'):
+            colunas = [coluna for _, coluna, *_ in conexao.execute(f'PRAGMA table_info({tabela})')
+                       if coluna != 'updated_at']
+            linhas.append(conexao.execute(f'SELECT {", ".join(colunas)} FROM {tabela} ORDER BY id').fetchall())
+        return linhas
+
+
+def criar_datasets(pasta, n_titulos):
+    # title.basics e title.ratings ordenados por tconst, como os do IMDb
+    caminho_basics = os.path.join(pasta, 'title.basics.tsv.gz')
+    caminho_ratings = os.path.join(pasta, 'title.ratings.tsv.gz')
+    with gzip.open(caminho_basics, 'wt', encoding='utf-8') as basics, \
+            gzip.open(caminho_ratings, 'wt', encoding='utf-8') as ratings:
+        basics.write('tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\tstartYear\t'
+                     'endYear\truntimeMinutes\tgenres\n')
+        ratings.write('tconst\taverageRating\tnumVotes\n')
+        for i in range(1, n_titulos + 1):
+            tipo = ('movie', 'movie', 'tvSeries', 'short')[i % 4]
+            basics.write(f'tt{i:07d}\t{tipo}\tTítulo {i}\tTítulo {i}\t0\t{1920 + i % 105}\t\\N\t'
+                         f'{60 + i % 120}\tDrama,Comedy\n')
+            if i % 3:
+                ratings.write(f'tt{i:07d}\t{1 + i % 90 / 10:.1f}\t{i * 7 % 100_000}\n')
+    return caminho_basics, caminho_ratings
+
+
+def main():
+    n_paginas = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_titulos = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    tamanho_fila = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminhos = []
+        for numero in range(n_paginas):
+            caminho = os.path.join(pasta, f'ranking_{numero:05d}.html')
+            with open(caminho, 'w', encoding='utf-8') as arquivo:
+                arquivo.write(gerar_pagina_ranking(numero, n_titulos, com_json=True))
+            caminhos.append(caminho)
+
+        print(f'Páginas: {n_paginas} | títulos por página: {n_titulos} | tamanho da fila: {tamanho_fila}')
+        bancos = {}
+        estatisticas = {'extração': {}, 'catálogo': {}}
+        cargas = {
+            'etapas': lambda engine, _: carga_em_etapas(caminhos, n_titulos, engine),
+            'streaming': lambda engine, dados: carga_em_streaming(caminhos, n_titulos, engine,
+                                                                  tamanho_fila, dados),
+        }
+        for modo, carga in cargas.items():
+            bancos[modo] = os.path.join(pasta, f'{modo}.db')
+            engine = banco_vazio(bancos[modo])
+            segundos, contagem = medir(lambda: carga(engine, estatisticas))
+            engine = banco_vazio(os.path.join(pasta, f'{modo}_memoria.db'))
+            pico = medir_memoria(lambda: carga(engine, {'extração': {}, 'catálogo': {}}))
+            print(f'{modo:>10}: {segundos:7.2f} s | pico {pico:8.1f} MB | inseridos: {contagem["inseridos"]}')
+        for fila, dados in estatisticas.items():
+            print(f'{"":12}fila da {fila}: {dados["itens"]} itens, até {dados["max_na_fila"]} na fila | '
+                  f'espera: produtor {dados["espera_produtor"]:.2f} s, '
+                  f'consumidor {dados["espera_consumidor"]:.2f} s')
+        descartar_engines()
+        assert linhas_do_banco(bancos['etapas']) == linhas_do_banco(bancos['streaming'])
+        print('Bancos idênticos: sim')
+
+        caminho_basics, caminho_ratings = criar_datasets(pasta, N_TITULOS_DATASET)
+        print(f'\nDatasets: {N_TITULOS_DATASET} títulos')
+        for fila in (0, tamanho_fila):
+            caminho = os.path.join(pasta, f'datasets_{fila}.db')
+            contagem = ingerir_datasets(banco_vazio(caminho), caminho_basics, caminho_ratings, tamanho_fila=fila)
+            print(f'{"sem fila" if not fila else f"fila de {fila}":>10}: {contagem["segundos"]:7.2f} s | '
+                  f'{contagem["linhas_por_segundo"]:9.0f} títulos/s')
+            bancos[fila] = caminho
+        descartar_engines()
+        assert linhas_do_banco(bancos[0]) == linhas_do_banco(bancos[tamanho_fila])
+        print('Bancos idênticos: sim')
+
+
+if __name__ == '__main__':
+    main()
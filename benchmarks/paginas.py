@@ -0,0 +1,173 @@
+"""
+Páginas de ranking do IMDb para os benchmarks, sem acessar a rede:
+
+    - páginas sintéticas de qualquer tamanho (de 250 a 100 mil títulos ou
+      mais), com o JSON '__NEXT_DATA__' (caminho rápido da extração) ou
+      só com as tags da lista (caminho do BeautifulSoup);
+    - páginas gravadas em benchmarks/fixtures (arquivos .html.gz), que
+      podem ser regravadas a partir do IMDb com gravar_fixture.
+
+Cada página sintética acompanha os títulos esperados (itens_ranking), no
+formato devolvido por obter_filmes_top, para conferir a extração.
+"""
+import gzip
+import html
+import json
+import os
+
+from src.arquivos import escrever_atomico
+from src.scraping import baixar_html
+
+# Pasta das páginas gravadas
+PASTA_FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+PALAVRAS = ['Sonho', 'Cidade', 'Noite', 'Último', 'Coração', 'Estrada', 'Céu', 'Ilha',
+            'Guerra', 'Amanhã', 'Segredo', 'Irmão', 'Verão', 'Sombra', 'Mar', 'Pássaro']
+
+
+def itens_ranking(numero_pagina, n_titulos = 250, tipo = 'movie'):
+    """
+    Gera os títulos de uma página de ranking sintética.
+
+    Parâmetros:
+        numero_pagina (int): Usado para variar títulos, anos e notas
+            (páginas diferentes não repetem identificadores).
+        n_titulos (int, opcional): Quantidade de títulos. Padrão: 250.
+        tipo (str, opcional): "movie" ou "series" (séries têm episódios).
+            Padrão: "movie".
+
+    Retorno:
+        list[dict]: Títulos no formato de obter_filmes_top.
+    """
+    itens = []
+    for posicao in range(1, n_titulos + 1):
+        codigo = numero_pagina * 1_000_000 + posicao
+        itens.append({
+            'titulo': f'{PALAVRAS[codigo % 16]} {PALAVRAS[codigo // 16 % 16]} {codigo}',
+            'ano_lancamento': 1920 + codigo % 100,
+            'nota': round(5 + codigo % 50 / 10, 1),
+            'imdb_id': f'tt{codigo:07d}',
+            'votos': 1000 + codigo * 7 % 2_000_000,
+            'duracao_min': 80 + codigo % 90,
+            'episodios': 5 + codigo % 120 if tipo == 'series' else None,
+        })
+    return itens
+
+
+def _html_dom(itens):
+    # Lista no formato das tags do IMDb (a posição aparece antes do título)
+    linhas = []
+    for posicao, item in enumerate(itens, start=1):
+        metadados = [str(item['ano_lancamento'])]
+        if item['episodios'] is not None:
+            metadados.append(f'{item["episodios"]} eps')
+        else:
+            metadados.append(f'{item["duracao_min"] // 60}h {item["duracao_min"] % 60}m')
+        metadados.append('A16')
+        linhas.append(
+            '<li class="ipc-metadata-list-summary-item">'
+            f'<a href="/title/{item["imdb_id"]}/"><h3 class="ipc-title__text">'
+            f'{posicao}. {html.escape(item["titulo"])}</h3></a><div>'
+            + ''.join(f'<span class="cli-title-metadata-item">{texto}</span>' for texto in metadados)
+            + f'</div><span class="ipc-rating-star--rating">{item["nota"]:.1f}</span></li>'
+        )
+    return '<ul class="ipc-metadata-list">' + ''.join(linhas) + '</ul>'
+
+
+def _json_next_data(itens):
+    # Bloco '__NEXT_DATA__' com a mesma estrutura ('chartTitles') da página real
+    arestas = []
+    for item in itens:
+        no = {
+            'id': item['imdb_id'],
+            'titleText': {'text': item['titulo']},
+            'releaseYear': {'year': item['ano_lancamento']},
+            'ratingsSummary': {'aggregateRating': item['nota'], 'voteCount': item['votos']},
+            'runtime': {'seconds': item['duracao_min'] * 60},
+        }
+        if item['episodios'] is not None:
+            no['episodes'] = {'episodes': {'total': item['episodios']}}
+        arestas.append({'node': no})
+    dados = {'props': {'pageProps': {'pageData': {'chartTitles': {'edges': arestas}}}}}
+    return ('<script id="__NEXT_DATA__" type="application/json">'
+            + json.dumps(dados, ensure_ascii=False) + '</script>')
+
+
+def gerar_pagina_ranking(numero_pagina, n_titulos = 250, tipo = 'movie', com_json = False):
+    """
+    Gera o HTML de uma página de ranking no formato da lista do IMDb.
+
+    Parâmetros:
+        numero_pagina (int): Usado para variar títulos, anos e notas.
+        n_titulos (int, opcional): Quantidade de títulos. Padrão: 250.
+        tipo (str, opcional): "movie" ou "series". Padrão: "movie".
+        com_json (bool, opcional): Inclui o JSON '__NEXT_DATA__' (como na
+            página real); sem ele, a extração percorre as tags da lista.
+            Padrão: False.
+
+    Retorno:
+        str: HTML da página.
+    """
+    itens = itens_ranking(numero_pagina, n_titulos, tipo)
+    return (
+        '<html><head><title>Ranking</title></head><body>'
+        + '<div class="cabecalho">' + '<p>texto</p>' * 200 + '</div>'
+        + _html_dom(itens)
+        + (_json_next_data(itens) if com_json else '')
+        + '</body></html>'
+    )
+
+
+def listar_fixtures():
+    """
+    Lista as páginas gravadas em PASTA_FIXTURES.
+
+    Retorno:
+        dict: Nome da página (ex.: 'chart_top') -> caminho do arquivo.
+    """
+    if not os.path.isdir(PASTA_FIXTURES):
+        return {}
+    return {
+        nome[:-len('.html.gz')]: os.path.join(PASTA_FIXTURES, nome)
+        for nome in sorted(os.listdir(PASTA_FIXTURES))
+        if nome.endswith('.html.gz')
+    }
+
+
+def ler_fixture(caminho):
+    """
+    Lê uma página gravada.
+
+    Parâmetros:
+        caminho (str): Arquivo .html.gz.
+
+    Retorno:
+        bytes: HTML da página, descomprimido.
+    """
+    with gzip.open(caminho, 'rb') as arquivo:
+        return arquivo.read()
+
+
+def gravar_fixture(url, nome, cliente = None):
+    """
+    Baixa uma página de ranking e a grava em PASTA_FIXTURES, comprimida.
+
+    Parâmetros:
+        url (str): Endereço da página (ex.: a URL de uma fonte do config.json).
+        nome (str): Nome da página gravada, sem extensão (ex.: 'chart_top').
+        cliente (ClienteHTTP, opcional): Cliente HTTP. Padrão: None.
+
+    Retorno:
+        str: Caminho do arquivo gravado.
+    """
+    conteudo = baixar_html(url, cliente=cliente)
+    os.makedirs(PASTA_FIXTURES, exist_ok=True)
+    caminho = os.path.join(PASTA_FIXTURES, nome + '.html.gz')
+
+    def escrever(temporario):
+        # mtime=0: o mesmo conteúdo gera sempre o mesmo arquivo
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(gzip.compress(conteudo, mtime=0))
+
+    escrever_atomico(caminho, escrever)
+    return caminho
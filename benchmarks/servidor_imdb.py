@@ -0,0 +1,240 @@
+"""
+Servidor HTTP local que faz o papel do IMDb nos benchmarks.
+
+Serve as páginas gravadas em benchmarks/fixtures (ex.: 'chart_top.html.gz'
+em '/chart/top/') e páginas sintéticas de qualquer tamanho em
+'/sintetico/<movie|series>/<quantidade>/' (com o JSON '__NEXT_DATA__') ou
+'/sintetico/<movie|series>/<quantidade>/dom/' (só as tags da lista), com
+latência e falhas configuráveis. Responde com gzip quando o cliente aceita
+e com 304 a requisições condicionais ('If-None-Match'), como o IMDb.
+
+Execução (na pasta raiz do projeto), para apontar o config.json para ele:
+    python -m benchmarks.servidor_imdb [--porta 8000] [--latencia 0.2] [--falhas 0.1]
+
+Para regravar uma página do IMDb em benchmarks/fixtures:
+    python -m benchmarks.servidor_imdb --gravar chart_top https://www.imdb.com/pt/chart/top/
+"""
+import argparse
+import functools
+import gzip
+import hashlib
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.paginas import gerar_pagina_ranking, gravar_fixture, ler_fixture, listar_fixtures
+
+# Caminho das páginas sintéticas: tipo, quantidade de títulos e, opcionalmente, 'dom'
+PADRAO_SINTETICO = re.compile(r'^/sintetico/(movie|series)/(\d+)/(dom/)?$')
+
+
+def rota_fixture(nome):
+    # 'chart_top' -> '/chart/top/'
+    return '/' + nome.replace('_', '/') + '/'
+
+
+@functools.lru_cache(maxsize=16)
+def pagina_sintetica(tipo, n_titulos, com_json):
+    # Página pronta para envio: (corpo, corpo em gzip, ETag)
+    return preparar_pagina(gerar_pagina_ranking(0, n_titulos, tipo, com_json).encode('utf-8'))
+
+
+def preparar_pagina(corpo):
+    etag = '"' + hashlib.sha1(corpo).hexdigest()[:16] + '"'
+    return corpo, gzip.compress(corpo, compresslevel=6, mtime=0), etag
+
+
+class ServidorIMDb:
+    """
+    Servidor HTTP local, em uma thread, que imita as páginas de ranking do IMDb.
+
+    A cada requisição, o servidor espera 'latencia' segundos (mais uma
+    variação aleatória de até 'variacao' segundos) e, com probabilidade
+    'taxa_falhas', responde 503 em vez da página; com probabilidade
+    'taxa_quedas', fecha a conexão sem responder. O sorteio usa 'semente',
+    de modo que a mesma sequência de requisições tem as mesmas falhas.
+
+    Uso:
+        with ServidorIMDb(latencia=0.05) as servidor:
+            obter_filmes_top(servidor.url('/chart/top/'))
+
+    Atributos:
+        latencia (float): Espera fixa de cada resposta, em segundos.
+        variacao (float): Espera aleatória adicional máxima, em segundos.
+        taxa_falhas (float): Fração das requisições respondidas com 503.
+        taxa_quedas (float): Fração das requisições com a conexão derrubada.
+        paginas (dict): Caminho -> (corpo, corpo em gzip, ETag) das páginas fixas.
+        estatisticas (dict): Contadores 'requisicoes', 'falhas', 'quedas',
+            'nao_modificadas' e 'bytes_enviados'.
+    """
+    def __init__(self, porta = 0, latencia = 0.0, variacao = 0.0, taxa_falhas = 0.0,
+                 taxa_quedas = 0.0, semente = 42, fixtures = True):
+        self.latencia = latencia
+        self.variacao = variacao
+        self.taxa_falhas = taxa_falhas
+        self.taxa_quedas = taxa_quedas
+        self.paginas = {}
+        if fixtures:
+            for nome, caminho in listar_fixtures().items():
+                self.paginas[rota_fixture(nome)] = preparar_pagina(ler_fixture(caminho))
+        self.estatisticas = {'requisicoes': 0, 'falhas': 0, 'quedas': 0,
+                             'nao_modificadas': 0, 'bytes_enviados': 0}
+        self._aleatorio = random.Random(semente)
+        self._trava = threading.Lock()
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', porta), self._criar_tratador())
+        self._servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def porta(self):
+        return self._servidor.server_address[1]
+
+    def url(self, caminho):
+        """
+        Devolve a URL completa de um caminho do servidor (ex.: '/chart/top/').
+        """
+        return f'http://127.0.0.1:{self.porta}{caminho}'
+
+    def url_sintetica(self, tipo, n_titulos, com_json = True):
+        """
+        Devolve a URL de uma página sintética com 'n_titulos' títulos.
+        """
+        return self.url(f'/sintetico/{tipo}/{n_titulos}/' + ('' if com_json else 'dom/'))
+
+    def localizar(self, caminho):
+        # Página do caminho (sem a query string), ou None
+        caminho = caminho.split('?', 1)[0]
+        if caminho in self.paginas:
+            return self.paginas[caminho]
+        encontrado = PADRAO_SINTETICO.match(caminho)
+        if encontrado:
+            tipo, n_titulos, dom = encontrado.groups()
+            return pagina_sintetica(tipo, int(n_titulos), dom is None)
+        return None
+
+    def sortear(self):
+        # Decide o destino da requisição: (espera, 'falha' / 'queda' / None)
+        with self._trava:
+            self.estatisticas['requisicoes'] += 1
+            espera = self.latencia + self._aleatorio.random() * self.variacao
+            sorteio = self._aleatorio.random()
+            if sorteio < self.taxa_quedas:
+                self.estatisticas['quedas'] += 1
+                return espera, 'queda'
+            if sorteio < self.taxa_quedas + self.taxa_falhas:
+                self.estatisticas['falhas'] += 1
+                return espera, 'falha'
+            return espera, None
+
+    def contar(self, **contadores):
+        with self._trava:
+            for contador, valor in contadores.items():
+                self.estatisticas[contador] += valor
+
+    def _criar_tratador(self):
+        servidor = self
+
+        class Tratador(BaseHTTPRequestHandler):
+            # HTTP/1.1: conexões persistentes, como o pool do ClienteHTTP espera
+            protocol_version = 'HTTP/1.1'
+            # Cabeçalhos e corpo saem em envios separados: sem o Nagle, sem a espera pelo ACK atrasado
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                espera, destino = servidor.sortear()
+                if espera > 0:
+                    time.sleep(espera)
+                if destino == 'queda':
+                    self.close_connection = True
+                    return
+                if destino == 'falha':
+                    self.responder(503, b'Servico indisponivel', {'Retry-After': '0'})
+                    return
+
+                pagina = servidor.localizar(self.path)
+                if pagina is None:
+                    self.responder(404, b'Pagina nao encontrada')
+                    return
+
+                corpo, comprimido, etag = pagina
+                if self.headers.get('If-None-Match') == etag:
+                    servidor.contar(nao_modificadas=1)
+                    self.responder(304, b'', {'ETag': etag})
+                    return
+                cabecalhos = {'ETag': etag, 'Content-Type': 'text/html; charset=utf-8'}
+                if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    corpo = comprimido
+                    cabecalhos['Content-Encoding'] = 'gzip'
+                self.responder(200, corpo, cabecalhos)
+
+            def responder(self, status, corpo, cabecalhos = None):
+                self.send_response(status)
+                for nome, valor in (cabecalhos or {}).items():
+                    self.send_header(nome, valor)
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+                servidor.contar(bytes_enviados=len(corpo))
+
+            def log_message(self, formato, *args):
+                # Sem uma linha no terminal por requisição
+                pass
+
+        return Tratador
+
+    def iniciar(self):
+        """
+        Começa a atender as requisições em uma thread.
+        """
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        """
+        Para o servidor e libera a porta.
+        """
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local que imita as páginas de ranking do IMDb.')
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--latencia', type=float, default=0.0, help='Espera de cada resposta, em segundos.')
+    parser.add_argument('--variacao', type=float, default=0.0,
+                        help='Espera aleatória adicional máxima, em segundos.')
+    parser.add_argument('--falhas', type=float, default=0.0, help='Fração das respostas com status 503.')
+    parser.add_argument('--quedas', type=float, default=0.0, help='Fração das conexões derrubadas.')
+    parser.add_argument('--gravar', nargs=2, metavar=('NOME', 'URL'),
+                        help='Baixa a página URL para benchmarks/fixtures/NOME.html.gz e sai.')
+    args = parser.parse_args()
+
+    if args.gravar:
+        nome, url = args.gravar
+        print(f'Página gravada em {gravar_fixture(url, nome)}')
+        return
+
+    servidor = ServidorIMDb(args.porta, args.latencia, args.variacao, args.falhas, args.quedas)
+    print(f'Servindo em {servidor.url("/")}')
+    for caminho in servidor.paginas:
+        print(f'  {servidor.url(caminho)}')
+    print(f'  {servidor.url_sintetica("movie", 250)} (qualquer quantidade; "dom/" no fim: sem JSON)')
+    try:
+        with servidor:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,462 @@
+"""
+Suíte de benchmarks das funções principais do projeto, sem acessar o IMDb:
+
+    - obter_filmes_top, contra o servidor local (benchmarks/servidor_imdb.py),
+      com as páginas gravadas em benchmarks/fixtures e com páginas
+      sintéticas de cada tamanho (JSON '__NEXT_DATA__' e só as tags);
+    - salvar_catalogo_no_banco e salvar_catalogo_em_lote, em bancos temporários;
+    - carregar_dataframe_movies e carregar_dataframe_series;
+    - adicionar_categoria, resumo_categoria_ano e exportar_csv_json.
+
+Cada caso roda algumas vezes (a preparação, como criar o banco vazio, fica
+fora da medição); o resultado guarda a mediana e o mínimo do tempo e,
+em uma execução a mais com o tracemalloc ativo, o pico de memória alocada
+pelo Python (buffers internos de bibliotecas em C não entram na conta).
+Os resultados podem ser gravados em JSON (--salvar) e comparados com uma
+gravação anterior (--comparar): tempos ou picos de memória acima da
+referência mais a tolerância são apontados como regressão, e o processo
+termina com código 1.
+
+Execução (na pasta raiz do projeto):
+    python -m benchmarks.suite [--tamanhos 250,1000,10000,100000] [--repeticoes 3]
+        [--casos obter_filmes_top,adicionar_categoria] [--salvar referencia.json]
+        [--comparar referencia.json] [--tolerancia 0.25]
+        [--latencia 0.05] [--falhas 0.1] [--quedas 0.05]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.paginas import itens_ranking, ler_fixture, listar_fixtures
+from benchmarks.servidor_imdb import ServidorIMDb, pagina_sintetica, rota_fixture
+from src.analysis import (
+    adicionar_categoria,
+    carregar_dataframe_movies,
+    carregar_dataframe_series,
+    exportar_csv_json,
+    resumo_categoria_ano,
+)
+from src.arquivos import escrever_atomico
+from src.database import (
+    criar_engine,
+    criar_tabelas,
+    descartar_engines,
+    salvar_catalogo_em_lote,
+    salvar_catalogo_no_banco,
+)
+from src.fetching import ClienteHTTP
+from src.metrics import Metricas
+from src.models import criar_catalogo
+from src.scraping import extrair_filmes_html, obter_filmes_top
+
+TAMANHOS_PADRAO = (250, 1000, 10_000, 100_000)
+
+# Versão do formato do arquivo de resultados
+VERSAO_RESULTADOS = 1
+
+# Diferenças abaixo destes valores não contam como regressão (ruído de medição)
+MINIMO_SEGUNDOS = 0.005
+MINIMO_MB = 1.0
+
+
+class Caso:
+    """
+    Função medida pela suíte.
+
+    Atributos:
+        nome (str): Nome do caso (ex.: 'obter_filmes_top[json]').
+        preparar (callable): preparar(cenario) -> função sem parâmetros a
+            medir. Roda antes de cada execução, fora da medição.
+        conferir (callable, opcional): conferir(resultado, cenario) -> bool,
+            chamado na primeira execução para garantir que a função medida
+            fez o trabalho esperado.
+        max_titulos (int, opcional): Maior tamanho em que o caso roda
+            (caminhos lentos demais para os tamanhos maiores).
+    """
+    def __init__(self, nome, preparar, conferir = None, max_titulos = None):
+        self.nome = nome
+        self.preparar = preparar
+        self.conferir = conferir
+        self.max_titulos = max_titulos
+
+
+def preparar_obter_filmes_top(com_json):
+    def preparar(cenario):
+        n = cenario['n']
+        # Gera a página antes da medição (o servidor a guarda pronta)
+        pagina_sintetica('movie', n, com_json)
+        url = cenario['servidor'].url_sintetica('movie', n, com_json)
+        return lambda: obter_filmes_top(url, n_filmes=n, cliente=cenario['cliente'])
+    return preparar
+
+
+def conferir_obter_filmes_top(filmes, cenario):
+    esperados = itens_ranking(0, cenario['n'])
+    return ([filme['imdb_id'] for filme in filmes] == [item['imdb_id'] for item in esperados]
+            and [filme['nota'] for filme in filmes] == [item['nota'] for item in esperados])
+
+
+def preparar_salvar(salvar):
+    def preparar(cenario):
+        # Banco novo a cada execução: mede sempre a inserção de todos os títulos
+        cenario['bancos'] += 1
+        caminho = os.path.join(cenario['pasta'], f'gravacao_{cenario["bancos"]}.db')
+        engine = criar_engine(f'sqlite:///{caminho}')
+        criar_tabelas(engine)
+        return lambda: salvar(cenario['catalog'], engine)
+    return preparar
+
+
+def conferir_salvar(contagem, cenario):
+    return contagem['inseridos'] == len(cenario['catalog'])
+
+
+def conferir_linhas(df, cenario):
+    return len(df) == cenario['n']
+
+
+CASOS = [
+    Caso('obter_filmes_top[json]', preparar_obter_filmes_top(com_json=True), conferir_obter_filmes_top),
+    Caso('obter_filmes_top[dom]', preparar_obter_filmes_top(com_json=False), conferir_obter_filmes_top,
+         max_titulos=10_000),
+    # Um commit por título: muito lento para os tamanhos maiores
+    Caso('salvar_catalogo_no_banco', preparar_salvar(salvar_catalogo_no_banco), conferir_salvar,
+         max_titulos=10_000),
+    Caso('salvar_catalogo_em_lote', preparar_salvar(salvar_catalogo_em_lote), conferir_salvar),
+    Caso('carregar_dataframe_movies', lambda cenario: lambda: carregar_dataframe_movies(cenario['db_url']),
+         conferir_linhas),
+    Caso('carregar_dataframe_series', lambda cenario: lambda: carregar_dataframe_series(cenario['db_url']),
+         conferir_linhas),
+    Caso('adicionar_categoria',
+         # Cópia a cada execução: a função altera o DataFrame recebido
+         lambda cenario: (lambda df: lambda: adicionar_categoria(df))(cenario['df_movies'].copy()),
+         lambda df, cenario: df['categoria'].notna().all()),
+    Caso('resumo_categoria_ano', lambda cenario: lambda: resumo_categoria_ano(cenario['df_categorias']),
+         lambda resumo, cenario: int(resumo.to_numpy().sum()) == cenario['n']),
+    Caso('exportar_csv_json',
+         lambda cenario: lambda: exportar_csv_json(cenario['df_movies'], cenario['df_series'],
+                                                   os.path.join(cenario['pasta'], 'exportacao')),
+         lambda _, cenario: os.path.exists(os.path.join(cenario['pasta'], 'exportacao', 'series.json'))),
+]
+
+
+def medir_caso(nome, preparar, cenario, repeticoes, conferir = None):
+    """
+    Mede uma função: tempo em 'repeticoes' execuções e pico de memória
+    em uma execução a mais, com o tracemalloc ativo (que deixa o código
+    mais lento e, por isso, fica fora da medição de tempo).
+
+    Parâmetros:
+        nome (str): Nome do caso.
+        preparar (callable): preparar(cenario) -> função sem parâmetros a medir.
+        cenario (dict): Dados compartilhados pelos casos de um tamanho.
+        repeticoes (int): Execuções medidas.
+        conferir (callable, opcional): conferir(resultado, cenario) -> bool.
+
+    Retorno:
+        dict: 'segundos' (mediana), 'segundos_min', 'repeticoes' e 'pico_mb'.
+
+    Exceções:
+        AssertionError: Se conferir recusar o resultado da função.
+    """
+    tempos = []
+    metricas = Metricas()
+    # As mensagens das funções medidas (ex.: arquivos exportados) não vão para o terminal
+    with open(os.devnull, 'w') as descarte, contextlib.redirect_stdout(descarte):
+        for repeticao in range(repeticoes):
+            funcao = preparar(cenario)
+            inicio = time.perf_counter()
+            resultado = funcao()
+            tempos.append(time.perf_counter() - inicio)
+            if repeticao == 0 and conferir is not None:
+                assert conferir(resultado, cenario), f'{nome}: resultado inesperado'
+            del resultado
+
+        funcao = preparar(cenario)
+        tracemalloc.start()
+        try:
+            with metricas.medir(nome):
+                funcao()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'segundos': statistics.median(tempos),
+        'segundos_min': min(tempos),
+        'repeticoes': repeticoes,
+        'pico_mb': metricas.medicoes[nome]['pico_tracemalloc_mb'],
+    }
+
+
+def montar_cenario(n, pasta, servidor, cliente):
+    # Títulos, banco e DataFrames usados pelos casos de um tamanho
+    filmes = itens_ranking(1, n)
+    series = itens_ranking(2, n, 'series')
+    db_url = f'sqlite:///{os.path.join(pasta, "leitura.db")}'
+    engine = criar_engine(db_url)
+    criar_tabelas(engine)
+    catalog = criar_catalogo(filmes, series)
+    salvar_catalogo_em_lote(catalog, engine)
+    df_movies = carregar_dataframe_movies(db_url)
+    return {
+        'n': n,
+        'pasta': pasta,
+        'servidor': servidor,
+        'cliente': cliente,
+        'catalog': catalog,
+        'bancos': 0,
+        'db_url': db_url,
+        'df_movies': df_movies,
+        'df_series': carregar_dataframe_series(db_url),
+        'df_categorias': adicionar_categoria(df_movies.copy()),
+    }
+
+
+def executar_suite(tamanhos = TAMANHOS_PADRAO, repeticoes = 3, casos = None, latencia = 0.0,
+                   taxa_falhas = 0.0, taxa_quedas = 0.0, exibir = print):
+    """
+    Roda os casos da suíte em cada tamanho e nas páginas gravadas.
+
+    Parâmetros:
+        tamanhos (tuple[int], opcional): Títulos por ranking (filmes e
+            séries têm cada um essa quantidade). Padrão: TAMANHOS_PADRAO.
+        repeticoes (int, opcional): Execuções medidas por caso. Padrão: 3.
+        casos (list[str], opcional): Nomes (ou começos de nomes) dos casos
+            a rodar. Padrão: None (todos).
+        latencia (float, opcional): Espera de cada resposta do servidor
+            local, em segundos. Padrão: 0.
+        taxa_falhas (float, opcional): Fração das respostas com status 503.
+            Padrão: 0.
+        taxa_quedas (float, opcional): Fração das conexões derrubadas.
+            Padrão: 0.
+        exibir (callable, opcional): Recebe uma linha de texto por caso
+            medido. Padrão: print.
+
+    Retorno:
+        dict: Resultados no formato gravado por gravar_resultados, com
+        'resultados' indexado por '<caso> <tamanho>' (ex.:
+        'adicionar_categoria 10000') ou '<caso> <página gravada>'.
+    """
+    def selecionado(nome):
+        return casos is None or any(nome.startswith(caso) for caso in casos)
+
+    resultados = {}
+
+    def registrar_resultado(chave, resultado):
+        resultados[chave] = resultado
+        exibir(f'{chave:42s} {resultado["segundos"] * 1000:10.2f} ms '
+               f'(mín. {resultado["segundos_min"] * 1000:10.2f} ms)   pico {resultado["pico_mb"]:8.2f} MB')
+
+    # Sem limite de taxa e com novas tentativas rápidas: mede o código, não a espera do cliente
+    cliente = ClienteHTTP(timeout=120, tentativas=10, espera_base=0.01,
+                          requisicoes_por_segundo=1_000_000, rajada=1_000_000)
+    servidor = ServidorIMDb(latencia=latencia, taxa_falhas=taxa_falhas, taxa_quedas=taxa_quedas)
+    with servidor:
+        if selecionado('obter_filmes_top[fixture]'):
+            for nome_fixture, caminho in listar_fixtures().items():
+                url = servidor.url(rota_fixture(nome_fixture))
+                quantidade = len(extrair_filmes_html(ler_fixture(caminho), n_filmes=10 ** 9))
+                registrar_resultado(
+                    f'obter_filmes_top[fixture] {nome_fixture}',
+                    medir_caso(nome_fixture, lambda _: lambda: obter_filmes_top(url, cliente=cliente),
+                               None, repeticoes,
+                               lambda filmes, _: len(filmes) == min(quantidade, 250)),
+                )
+
+        for n in tamanhos:
+            selecionados = [caso for caso in CASOS if selecionado(caso.nome)
+                            and (caso.max_titulos is None or n <= caso.max_titulos)]
+            if not selecionados:
+                continue
+            with tempfile.TemporaryDirectory() as pasta:
+                cenario = montar_cenario(n, pasta, servidor, cliente)
+                try:
+                    for caso in selecionados:
+                        registrar_resultado(f'{caso.nome} {n}', medir_caso(
+                            caso.nome, caso.preparar, cenario, repeticoes, caso.conferir))
+                finally:
+                    # Fecha as conexões antes de apagar os bancos temporários
+                    descartar_engines()
+        estatisticas_servidor = dict(servidor.estatisticas)
+    cliente.fechar()
+
+    return {
+        'versao': VERSAO_RESULTADOS,
+        'criado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'ambiente': descrever_ambiente(),
+        'configuracao': {
+            'tamanhos': list(tamanhos),
+            'repeticoes': repeticoes,
+            'latencia': latencia,
+            'taxa_falhas': taxa_falhas,
+            'taxa_quedas': taxa_quedas,
+        },
+        'servidor': estatisticas_servidor,
+        'resultados': resultados,
+    }
+
+
+def descrever_ambiente():
+    # Versões que mudam os tempos: comparações entre ambientes diferentes são avisadas
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'processador': platform.machine(),
+        'nucleos': os.cpu_count(),
+        'sqlite': sqlite3.sqlite_version,
+        'pandas': pd.__version__,
+    }
+
+
+def gravar_resultados(resultados, caminho):
+    """
+    Grava os resultados em JSON, de forma atômica (ver arquivos.escrever_atomico).
+
+    Parâmetros:
+        resultados (dict): Retorno de executar_suite.
+        caminho (str): Arquivo de destino.
+    """
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+
+    def escrever(temporario):
+        with open(temporario, mode='w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+
+    escrever_atomico(caminho, escrever)
+
+
+def carregar_resultados(caminho):
+    """
+    Lê resultados gravados por gravar_resultados.
+
+    Exceções:
+        ValueError: Se o arquivo for de outra versão do formato.
+    """
+    with open(caminho, encoding='utf-8') as arquivo:
+        resultados = json.load(arquivo)
+    if resultados.get('versao') != VERSAO_RESULTADOS:
+        raise ValueError(f'{caminho}: versão de resultados não suportada ({resultados.get("versao")})')
+    return resultados
+
+
+def comparar_resultados(atuais, referencia, tolerancia = 0.25, tolerancia_memoria = None):
+    """
+    Compara os resultados de uma execução com os de referência.
+
+    Um caso regride quando o tempo mínimo das execuções (menos sujeito ao
+    ruído da máquina que a mediana) ou o pico de memória passa
+    do valor de referência mais a tolerância e a diferença absoluta é
+    maior que MINIMO_SEGUNDOS / MINIMO_MB (para ignorar o ruído dos casos
+    muito rápidos). Casos presentes em apenas um dos lados são ignorados.
+
+    Parâmetros:
+        atuais (dict): Resultados da execução (ver executar_suite).
+        referencia (dict): Resultados de referência.
+        tolerancia (float, opcional): Aumento relativo aceito no tempo.
+            Padrão: 0.25 (25%).
+        tolerancia_memoria (float, opcional): Aumento relativo aceito no
+            pico de memória. Padrão: o mesmo de 'tolerancia'.
+
+    Retorno:
+        list[dict]: Uma linha por caso e métrica ('segundos_min' e 'pico_mb'),
+        com as chaves 'caso', 'metrica', 'referencia', 'atual', 'razao'
+        e 'regressao' (bool).
+    """
+    if tolerancia_memoria is None:
+        tolerancia_memoria = tolerancia
+    limites = {'segundos_min': (tolerancia, MINIMO_SEGUNDOS), 'pico_mb': (tolerancia_memoria, MINIMO_MB)}
+
+    comparacao = []
+    for caso, atual in atuais['resultados'].items():
+        anterior = referencia['resultados'].get(caso)
+        if anterior is None:
+            continue
+        for metrica, (limite_relativo, minimo) in limites.items():
+            valor, valor_referencia = atual.get(metrica), anterior.get(metrica)
+            if valor is None or valor_referencia is None:
+                continue
+            comparacao.append({
+                'caso': caso,
+                'metrica': metrica,
+                'referencia': valor_referencia,
+                'atual': valor,
+                'razao': valor / valor_referencia if valor_referencia else None,
+                'regressao': (valor > valor_referencia * (1 + limite_relativo)
+                              and valor - valor_referencia > minimo),
+            })
+    return comparacao
+
+
+def exibir_comparacao(comparacao):
+    # Tabela da comparação, com as regressões marcadas
+    for linha in comparacao:
+        unidade, escala = ('ms', 1000) if linha['metrica'] == 'segundos_min' else ('MB', 1)
+        razao = f'{linha["razao"]:6.2f}x' if linha['razao'] is not None else '     -'
+        print(f'{linha["caso"]:42s} {linha["metrica"]:12s} '
+              f'{linha["referencia"] * escala:10.2f} -> {linha["atual"] * escala:10.2f} {unidade} '
+              f'{razao}{"   REGRESSÃO" if linha["regressao"] else ""}')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.suite',
+        description='Mede as funções principais sem acessar o IMDb e compara com uma referência.',
+    )
+    parser.add_argument('--tamanhos', default=','.join(map(str, TAMANHOS_PADRAO)),
+                        help='títulos por ranking, separados por vírgula (padrão: %(default)s)')
+    parser.add_argument('--repeticoes', type=int, default=3, help='execuções medidas por caso (padrão: 3)')
+    parser.add_argument('--casos', help='nomes (ou começos de nomes) dos casos, separados por vírgula')
+    parser.add_argument('--salvar', metavar='ARQUIVO', help='grava os resultados em JSON')
+    parser.add_argument('--comparar', metavar='ARQUIVO',
+                        help='compara com resultados gravados; termina com código 1 se houver regressão')
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help='aumento relativo aceito no tempo (padrão: 0.25)')
+    parser.add_argument('--tolerancia-memoria', type=float,
+                        help='aumento relativo aceito no pico de memória (padrão: o de --tolerancia)')
+    parser.add_argument('--latencia', type=float, default=0.0,
+                        help='espera de cada resposta do servidor local, em segundos')
+    parser.add_argument('--falhas', type=float, default=0.0, help='fração das respostas com status 503')
+    parser.add_argument('--quedas', type=float, default=0.0, help='fração das conexões derrubadas')
+    args = parser.parse_args()
+
+    referencia = carregar_resultados(args.comparar) if args.comparar else None
+    resultados = executar_suite(
+        tamanhos=[int(tamanho) for tamanho in args.tamanhos.split(',') if tamanho],
+        repeticoes=args.repeticoes,
+        casos=args.casos.split(',') if args.casos else None,
+        latencia=args.latencia,
+        taxa_falhas=args.falhas,
+        taxa_quedas=args.quedas,
+    )
+    if args.salvar:
+        gravar_resultados(resultados, args.salvar)
+        print(f'Resultados gravados em {args.salvar}')
+
+    if referencia is not None:
+        if referencia['ambiente'] != resultados['ambiente']:
+            print('Aviso: a referência foi gravada em outro ambiente; os tempos podem não ser comparáveis.')
+        servidor_atual = {chave: resultados['configuracao'][chave]
+                          for chave in ('latencia', 'taxa_falhas', 'taxa_quedas')}
+        if any(referencia['configuracao'].get(chave) != valor for chave, valor in servidor_atual.items()):
+            print('Aviso: a referência foi gravada com outra latência ou taxa de falhas do servidor local.')
+        comparacao = comparar_resultados(resultados, referencia, args.tolerancia, args.tolerancia_memoria)
+        print()
+        exibir_comparacao(comparacao)
+        regressoes = [linha for linha in comparacao if linha['regressao']]
+        print(f'\nRegressões: {len(regressoes)}')
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
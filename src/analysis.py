@@ -1,9 +1,196 @@
+import bisect
+import heapq
+import json
+import math
 import os
+import time
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import case, func, select
 
+from .database import obter_engine, assinatura_tabela, MovieDB, MovieResumoDB, SeriesDB
+from .arquivos import escrever_atomico
+from .exporting import exportar_dataframes
+from .metrics import instrumentar, registrar
+from .models import AUSENTE
 
-def carregar_dataframe_movies(db_url = "sqlite:///data/imdb.db"):
+# pyarrow é opcional: sem ele, o cache de DataFrames fica desativado.
+# A importação (cerca de 0,25 s) só acontece no primeiro uso do cache.
+_pyarrow = None
+
+
+def importar_pyarrow():
+    """
+    Importa o pyarrow no primeiro uso e o guarda para as chamadas seguintes.
+
+    Retorno:
+        module ou None: O módulo pyarrow, ou None se não estiver instalado.
+    """
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.ipc
+        except ImportError:
+            _pyarrow = False
+        else:
+            _pyarrow = pyarrow
+    return _pyarrow or None
+
+
+# Faixas padrão da classificação textual das notas: 'limites' são as notas
+# mínimas de cada categoria a partir da segunda, e 'rotulos' as categorias,
+# da menor para a maior nota (nota < 7.0 -> 'Mediano', 7.0 <= nota < 8.0 -> 'Bom'...)
+FAIXAS_CATEGORIA_PADRAO = {
+    'limites': [7.0, 8.0, 9.0],
+    'rotulos': ['Mediano', 'Bom', 'Excelente', 'Obra-prima'],
+}
+
+
+# Tipos compactos das colunas nos arquivos do cache de DataFrames e nos
+# blocos de carregar_movies_em_blocos (colunas ausentes na tabela são
+# ignoradas). As notas ficam em float64: em float32, 8.2 vira 8.1999998.
+TIPOS_COMPACTOS = {
+    'id': 'int32',
+    'year': 'Int16',
+    'runtime': 'Int16',
+    'seasons': 'Int16',
+    'episodes': 'Int32',
+    'genres': 'category',
+}
+
+
+def compactar_tipos(df):
+    """
+    Converte as colunas do DataFrame para os tipos de TIPOS_COMPACTOS
+    (inteiros pequenos que aceitam <NA> e category).
+
+    Parâmetros:
+        df (pandas.DataFrame): DataFrame lido de 'movies' ou 'series'.
+
+    Retorno:
+        pandas.DataFrame: O mesmo DataFrame, com as colunas convertidas.
+    """
+    tipos = {nome: tipo for nome, tipo in TIPOS_COMPACTOS.items() if nome in df.columns}
+    return df.astype(tipos)
+
+
+class CacheDataFrames:
+    """
+    Cache das tabelas carregadas em DataFrames, guardadas em arquivos
+    Arrow IPC (Feather v2, sem compressão) em 'pasta'.
+
+    Na leitura, o arquivo é mapeado em memória (mmap), de modo que as
+    colunas numéricas não passam pela decodificação do SQL nem viram
+    objetos Python célula a célula. Cada arquivo guarda nos metadados
+    a assinatura da tabela no momento da gravação: quantidade de linhas,
+    maior id, maior 'updated_at' e nomes das colunas. Se a assinatura
+    atual for diferente, a tabela é lida de novo do banco e o arquivo
+    é regravado (de forma atômica).
+
+    Os arquivos guardam as colunas com os tipos de TIPOS_COMPACTOS (menos
+    bytes em disco e no mapeamento) e, nos metadados, os tipos da leitura
+    do banco, aos quais as colunas voltam na carga: as tabelas chegam com
+    os mesmos tipos, venham do cache ou do banco. Sem o pyarrow
+    instalado, toda carga vem do banco.
+
+    Atributos:
+        pasta (str): Pasta dos arquivos do cache.
+        estatisticas (dict): Contadores 'acertos' e 'faltas'.
+        cargas (dict): Nome da tabela -> {'origem': 'cache' ou 'banco',
+            'segundos': tempo da última carga}.
+    """
+    def __init__(self, pasta = 'data/cache'):
+        self.pasta = pasta
+        self.estatisticas = {'acertos': 0, 'faltas': 0}
+        self.cargas = {}
+
+    @property
+    def disponivel(self):
+        # O cache depende do pyarrow
+        return importar_pyarrow() is not None
+
+    def assinatura(self, conexao, tabela):
+        """
+        Calcula a assinatura atual de uma tabela (ver assinatura_tabela).
+
+        Retorno:
+            str: Assinatura em JSON.
+        """
+        return json.dumps(assinatura_tabela(conexao, tabela))
+
+    def ler_arquivo(self, caminho, assinatura):
+        # Devolve o DataFrame do arquivo, ou None se ele não existir ou estiver desatualizado
+        if not os.path.exists(caminho):
+            return None
+        pa = importar_pyarrow()
+        leitor = pa.ipc.open_file(pa.memory_map(caminho, 'r'))
+        metadados = leitor.schema.metadata or {}
+        if metadados.get(b'assinatura') != assinatura.encode('utf-8') or b'tipos' not in metadados:
+            return None
+        return leitor.read_all().to_pandas().astype(json.loads(metadados[b'tipos']))
+
+    def gravar_arquivo(self, caminho, df, assinatura):
+        # Grava com os tipos compactos, guardando os tipos originais nos
+        # metadados; colunas object (só nulos, na leitura do banco) ficam
+        # como estão, pois voltariam com NaN no lugar de None
+        pa = importar_pyarrow()
+        tipos = {coluna: str(tipo) for coluna, tipo in df.dtypes.items()}
+        compactos = {nome: tipo for nome, tipo in TIPOS_COMPACTOS.items()
+                     if nome in df.columns and df[nome].dtype != object}
+        tabela_arrow = pa.Table.from_pandas(df.astype(compactos), preserve_index=False)
+        tabela_arrow = tabela_arrow.replace_schema_metadata({
+            **(tabela_arrow.schema.metadata or {}),
+            b'assinatura': assinatura.encode('utf-8'),
+            b'tipos': json.dumps(tipos).encode('utf-8'),
+        })
+
+        def escrever(temporario):
+            with pa.OSFile(temporario, 'wb') as saida:
+                with pa.ipc.new_file(saida, tabela_arrow.schema) as escritor:
+                    escritor.write_table(tabela_arrow)
+
+        escrever_atomico(caminho, escrever)
+
+    def carregar(self, engine, tabela):
+        """
+        Carrega uma tabela inteira, do cache quando ele estiver atual.
+
+        Parâmetros:
+            engine (sqlalchemy.Engine): Engine conectada ao banco.
+            tabela (sqlalchemy.Table): Tabela a carregar.
+
+        Retorno:
+            pandas.DataFrame: Todos os registros, com os tipos da leitura do banco.
+        """
+        inicio = time.perf_counter()
+        caminho = os.path.join(self.pasta, f'{tabela.name}.arrow')
+
+        with engine.connect() as conexao:
+            df = None
+            if self.disponivel:
+                assinatura = self.assinatura(conexao, tabela)
+                df = self.ler_arquivo(caminho, assinatura)
+            origem = 'cache'
+            if df is None:
+                origem = 'banco'
+                # Mesma consulta da carga sem o cache, com os mesmos tipos
+                df = pd.read_sql(f'SELECT * FROM {tabela.name}', con=conexao)
+
+        if origem == 'cache':
+            self.estatisticas['acertos'] += 1
+        else:
+            self.estatisticas['faltas'] += 1
+            if self.disponivel:
+                os.makedirs(self.pasta, exist_ok=True)
+                self.gravar_arquivo(caminho, df, assinatura)
+
+        self.cargas[tabela.name] = {'origem': origem, 'segundos': time.perf_counter() - inicio}
+        return df
+
+
+@instrumentar('carregar_dataframe_movies', contar=lambda df: {'linhas': len(df)})
+def carregar_dataframe_movies(db_url = "sqlite:///data/imdb.db", cache = None):
     """
     Lê todos os registros da tabela 'movies' do banco de dados
     e devolve um DataFrame com esses dados.
@@ -11,16 +198,21 @@ def carregar_dataframe_movies(db_url = "sqlite:///data/imdb.db"):
     Parâmetros:
         db_url (str, opcional): URL de conexão com o banco.
             Padrão: 'sqlite:///data/imdb.db'.
+        cache (CacheDataFrames, opcional): Cache em arquivos Arrow; com ele,
+            a tabela só é lida do banco quando mudou. Padrão: None.
 
     Retorno:
         pandas.DataFrame: DataFrame contendo todos os registros da tabela 'movies'.
     """
-    engine = create_engine(db_url)
+    engine = obter_engine(db_url)
+    if cache is not None:
+        return cache.carregar(engine, MovieDB.__table__)
     df_movies = pd.read_sql("SELECT * FROM movies", con=engine)
     return df_movies
 
 
-def carregar_dataframe_series(db_url = "sqlite:///data/imdb.db"):
+@instrumentar('carregar_dataframe_series', contar=lambda df: {'linhas': len(df)})
+def carregar_dataframe_series(db_url = "sqlite:///data/imdb.db", cache = None):
     """
     Lê todos os registros da tabela 'series' do banco de dados
     e devolve um DataFrame com esses dados.
@@ -28,15 +220,193 @@ def carregar_dataframe_series(db_url = "sqlite:///data/imdb.db"):
     Parâmetros:
         db_url (str, opcional): URL de conexão com o banco.
             Padrão: 'sqlite:///data/imdb.db'.
+        cache (CacheDataFrames, opcional): Cache em arquivos Arrow (ver
+            carregar_dataframe_movies). Padrão: None.
 
     Retorno:
         pandas.DataFrame: DataFrame contendo todos os registros da tabela 'series'.
     """
-    engine = create_engine(db_url)
+    engine = obter_engine(db_url)
+    if cache is not None:
+        return cache.carregar(engine, SeriesDB.__table__)
     df_series = pd.read_sql("SELECT * FROM series", con=engine)
     return df_series
 
 
+def consultar_movies(db_url = "sqlite:///data/imdb.db", nota_min = None, nota_max = None,
+                     nota_min_inclusiva = True, ano_min = None, ano_max = None,
+                     prefixo_titulo = None, ordenar_por = None, limite = None,
+                     colunas = None, faixas_categoria = None):
+    """
+    Consulta a tabela 'movies' aplicando filtros, ordenação e limite
+    diretamente no banco (SQL), em vez de carregar a tabela inteira
+    e filtrar no Pandas.
+
+    Os filtros usam os índices de 'movies' (nota, ano + nota e título),
+    de modo que o tempo e a memória dependem do tamanho do resultado,
+    e não do tamanho do catálogo.
+
+    Parâmetros:
+        db_url (str, opcional): URL de conexão com o banco.
+            Padrão: 'sqlite:///data/imdb.db'.
+        nota_min (float, opcional): Nota mínima.
+        nota_max (float, opcional): Nota máxima (inclusiva).
+        nota_min_inclusiva (bool, opcional): Se False, a nota precisa ser
+            estritamente maior que nota_min. Padrão: True.
+        ano_min (int, opcional): Ano mínimo (inclusivo).
+        ano_max (int, opcional): Ano máximo (inclusivo).
+        prefixo_titulo (str, opcional): Início do título (diferencia
+            maiúsculas de minúsculas).
+        ordenar_por (list[str], opcional): Colunas da ordenação; um '-'
+            na frente indica ordem decrescente (ex.: ['-rating', 'id']).
+        limite (int, opcional): Quantidade máxima de linhas.
+        colunas (list[str], opcional): Colunas devolvidas. Padrão: todas.
+        faixas_categoria (dict, opcional): Se informado, acrescenta a coluna
+            'categoria', calculada no banco com a mesma regra de
+            adicionar_categoria (ver expressao_categoria_sql).
+
+    Retorno:
+        pandas.DataFrame: Linhas de 'movies' que atendem aos filtros.
+    """
+    consulta = montar_consulta(
+        MovieDB.__table__, nota_min=nota_min, nota_max=nota_max,
+        nota_min_inclusiva=nota_min_inclusiva, ano_min=ano_min, ano_max=ano_max,
+        prefixo_titulo=prefixo_titulo, ordenar_por=ordenar_por, limite=limite,
+        colunas=colunas, faixas_categoria=faixas_categoria,
+    )
+
+    engine = obter_engine(db_url)
+    with engine.connect() as conexao:
+        df_resultado = pd.read_sql(consulta, con=conexao)
+
+    if faixas_categoria is not None:
+        _, rotulos = validar_faixas(faixas_categoria)
+        df_resultado['categoria'] = pd.Categorical(
+            df_resultado['categoria'], categories=rotulos, ordered=True
+        )
+    return df_resultado
+
+
+def montar_consulta(tabela, nota_min = None, nota_max = None, nota_min_inclusiva = True,
+                    ano_min = None, ano_max = None, prefixo_titulo = None, ordenar_por = None,
+                    limite = None, deslocamento = None, colunas = None, faixas_categoria = None):
+    """
+    Monta o SELECT de consultar_movies para uma tabela de títulos
+    ('movies' ou 'series'), sem executá-lo.
+
+    Parâmetros:
+        tabela (sqlalchemy.Table): Tabela consultada (ex.: MovieDB.__table__).
+        deslocamento (int, opcional): Linhas puladas antes da primeira
+            devolvida (paginação, junto com limite).
+        Demais parâmetros: ver consultar_movies.
+
+    Retorno:
+        sqlalchemy.Select: Consulta pronta para execução.
+
+    Exceções:
+        ValueError: Se uma coluna (devolvida, de ordenação ou usada por um
+        filtro) não existir na tabela.
+    """
+    nomes_colunas = list(colunas) if colunas else list(tabela.columns.keys())
+    desconhecidas = [nome for nome in nomes_colunas if nome not in tabela.c]
+    if desconhecidas:
+        raise ValueError(f'Colunas inexistentes em "{tabela.name}": {desconhecidas}')
+    if (nota_min is not None or nota_max is not None or faixas_categoria is not None) \
+            and 'rating' not in tabela.c:
+        raise ValueError(f'A tabela "{tabela.name}" não tem notas')
+
+    consulta = select(*[tabela.c[nome] for nome in nomes_colunas])
+    if faixas_categoria is not None:
+        consulta = consulta.add_columns(expressao_categoria_sql(tabela.c.rating, faixas_categoria))
+
+    if nota_min is not None:
+        if nota_min_inclusiva:
+            consulta = consulta.where(tabela.c.rating >= nota_min)
+        else:
+            consulta = consulta.where(tabela.c.rating > nota_min)
+    if nota_max is not None:
+        consulta = consulta.where(tabela.c.rating <= nota_max)
+    if ano_min is not None:
+        consulta = consulta.where(tabela.c.year >= ano_min)
+    if ano_max is not None:
+        consulta = consulta.where(tabela.c.year <= ano_max)
+    if prefixo_titulo:
+        # Intervalo [prefixo, prefixo com o último caractere incrementado),
+        # que aproveita o índice do título (ao contrário de LIKE)
+        limite_superior = prefixo_titulo[:-1] + chr(ord(prefixo_titulo[-1]) + 1)
+        consulta = consulta.where(tabela.c.title >= prefixo_titulo)
+        consulta = consulta.where(tabela.c.title < limite_superior)
+
+    for nome in ordenar_por or []:
+        decrescente = nome.startswith('-')
+        nome = nome.lstrip('-')
+        if nome not in tabela.c:
+            raise ValueError(f'Coluna de ordenação inexistente em "{tabela.name}": "{nome}"')
+        consulta = consulta.order_by(tabela.c[nome].desc() if decrescente else tabela.c[nome])
+
+    if limite is not None:
+        consulta = consulta.limit(limite)
+    if deslocamento:
+        consulta = consulta.offset(deslocamento)
+    return consulta
+
+
+@instrumentar('exportar_dados')
+def exportar_dados(df_movies, df_series, pasta_saida = 'data', formatos = ('csv', 'json'),
+                   compressao_parquet = 'snappy', max_workers = 4):
+    """
+    Exporta os DataFrames de filmes e séries nos formatos escolhidos.
+
+    Arquivos gerados (dentro de pasta_saida), um por formato:
+        - movies.<extensão>
+        - series.<extensão>
+
+    Formatos disponíveis: 'csv', 'json' (compacto), 'jsonl' (JSON Lines),
+    'parquet' e 'feather' (Arrow IPC; os dois últimos exigem o pyarrow).
+    Os arquivos são escritos em paralelo e de forma atômica (ver
+    src/exporting.py); para cada um são exibidos o tamanho e o tempo gasto.
+
+    Parâmetros:
+        df_movies (pandas.DataFrame): DataFrame com os filmes.
+        df_series (pandas.DataFrame): DataFrame com as séries.
+        pasta_saida (str, opcional): Pasta onde os arquivos serão salvos.
+            Padrão: 'data'.
+        formatos (list[str], opcional): Formatos exportados. Padrão: ('csv', 'json').
+        compressao_parquet (str, opcional): Compressão usada no Parquet.
+            Padrão: 'snappy'.
+        max_workers (int, opcional): Arquivos escritos ao mesmo tempo. Padrão: 4.
+
+    Retorno:
+        list[dict]: Resultado de cada arquivo (ver exportar_dataframes).
+
+    Em caso de erro em um arquivo (por exemplo, permissão, caminho inválido
+    ou pyarrow ausente), exibe uma mensagem no terminal e segue com os demais.
+    """
+    resultados = exportar_dataframes(
+        {'movies': df_movies, 'series': df_series},
+        pasta_saida=pasta_saida,
+        formatos=formatos,
+        compressao_parquet=compressao_parquet,
+        max_workers=max_workers,
+    )
+    registrar(
+        bytes_escritos=sum(resultado['bytes'] or 0 for resultado in resultados),
+        linhas=(len(df_movies) + len(df_series)) * len(formatos),
+    )
+
+    print()
+    for resultado in resultados:
+        if resultado['erro'] is None:
+            print(f'Arquivo "{resultado["arquivo"]}" exportado com sucesso em '
+                  f'"{resultado["caminho"]}"! ({resultado["bytes"]} bytes, '
+                  f'{resultado["segundos"]:.3f} s)')
+        else:
+            print(f'Aviso: Ocorreu um erro ao exportar o arquivo "{resultado["arquivo"]}":')
+            print(resultado['erro'])
+    return resultados
+
+
+@instrumentar('exportar_csv_json')
 def exportar_csv_json(df_movies, df_series, pasta_saida = 'data'):
     """
     Exporta os DataFrames de filmes e séries para arquivos CSV e JSON.
@@ -56,89 +426,130 @@ def exportar_csv_json(df_movies, df_series, pasta_saida = 'data'):
     Em caso de erro (por exemplo, permissão ou caminho inválido),
     exibe uma mensagem no terminal.
     """
-    # Garante que a pasta de saída existe
-    os.makedirs(pasta_saida, exist_ok=True)
-
-    caminho_movies_csv = os.path.join(pasta_saida, 'movies.csv')
-    caminho_series_csv = os.path.join(pasta_saida, 'series.csv')
-    caminho_movies_json = os.path.join(pasta_saida, 'movies.json')
-    caminho_series_json = os.path.join(pasta_saida, 'series.json')
-
-    # Exportando movies.csv
-    try:
-        df_movies.to_csv(caminho_movies_csv, index=False, encoding='utf-8')
-        print(f'\nArquivo "movies.csv" exportado com sucesso em "{caminho_movies_csv}"!')
-    except Exception as excecao:
-        print('\nAviso: Ocorreu um erro ao exportar o arquivo "movies.csv":')
-        print(excecao)
-
-    # Exportando series.csv
-    try:
-        df_series.to_csv(caminho_series_csv, index=False, encoding='utf-8')
-        print(f'Arquivo "series.csv" exportado com sucesso em "{caminho_series_csv}"!')
-    except Exception as excecao:
-        print('Aviso: Ocorreu um erro ao exportar o arquivo "series.csv":')
-        print(excecao)
-
-    # Exportando movies.json
-    try:
-        df_movies.to_json(caminho_movies_json, orient='records',
-                          indent=4, force_ascii=False)
-        print(f'Arquivo "movies.json" exportado com sucesso em "{caminho_movies_json}"!')
-    except Exception as excecao:
-        print('Aviso: Ocorreu um erro ao exportar o arquivo "movies.json":')
-        print(excecao)
-
-    # Exportando series.json
-    try:
-        df_series.to_json(caminho_series_json, orient='records',
-                          indent=4, force_ascii=False)
-        print(f'Arquivo "series.json" exportado com sucesso em "{caminho_series_json}"!')
-    except Exception as excecao:
-        print('Aviso: Ocorreu um erro ao exportar o arquivo "series.json":')
-        print(excecao)
-
-
-def obter_categoria_textual(nota_float):
+    exportar_dados(df_movies, df_series, pasta_saida=pasta_saida, formatos=('csv', 'json'))
+
+
+def validar_faixas(faixas = None):
+    """
+    Confere e normaliza uma especificação de faixas de categoria
+    (no formato de FAIXAS_CATEGORIA_PADRAO, ex.: lida do config.json).
+
+    Parâmetros:
+        faixas (dict, opcional): Dicionário com 'limites' (crescentes) e
+            'rotulos' (um a mais que os limites). Padrão: FAIXAS_CATEGORIA_PADRAO.
+
+    Retorno:
+        tuple: (limites, rotulos) como listas.
+
+    Exceções:
+        ValueError: Se os limites não forem crescentes ou a quantidade
+        de rótulos não for a quantidade de limites mais um.
+    """
+    faixas = faixas or FAIXAS_CATEGORIA_PADRAO
+    limites = [float(limite) for limite in faixas['limites']]
+    rotulos = list(faixas['rotulos'])
+    if len(rotulos) != len(limites) + 1:
+        raise ValueError('As faixas precisam de exatamente um rótulo a mais que os limites.')
+    if any(anterior >= seguinte for anterior, seguinte in zip(limites, limites[1:])):
+        raise ValueError('Os limites das faixas precisam ser estritamente crescentes.')
+    return limites, rotulos
+
+
+def obter_categoria_textual(nota_float, faixas = None):
     """
     Classifica uma nota numérica em uma categoria textual.
 
-    Regras:
+    Regras (faixas padrão):
         - nota >= 9.0               -> "Obra-prima"
         - 8.0 <= nota < 9.0         -> "Excelente"
         - 7.0 <= nota < 8.0         -> "Bom"
         - nota < 7.0                -> "Mediano"
 
+    Notas ausentes (NaN) ficam na primeira categoria.
+
     Parâmetros:
         nota_float (float): Nota do filme (rating).
+        faixas (dict, opcional): Faixas de classificação (ver validar_faixas).
 
     Retorno:
         str: Categoria textual correspondente à nota.
     """
-    if nota_float >= 9.0:
-        return 'Obra-prima'
-    elif 9.0 > nota_float >= 8.0:
-        return 'Excelente'
-    elif 8.0 > nota_float >= 7.0:
-        return 'Bom'
+    if faixas is None:
+        limites, rotulos = FAIXAS_CATEGORIA_PADRAO['limites'], FAIXAS_CATEGORIA_PADRAO['rotulos']
     else:
-        return 'Mediano'
+        limites, rotulos = validar_faixas(faixas)
+    if math.isnan(nota_float):
+        return rotulos[0]
+    return rotulos[bisect.bisect_right(limites, nota_float)]
 
 
-def adicionar_categoria(df_movies):
+def classificar_notas(notas, faixas = None):
+    """
+    Classifica uma coluna inteira de notas de uma só vez (vetorizado,
+    com numpy.searchsorted), sem chamar uma função Python por linha.
+
+    Parâmetros:
+        notas (pandas.Series): Notas (rating).
+        faixas (dict, opcional): Faixas de classificação (ver validar_faixas).
+
+    Retorno:
+        pandas.Series: Categorias como Categorical ordenado (da menor para
+        a maior faixa), com o mesmo índice de 'notas'. Notas ausentes
+        ficam na primeira categoria, como em obter_categoria_textual.
+    """
+    limites, rotulos = validar_faixas(faixas)
+    valores = notas.to_numpy(dtype='float64', na_value=np.nan)
+
+    # Quantos limites são <= nota = posição da categoria
+    codigos = np.searchsorted(np.asarray(limites, dtype='float64'), valores, side='right')
+    codigos[np.isnan(valores)] = 0
+
+    categorias = pd.Categorical.from_codes(
+        codigos.astype('int8'), categories=rotulos, ordered=True
+    )
+    return pd.Series(categorias, index=notas.index, name='categoria')
+
+
+def expressao_categoria_sql(coluna, faixas = None):
+    """
+    Monta a mesma classificação de classificar_notas como uma expressão
+    SQL (CASE WHEN ...), para ser calculada pelo próprio banco.
+
+    Parâmetros:
+        coluna (sqlalchemy.Column): Coluna com as notas (ex.: MovieDB.__table__.c.rating).
+        faixas (dict, opcional): Faixas de classificação (ver validar_faixas).
+
+    Retorno:
+        sqlalchemy.Case: Expressão rotulada como 'categoria'.
+    """
+    limites, rotulos = validar_faixas(faixas)
+    # Da maior faixa para a menor: o primeiro WHEN verdadeiro define a categoria
+    condicoes = [
+        (coluna >= limite, rotulo)
+        for limite, rotulo in reversed(list(zip(limites, rotulos[1:])))
+    ]
+    return case(*condicoes, else_=rotulos[0]).label('categoria')
+
+
+def adicionar_categoria(df_movies, faixas = None):
     """
     Adiciona ao DataFrame de filmes uma coluna 'categoria'
     baseada na coluna 'rating'.
 
+    A coluna é calculada de forma vetorizada (ver classificar_notas) e
+    tem tipo Categorical ordenado.
+
     Parâmetros:
         df_movies (pandas.DataFrame): DataFrame contendo, entre outras,
             a coluna 'rating'.
+        faixas (dict, opcional): Faixas de classificação (ver validar_faixas).
+            Padrão: FAIXAS_CATEGORIA_PADRAO.
 
     Retorno:
         pandas.DataFrame: Mesmo DataFrame de entrada, agora com a
         coluna adicional 'categoria'.
     """
-    df_movies['categoria'] = df_movies['rating'].apply(obter_categoria_textual)
+    df_movies['categoria'] = classificar_notas(df_movies['rating'], faixas)
     return df_movies
 
 
@@ -162,14 +573,206 @@ def resumo_categoria_ano(df_movies):
 
     Retorno:
         pandas.DataFrame: Tabela resumo com categorias nas linhas e
-        anos nas colunas.
+        anos nas colunas. Com 'categoria' do tipo Categorical (ver
+        adicionar_categoria), as linhas seguem a ordem das faixas e só
+        aparecem as categorias presentes nos dados.
+    """
+    # Conta quantos filmes há em cada (categoria, year)
+    return renderizar_resumo(df_movies.groupby(['categoria', 'year'], observed=True).size())
+
+
+def renderizar_resumo(contagem):
     """
-    resumo = (
-        df_movies
-        .groupby(['categoria', 'year'])
-        .size() # conta quantos filmes há em cada (categoria, year)
+    Monta a tabela resumo (categorias nas linhas, anos nas colunas) a
+    partir das contagens por (categoria, ano), venham elas do DataFrame,
+    dos blocos ou da tabela 'movies_resumo'.
+
+    Parâmetros:
+        contagem (pandas.Series): Quantidade de filmes, com índice
+            (categoria, year).
+
+    Retorno:
+        pandas.DataFrame: Tabela resumo (ver resumo_categoria_ano).
+    """
+    return (
+        contagem
         .unstack(fill_value=0) # transforma "year" em colunas, preenchendo vazios com 0
         .sort_index() # ordena por categoria (apenas para organizar melhor)
     )
-    return resumo
+
+
+def carregar_movies_em_blocos(db_url = "sqlite:///data/imdb.db", tamanho_bloco = 100_000,
+                              colunas = None):
+    """
+    Lê a tabela 'movies' em blocos de até 'tamanho_bloco' linhas
+    (pd.read_sql com chunksize), sem carregar a tabela inteira.
+
+    Cada bloco já vem com os tipos compactos de TIPOS_COMPACTOS, exceto
+    'category' (as categorias mudariam de um bloco para outro), de modo
+    que a memória usada depende do tamanho do bloco, e não do catálogo.
+
+    Parâmetros:
+        db_url (str, opcional): URL de conexão com o banco.
+            Padrão: 'sqlite:///data/imdb.db'.
+        tamanho_bloco (int, opcional): Linhas por bloco. Padrão: 100000.
+        colunas (list[str], opcional): Colunas lidas. Padrão: todas.
+
+    Retorno:
+        generator: DataFrames com as linhas de cada bloco, na ordem de 'id'.
+    """
+    tabela = MovieDB.__table__
+    nomes_colunas = list(colunas) if colunas else list(tabela.columns.keys())
+    # Notas em float64 também nos blocos só com notas nulas (que viriam como object)
+    tipos = {
+        nome: tipo for nome, tipo in {'rating': 'float64', **TIPOS_COMPACTOS}.items()
+        if nome in nomes_colunas and tipo != 'category'
+    }
+    consulta = select(*[tabela.c[nome] for nome in nomes_colunas]).order_by(tabela.c.id)
+
+    engine = obter_engine(db_url)
+    # stream_results: o driver entrega as linhas aos poucos, em vez de todas de uma vez
+    with engine.connect().execution_options(stream_results=True) as conexao:
+        for bloco in pd.read_sql(consulta, con=conexao, chunksize=tamanho_bloco):
+            yield bloco.astype(tipos)
+
+
+def resumo_categoria_ano_em_blocos(db_url = "sqlite:///data/imdb.db", faixas = None,
+                                   tamanho_bloco = 100_000):
+    """
+    Mesmo resultado de resumo_categoria_ano(adicionar_categoria(df_movies,
+    faixas)), calculado bloco a bloco: cada bloco é classificado e contado
+    (groupby(['categoria', 'year']).size()) e as contagens parciais são
+    somadas. Só as contagens (categorias × anos) ficam em memória.
+
+    Parâmetros:
+        db_url (str, opcional): URL de conexão com o banco.
+            Padrão: 'sqlite:///data/imdb.db'.
+        faixas (dict, opcional): Faixas de classificação (ver validar_faixas).
+        tamanho_bloco (int, opcional): Linhas por bloco. Padrão: 100000.
+
+    Retorno:
+        pandas.DataFrame: Tabela resumo com categorias nas linhas e anos nas colunas.
+    """
+    contagem = None
+    for bloco in carregar_movies_em_blocos(db_url, tamanho_bloco, colunas=['rating', 'year']):
+        bloco['categoria'] = classificar_notas(bloco['rating'], faixas)
+        parcial = bloco.groupby(['categoria', 'year'], observed=True).size()
+        if contagem is None:
+            contagem = parcial
+        else:
+            contagem = pd.concat([contagem, parcial]).groupby(level=[0, 1], observed=True).sum()
+
+    if contagem is None:
+        # Tabela vazia: mesmo resultado do caminho em memória
+        vazio = pd.DataFrame({'categoria': classificar_notas(pd.Series([], dtype='float64'), faixas),
+                              'year': pd.Series([], dtype='Int16')})
+        return resumo_categoria_ano(vazio)
+    return renderizar_resumo(contagem)
+
+
+def resumo_categoria_ano_materializado(db_url = "sqlite:///data/imdb.db", faixas = None):
+    """
+    Mesmo resultado de resumo_categoria_ano(adicionar_categoria(df_movies,
+    faixas)), lido da tabela 'movies_resumo' (quantidade de filmes por
+    ano e nota, mantida pelos gatilhos do banco; ver
+    database.criar_resumo_movies), sem ler a tabela 'movies'.
+
+    A leitura traz uma linha por combinação (ano, nota) existente, e a
+    classificação e a tabela final (ver renderizar_resumo) são feitas
+    sobre essas poucas linhas. Em bancos que não são SQLite (sem os
+    gatilhos), as mesmas contagens vêm de um GROUP BY em 'movies'.
+
+    Parâmetros:
+        db_url (str, opcional): URL de conexão com o banco.
+            Padrão: 'sqlite:///data/imdb.db'.
+        faixas (dict, opcional): Faixas de classificação (ver validar_faixas).
+
+    Retorno:
+        pandas.DataFrame: Tabela resumo com categorias nas linhas e anos nas colunas.
+    """
+    engine = obter_engine(db_url)
+    if engine.dialect.name == 'sqlite':
+        consulta = select(MovieResumoDB.__table__)
+    else:
+        movies = MovieDB.__table__
+        nota = func.coalesce(movies.c.rating, AUSENTE)
+        consulta = (
+            select(movies.c.year, nota.label('rating'), func.count().label('quantidade'))
+            .where(movies.c.year.is_not(None))
+            .group_by(movies.c.year, nota)
+        )
+    with engine.connect() as conexao:
+        contagens = pd.read_sql(consulta, con=conexao)
+    return resumo_das_contagens(contagens, faixas)
+
+
+def resumo_das_contagens(contagens, faixas = None):
+    """
+    Monta o resumo por categoria e ano a partir das contagens por ano e
+    nota (linhas de 'movies_resumo').
+
+    Parâmetros:
+        contagens (pandas.DataFrame): Colunas 'year', 'rating' (AUSENTE
+            para filmes sem nota) e 'quantidade'.
+        faixas (dict, opcional): Faixas de classificação (ver validar_faixas).
+
+    Retorno:
+        pandas.DataFrame: Tabela resumo (ver resumo_categoria_ano).
+    """
+    # Anos no tipo compacto (ver TIPOS_COMPACTOS), de modo que as colunas
+    # do resumo saem com o mesmo tipo do caminho em memória
+    notas = contagens['rating'].where(contagens['rating'] != AUSENTE)
+    contagens = contagens.assign(
+        categoria=classificar_notas(notas, faixas),
+        year=contagens['year'].astype(TIPOS_COMPACTOS['year']),
+    )
+    return renderizar_resumo(
+        contagens.groupby(['categoria', 'year'], observed=True)['quantidade'].sum()
+    )
+
+
+def melhores_movies_em_blocos(db_url = "sqlite:///data/imdb.db", n = 5, nota_min = None,
+                              nota_min_inclusiva = True, tamanho_bloco = 100_000):
+    """
+    Seleciona os 'n' filmes de maior nota (empates pelo menor 'id'),
+    lendo a tabela em blocos e mantendo apenas um heap com os 'n'
+    melhores vistos até o momento.
+
+    O resultado é o mesmo de filtrar a tabela inteira em memória e
+    ordenar por ['-rating', 'id'] (ver consultar_movies). Filmes sem
+    nota ficam de fora.
+
+    Parâmetros:
+        db_url (str, opcional): URL de conexão com o banco.
+            Padrão: 'sqlite:///data/imdb.db'.
+        n (int, opcional): Quantidade de filmes. Padrão: 5.
+        nota_min (float, opcional): Nota mínima.
+        nota_min_inclusiva (bool, opcional): Se False, a nota precisa ser
+            estritamente maior que nota_min. Padrão: True.
+        tamanho_bloco (int, opcional): Linhas por bloco. Padrão: 100000.
+
+    Retorno:
+        pandas.DataFrame: Os 'n' melhores filmes, do melhor para o pior.
+    """
+    # Heap de mínimo com (nota, -id, linha): o topo é o pior dos 'n' guardados
+    heap = []
+    colunas = tipos = None
+    for bloco in carregar_movies_em_blocos(db_url, tamanho_bloco):
+        colunas, tipos = list(bloco.columns), bloco.dtypes.to_dict()
+        bloco = bloco[bloco['rating'].notna()]
+        if nota_min is not None:
+            bloco = bloco[bloco['rating'] >= nota_min if nota_min_inclusiva else bloco['rating'] > nota_min]
+        # Só os 'n' melhores de cada bloco podem entrar no heap
+        candidatos = bloco.sort_values(['rating', 'id'], ascending=[False, True]).head(n)
+        for linha in candidatos.itertuples(index=False):
+            chave = (float(linha.rating), -int(linha.id), tuple(linha))
+            if len(heap) < n:
+                heapq.heappush(heap, chave)
+            elif chave[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, chave)
+
+    if colunas is None:
+        return pd.DataFrame(columns=list(MovieDB.__table__.columns.keys()))
+    linhas = [linha for *_, linha in sorted(heap, key=lambda chave: chave[:2], reverse=True)]
+    return pd.DataFrame(linhas, columns=colunas).astype(tipos)
 
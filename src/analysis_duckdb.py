@@ -0,0 +1,279 @@
+"""
+Backend analítico opcional com DuckDB.
+
+Em vez de trazer as tabelas inteiras para o Pandas (pd.read_sql decodifica
+o SQL linha a linha e os groupby rodam em uma thread), o DuckDB lê o banco
+SQLite (extensão 'sqlite', somente leitura) ou os arquivos Parquet da
+exportação e executa filtro, ordenação, classificação das notas e
+contagens por categoria e ano como SQL vetorizado, em várias threads.
+Os resultados são os mesmos das funções de src/analysis.py.
+
+O duckdb é opcional: sem ele, criar AnaliseDuckDB lança RuntimeError e o
+caminho padrão (SQLite + Pandas) continua disponível.
+"""
+import os
+import threading
+
+import pandas as pd
+from sqlalchemy.dialects import sqlite
+
+from .analysis import (
+    expressao_categoria_sql, montar_consulta, renderizar_resumo, validar_faixas, TIPOS_COMPACTOS,
+)
+from .database import MovieDB
+from .metrics import instrumentar
+
+# duckdb é opcional e só é importado no primeiro uso (ver importar_duckdb)
+_duckdb = None
+
+# Origens dos dados aceitas por AnaliseDuckDB
+FONTES = ('sqlite', 'parquet')
+
+# Tabelas disponíveis nas consultas
+TABELAS = ('movies', 'series')
+
+# Tipos inteiros gravados no Parquet com os tipos compactos (ver
+# TIPOS_COMPACTOS) -> expressão que devolve o valor no tipo do banco
+CONVERSOES_PARQUET = {
+    'TINYINT': 'CAST("{coluna}" AS BIGINT)',
+    'SMALLINT': 'CAST("{coluna}" AS BIGINT)',
+    'INTEGER': 'CAST("{coluna}" AS BIGINT)',
+}
+
+
+def importar_duckdb():
+    """
+    Importa o duckdb no primeiro uso e o guarda para as chamadas seguintes.
+
+    Retorno:
+        module ou None: O módulo duckdb, ou None se não estiver instalado.
+    """
+    global _duckdb
+    if _duckdb is None:
+        try:
+            import duckdb
+        except ImportError:
+            _duckdb = False
+        else:
+            _duckdb = duckdb
+    return _duckdb or None
+
+
+def para_sql_duckdb(consulta):
+    """
+    Converte um SELECT do SQLAlchemy (ex.: de montar_consulta) em texto SQL
+    e parâmetros posicionais ('?') para o DuckDB.
+
+    Parâmetros:
+        consulta (sqlalchemy.Select): Consulta sobre as tabelas do banco.
+
+    Retorno:
+        tuple: (sql, parametros).
+    """
+    compilada = consulta.compile(dialect=sqlite.dialect())
+    return str(compilada), [compilada.params[nome] for nome in compilada.positiontup]
+
+
+class AnaliseDuckDB:
+    """
+    Consultas de análise (Ex. 8, 9 e 10) executadas pelo DuckDB.
+
+    Com fonte 'sqlite', o banco é anexado somente para leitura (extensão
+    'sqlite' do DuckDB, instalada no primeiro uso, o que exige acesso à
+    rede) e as consultas sempre veem os dados atuais. Com fonte
+    'parquet', 'movies' e 'series' são lidas de
+    <pasta_parquet>/movies.parquet e series.parquet (formato 'parquet' da
+    exportação), ou seja, refletem a última exportação.
+
+    A conexão pode ser usada por várias threads ao mesmo tempo: cada
+    consulta roda em um cursor próprio.
+
+    Uso:
+        with AnaliseDuckDB('data/imdb.db') as analise:
+            analise.consultar_movies(nota_min=9.0, ordenar_por=['-rating', 'id'], limite=5)
+
+    Atributos:
+        caminho_banco (str): Banco SQLite lido com a fonte 'sqlite'.
+        fonte (str): 'sqlite' ou 'parquet'.
+        pasta_parquet (str): Pasta dos arquivos Parquet da fonte 'parquet'.
+        threads (int ou None): Threads do DuckDB (None: uma por núcleo).
+    """
+    def __init__(self, caminho_banco = 'data/imdb.db', fonte = 'sqlite', pasta_parquet = 'data',
+                 threads = None):
+        duckdb = importar_duckdb()
+        if duckdb is None:
+            raise RuntimeError('O backend "duckdb" da análise exige o pacote duckdb (pip install duckdb).')
+        if fonte not in FONTES:
+            raise ValueError(f'Fonte desconhecida para o DuckDB: "{fonte}" (use {" ou ".join(FONTES)})')
+
+        self.caminho_banco = caminho_banco
+        self.fonte = fonte
+        self.pasta_parquet = pasta_parquet
+        self.threads = threads
+        self._trava = threading.Lock()
+        self._conexao = duckdb.connect()
+        try:
+            if threads:
+                self._conexao.execute(f'SET threads = {int(threads)}')
+            # Mesma posição dos nulos que no SQLite: primeiro na ordem
+            # crescente, por último na decrescente
+            self._conexao.execute("SET default_null_order = 'nulls_first_on_asc_last_on_desc'")
+            if fonte == 'sqlite':
+                self._anexar_sqlite()
+            else:
+                self._criar_visoes_parquet()
+        except Exception:
+            self._conexao.close()
+            raise
+
+    def _anexar_sqlite(self):
+        if not os.path.exists(self.caminho_banco):
+            raise FileNotFoundError(f'Banco não encontrado: "{self.caminho_banco}"')
+        caminho = os.path.abspath(self.caminho_banco).replace("'", "''")
+        self._carregar_extensao_sqlite()
+        self._conexao.execute(f"ATTACH '{caminho}' AS imdb (TYPE sqlite, READ_ONLY)")
+        # Visões com os nomes das tabelas: as consultas (e os cursores, que
+        # não herdam um USE) escrevem só 'movies'
+        for tabela in TABELAS:
+            self._conexao.execute(f'CREATE VIEW {tabela} AS SELECT * FROM imdb.{tabela}')
+
+    def _carregar_extensao_sqlite(self):
+        # Já instalada, a extensão carrega sem rede; o INSTALL (download do
+        # repositório do DuckDB) fica só para o primeiro uso
+        erro_duckdb = importar_duckdb().Error
+        try:
+            self._conexao.execute('LOAD sqlite')
+            return
+        except erro_duckdb:
+            pass
+        try:
+            self._conexao.execute('INSTALL sqlite')
+            self._conexao.execute('LOAD sqlite')
+        except erro_duckdb as erro:
+            raise RuntimeError(
+                'Não foi possível instalar a extensão "sqlite" do DuckDB (o download exige acesso à '
+                'rede). Instale-a antes, com acesso à rede: python -c "import duckdb; '
+                'duckdb.sql(\'INSTALL sqlite\')"; ou use duckdb.fonte igual a "parquet" '
+                f'na configuração. Erro do DuckDB: {erro}'
+            ) from erro
+
+    def _criar_visoes_parquet(self):
+        for tabela in TABELAS:
+            caminho = os.path.join(self.pasta_parquet, f'{tabela}.parquet')
+            if not os.path.exists(caminho):
+                raise FileNotFoundError(
+                    f'Arquivo não encontrado: "{caminho}" (exporte antes no formato "parquet")'
+                )
+            origem = "read_parquet('{}')".format(os.path.abspath(caminho).replace("'", "''"))
+            # Colunas gravadas com os tipos compactos voltam aos tipos do banco
+            colunas = [
+                CONVERSOES_PARQUET.get(tipo, '"{coluna}"').format(coluna=nome) + f' AS "{nome}"'
+                for nome, tipo, *_ in self._conexao.execute(f'DESCRIBE SELECT * FROM {origem}').fetchall()
+            ]
+            self._conexao.execute(f'CREATE VIEW {tabela} AS SELECT {", ".join(colunas)} FROM {origem}')
+
+    def executar(self, sql, parametros = None):
+        """
+        Executa uma consulta e devolve o resultado como tabela Arrow.
+
+        Parâmetros:
+            sql (str): Consulta, com parâmetros posicionais ('?').
+            parametros (list, opcional): Valores dos parâmetros.
+
+        Retorno:
+            pyarrow.Table: Resultado da consulta.
+        """
+        with self._trava:
+            cursor = self._conexao.cursor()
+        try:
+            return cursor.execute(sql, parametros or []).fetch_arrow_table()
+        finally:
+            cursor.close()
+
+    def executar_dataframe(self, sql, parametros = None):
+        """
+        Executa uma consulta e devolve um DataFrame com colunas Arrow
+        (pandas.ArrowDtype), sem converter os dados para objetos Python.
+
+        Parâmetros:
+            sql (str): Consulta, com parâmetros posicionais ('?').
+            parametros (list, opcional): Valores dos parâmetros.
+
+        Retorno:
+            pandas.DataFrame: Resultado da consulta.
+        """
+        return self.executar(sql, parametros).to_pandas(types_mapper=pd.ArrowDtype)
+
+    @instrumentar('duckdb_consultar_movies', contar=lambda df: {'linhas': len(df)})
+    def consultar_movies(self, nota_min = None, nota_max = None, nota_min_inclusiva = True,
+                         ano_min = None, ano_max = None, prefixo_titulo = None, ordenar_por = None,
+                         limite = None, colunas = None, faixas_categoria = None):
+        """
+        Mesma consulta de analysis.consultar_movies (filtros, ordenação,
+        limite e, com faixas_categoria, a coluna 'categoria'), executada
+        pelo DuckDB. Sem filtros e com faixas_categoria, equivale a
+        adicionar_categoria sobre a tabela inteira (Ex. 9).
+
+        Parâmetros:
+            Ver analysis.consultar_movies.
+
+        Retorno:
+            pandas.DataFrame: Linhas de 'movies' que atendem aos filtros,
+            com colunas Arrow; 'categoria' é um Categorical ordenado, como
+            no caminho padrão.
+        """
+        consulta = montar_consulta(
+            MovieDB.__table__, nota_min=nota_min, nota_max=nota_max,
+            nota_min_inclusiva=nota_min_inclusiva, ano_min=ano_min, ano_max=ano_max,
+            prefixo_titulo=prefixo_titulo, ordenar_por=ordenar_por, limite=limite,
+            colunas=colunas, faixas_categoria=faixas_categoria,
+        )
+        df_resultado = self.executar_dataframe(*para_sql_duckdb(consulta))
+
+        if faixas_categoria is not None:
+            _, rotulos = validar_faixas(faixas_categoria)
+            df_resultado['categoria'] = pd.Categorical(
+                df_resultado['categoria'].astype(object), categories=rotulos, ordered=True
+            )
+        return df_resultado
+
+    @instrumentar('duckdb_resumo_categoria_ano')
+    def resumo_categoria_ano(self, faixas = None):
+        """
+        Mesmo resultado de resumo_categoria_ano(adicionar_categoria(df_movies,
+        faixas)): a classificação das notas (CASE, ver
+        expressao_categoria_sql) e as contagens por (categoria, ano) rodam
+        no DuckDB, e só as contagens (categorias × anos) chegam ao Pandas
+        para montar a tabela (ver renderizar_resumo).
+
+        Parâmetros:
+            faixas (dict, opcional): Faixas de classificação (ver validar_faixas).
+
+        Retorno:
+            pandas.DataFrame: Tabela resumo com categorias nas linhas e anos nas colunas.
+        """
+        _, rotulos = validar_faixas(faixas)
+        movies = MovieDB.__table__
+        sql, parametros = para_sql_duckdb(expressao_categoria_sql(movies.c.rating, faixas).element)
+        contagens = self.executar(
+            f'SELECT {sql} AS categoria, year, count(*) AS quantidade FROM movies '
+            'WHERE year IS NOT NULL GROUP BY ALL',
+            parametros,
+        ).to_pandas()
+
+        # Notas ausentes ficam na primeira categoria (o ELSE do CASE), como em classificar_notas
+        contagens['categoria'] = pd.Categorical(contagens['categoria'], categories=rotulos, ordered=True)
+        contagens['year'] = contagens['year'].astype(TIPOS_COMPACTOS['year'])
+        return renderizar_resumo(contagens.set_index(['categoria', 'year'])['quantidade'])
+
+    def fechar(self):
+        """
+        Fecha a conexão com o DuckDB.
+        """
+        self._conexao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
@@ -0,0 +1,74 @@
+"""
+Escrita atômica de arquivos (temporário na mesma pasta + os.replace).
+
+Só depende da biblioteca padrão, de modo que a coleta, as métricas, o
+pipeline e os benchmarks gravam seus arquivos sem importar o Pandas.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def modo_arquivo_novo():
+    # Permissões de um arquivo criado com open() (0o666 menos a umask);
+    # a umask só pode ser lida trocando-a, e é devolvida logo em seguida
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def escrever_atomico(caminho, funcao_escrita):
+    """
+    Escreve um arquivo de forma atômica: o conteúdo vai para um arquivo
+    temporário na mesma pasta, que depois substitui o destino com
+    os.replace. Quem lê o arquivo vê a versão antiga ou a nova, nunca
+    uma escrita pela metade.
+
+    O arquivo final mantém as permissões do destino anterior ou, se ele
+    não existia, recebe as de um arquivo criado com open() (o
+    temporário do mkstemp nasce legível só pelo dono).
+
+    Parâmetros:
+        caminho (str): Caminho final do arquivo.
+        funcao_escrita (callable): Função que recebe o caminho temporário
+            e escreve nele o conteúdo.
+
+    Retorno:
+        int: Tamanho do arquivo gravado, em bytes.
+    """
+    with temporario_atomico(caminho) as temporario:
+        funcao_escrita(temporario)
+    return os.path.getsize(caminho)
+
+
+@contextmanager
+def temporario_atomico(caminho):
+    """
+    Versão de escrever_atomico em gerenciador de contexto, para escritas
+    que não cabem em uma função (ex.: um gerador que grava cada item e o
+    repassa adiante): o bloco 'with' recebe o caminho temporário, que
+    substitui o destino quando o bloco termina sem erro e é removido se o
+    bloco lança uma exceção (inclusive GeneratorExit, quando o gerador é
+    fechado antes do fim).
+
+    Parâmetros:
+        caminho (str): Caminho final do arquivo.
+
+    Retorno:
+        str: Caminho do arquivo temporário (no 'as' do 'with').
+    """
+    pasta, nome = os.path.split(caminho)
+    descritor, temporario = tempfile.mkstemp(dir=pasta or '.', prefix=f'.{nome}.', suffix='.tmp')
+    os.close(descritor)
+    try:
+        yield temporario
+        try:
+            modo = os.stat(caminho).st_mode & 0o7777
+        except FileNotFoundError:
+            modo = modo_arquivo_novo()
+        os.chmod(temporario, modo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
@@ -1,13 +1,48 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float
+import hashlib
+import json
+import threading
+import unicodedata
+from datetime import datetime
+
+from sqlalchemy import (
+    create_engine, event, inspect, text, func, Column, ForeignKey, Index, Integer,
+    String, Float, DateTime, select, and_, or_
+)
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.dialects import sqlite, postgresql
 
-from .models import Movie, Series  # import relativo
+from .models import Movie, Series, Catalog, AUSENTE  # import relativo
+from .metrics import instrumentar
 
 
 # Criando a base para o ORM
 Base = declarative_base()
 
+# Dialetos que suportam INSERT ... ON CONFLICT (usados na gravação em lote)
+INSERTS_COM_CONFLITO = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+# PRAGMAs aplicados a cada nova conexão SQLite:
+#   - WAL permite leitores (análise, exportação) em paralelo com um escritor;
+#   - synchronous=NORMAL é seguro em WAL e evita um fsync por commit;
+#   - cache de 64 MB, leitura por mmap de até 256 MB e temporários em memória;
+#   - busy_timeout espera (em vez de falhar) quando outro escritor segura o banco.
+PRAGMAS_SQLITE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+
+# Engines já criadas no processo, uma por URL (ver obter_engine)
+_engines = {}
+_trava_engines = threading.Lock()
+
 
 class MovieDB(Base):
     """
@@ -18,13 +53,38 @@ class MovieDB(Base):
         title (str): Título do filme (único, não nulo).
         year (int): Ano de lançamento.
         rating (float): Nota do filme no IMDb.
+        imdb_id (str): Identificador do título no IMDb (ex.: 'tt0111161').
+        genres (str): Gêneros separados por vírgula (enriquecimento).
+        runtime (int): Duração em minutos (enriquecimento).
+        directors (str): Diretores separados por vírgula (enriquecimento).
+        enriched_at (datetime): Momento do último enriquecimento.
+        updated_at (datetime): Momento da última inserção ou alteração da linha.
+        seq (int): Número da última inserção ou alteração da linha, crescente
+            na ordem em que as gravações são confirmadas (mantido pelos
+            gatilhos de gatilhos_sequencia; usado na exportação incremental).
+
+    Índices:
+        ix_movies_rating: filtros e ordenação por nota.
+        ix_movies_year_rating: filtros por ano (e por ano + nota); também
+            atende consultas só por ano, por ser o primeiro campo.
     """
     __tablename__ = 'movies'
+    __table_args__ = (
+        Index('ix_movies_rating', 'rating'),
+        Index('ix_movies_year_rating', 'year', 'rating'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String, nullable=False, unique=True)
     year = Column(Integer)
     rating = Column(Float)
+    imdb_id = Column(String, index=True)
+    genres = Column(String)
+    runtime = Column(Integer)
+    directors = Column(String)
+    enriched_at = Column(DateTime)
+    updated_at = Column(DateTime, index=True, default=datetime.now, onupdate=datetime.now)
+    seq = Column(Integer, index=True)
 
     def __repr__(self):
         return f'"{self.title}" ({self.year}) - Nota: {self.rating}'
@@ -40,6 +100,15 @@ class SeriesDB(Base):
         year (int): Ano de lançamento.
         seasons (int): Quantidade de temporadas.
         episodes (int): Quantidade de episódios.
+        imdb_id (str): Identificador do título no IMDb (ex.: 'tt0903747').
+        genres (str): Gêneros separados por vírgula (enriquecimento).
+        runtime (int): Duração típica de um episódio, em minutos (enriquecimento).
+        directors (str): Criadores/diretores separados por vírgula (enriquecimento).
+        enriched_at (datetime): Momento do último enriquecimento.
+        updated_at (datetime): Momento da última inserção ou alteração da linha.
+        seq (int): Número da última inserção ou alteração da linha, crescente
+            na ordem em que as gravações são confirmadas (mantido pelos
+            gatilhos de gatilhos_sequencia; usado na exportação incremental).
     """
     __tablename__ = 'series'
 
@@ -48,14 +117,371 @@ class SeriesDB(Base):
     year = Column(Integer)
     seasons = Column(Integer)
     episodes = Column(Integer)
+    imdb_id = Column(String, index=True)
+    genres = Column(String)
+    runtime = Column(Integer)
+    directors = Column(String)
+    enriched_at = Column(DateTime)
+    updated_at = Column(DateTime, index=True, default=datetime.now, onupdate=datetime.now)
+    seq = Column(Integer, index=True)
 
     def __repr__(self):
         return f'"{self.title}" ({self.year}) - Temporadas: {self.seasons}, Episódios: {self.episodes}'
 
 
+class EnrichmentCheckpointDB(Base):
+    """
+    Classe de mapeamento ORM para a tabela 'enrichment_checkpoint', que
+    registra o andamento do enriquecimento (páginas de detalhe dos títulos).
+
+    Permite retomar o enriquecimento após uma falha sem baixar novamente
+    os títulos já concluídos.
+
+    Campos:
+        imdb_id (str): Identificador do título no IMDb (chave primária).
+        kind (str): 'movie' ou 'series'.
+        status (str): 'ok' (concluído) ou 'erro' (será tentado de novo).
+        payload (str): Dados extraídos da página, em JSON.
+        attempts (int): Quantidade de tentativas já feitas.
+        updated_at (datetime): Momento da última tentativa.
+    """
+    __tablename__ = 'enrichment_checkpoint'
+
+    imdb_id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    payload = Column(String)
+    attempts = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'{self.imdb_id} ({self.kind}) - {self.status} em {self.updated_at}'
+
+
+class RankingRunDB(Base):
+    """
+    Classe de mapeamento ORM para a tabela 'ranking_runs': uma linha por
+    coleta de ranking que trouxe alguma mudança.
+
+    Campos:
+        id (int): Chave primária, autoincremento (identificador da coleta).
+        source (str): Nome do ranking (ex.: 'top_filmes').
+        observed_at (datetime): Momento da coleta.
+        payload_hash (str): SHA-256 das posições e notas coletadas.
+        rows_total (int): Quantidade de títulos no ranking.
+        rows_changed (int): Quantidade de linhas gravadas em 'ranking_snapshots'.
+    """
+    __tablename__ = 'ranking_runs'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source = Column(String, nullable=False, index=True)
+    observed_at = Column(DateTime, nullable=False)
+    payload_hash = Column(String, nullable=False)
+    rows_total = Column(Integer, nullable=False)
+    rows_changed = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f'Coleta {self.id} de {self.source} em {self.observed_at} ({self.rows_changed} mudanças)'
+
+
+class RankingSnapshotDB(Base):
+    """
+    Classe de mapeamento ORM para a tabela 'ranking_snapshots', com o
+    histórico das posições e notas de cada título nos rankings.
+
+    Só são gravadas as linhas que mudaram em relação à coleta anterior
+    (título novo, posição ou nota diferente, ou saída do ranking, com
+    rank nulo), de modo que a tabela cresce com as mudanças, e não com
+    a quantidade de coletas.
+
+    Campos:
+        id (int): Chave primária, autoincremento.
+        run_id (int): Coleta em que a mudança foi observada.
+        source (str): Nome do ranking.
+        observed_at (datetime): Momento da coleta.
+        imdb_id (str): Identificador do título no IMDb.
+        title (str): Título (também usado como chave quando não há imdb_id).
+        rank (int): Posição no ranking (nulo quando o título saiu do ranking).
+        rating (float): Nota no IMDb.
+        votes (int): Quantidade de votos.
+    """
+    __tablename__ = 'ranking_snapshots'
+    __table_args__ = (
+        Index('ix_ranking_snapshots_source_imdb_id', 'source', 'imdb_id'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(Integer, ForeignKey('ranking_runs.id'), nullable=False, index=True)
+    source = Column(String, nullable=False)
+    observed_at = Column(DateTime, nullable=False)
+    imdb_id = Column(String)
+    title = Column(String, nullable=False)
+    rank = Column(Integer)
+    rating = Column(Float)
+    votes = Column(Integer)
+
+    def __repr__(self):
+        return f'{self.source} #{self.rank}: "{self.title}" - Nota: {self.rating}'
+
+
+class MovieResumoDB(Base):
+    """
+    Classe de mapeamento ORM para a tabela 'movies_resumo': quantidade de
+    filmes de 'movies' por ano e nota, mantida pelo próprio banco (ver
+    GATILHOS_RESUMO_MOVIES) a cada inserção, alteração ou remoção.
+
+    A tabela guarda a nota, e não a categoria, de modo que continua
+    válida quando as faixas de categoria do config mudam: o resumo por
+    categoria e ano é montado a partir dela, sem ler 'movies'.
+
+    Campos:
+        year (int): Ano de lançamento (filmes sem ano ficam de fora,
+            como no resumo calculado com Pandas).
+        rating (float): Nota no IMDb (AUSENTE = -1 para filmes sem nota).
+        quantidade (int): Quantidade de filmes com esse ano e essa nota.
+    """
+    __tablename__ = 'movies_resumo'
+
+    year = Column(Integer, primary_key=True)
+    rating = Column(Float, primary_key=True)
+    quantidade = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f'{self.year} - Nota: {self.rating} ({self.quantidade} filmes)'
+
+
+class SequenciaAlteracoesDB(Base):
+    """
+    Classe de mapeamento ORM para a tabela 'sequencia_alteracoes': uma
+    única linha com o contador das inserções e alterações de 'movies' e
+    'series', incrementado pelos gatilhos de gatilhos_sequencia.
+
+    Campos:
+        id (int): Chave primária (sempre 1).
+        valor (int): Último número atribuído à coluna 'seq' das tabelas.
+    """
+    __tablename__ = 'sequencia_alteracoes'
+
+    id = Column(Integer, primary_key=True)
+    valor = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f'Sequência de alterações: {self.valor}'
+
+
+# Gatilhos (SQLite) que mantêm 'movies_resumo' em dia com 'movies'. Cada
+# linha inserida, alterada (ano ou nota) ou removida soma ou subtrai 1 da
+# combinação (ano, nota); combinações que chegam a zero são removidas.
+GATILHOS_RESUMO_MOVIES = {
+    'movies_resumo_ai': f"""
+        CREATE TRIGGER movies_resumo_ai AFTER INSERT ON movies
+        WHEN NEW.year IS NOT NULL
+        BEGIN
+            INSERT INTO movies_resumo (year, rating, quantidade)
+            VALUES (NEW.year, COALESCE(NEW.rating, {AUSENTE}), 1)
+            ON CONFLICT (year, rating) DO UPDATE SET quantidade = quantidade + 1;
+        END
+    """,
+    'movies_resumo_ad': f"""
+        CREATE TRIGGER movies_resumo_ad AFTER DELETE ON movies
+        WHEN OLD.year IS NOT NULL
+        BEGIN
+            UPDATE movies_resumo SET quantidade = quantidade - 1
+            WHERE year = OLD.year AND rating = COALESCE(OLD.rating, {AUSENTE});
+            DELETE FROM movies_resumo
+            WHERE year = OLD.year AND rating = COALESCE(OLD.rating, {AUSENTE}) AND quantidade <= 0;
+        END
+    """,
+    'movies_resumo_au': f"""
+        CREATE TRIGGER movies_resumo_au AFTER UPDATE OF year, rating ON movies
+        WHEN OLD.year IS NOT NEW.year OR OLD.rating IS NOT NEW.rating
+        BEGIN
+            UPDATE movies_resumo SET quantidade = quantidade - 1
+            WHERE year = OLD.year AND rating = COALESCE(OLD.rating, {AUSENTE});
+            DELETE FROM movies_resumo
+            WHERE year = OLD.year AND rating = COALESCE(OLD.rating, {AUSENTE}) AND quantidade <= 0;
+            INSERT INTO movies_resumo (year, rating, quantidade)
+            SELECT NEW.year, COALESCE(NEW.rating, {AUSENTE}), 1 WHERE NEW.year IS NOT NULL
+            ON CONFLICT (year, rating) DO UPDATE SET quantidade = quantidade + 1;
+        END
+    """,
+}
+
+
+# Índices de busca por título (SQLite FTS5), com filmes e séries juntos:
+#   - titulos_fts: palavras sem acento e sem diferença de maiúsculas
+#     (unicode61 remove_diacritics 2), com índices de prefixo de 2 e 3 letras;
+#   - titulos_trigrama: trechos de 3 caracteres dos títulos sem acento (ver
+#     normalizar_titulo), para títulos digitados com erro (só guarda em que
+#     títulos cada trecho aparece, sem as posições: detail = 'none');
+#   - titulos_trigrama_vocab: em quantos títulos aparece cada trecho;
+#   - titulos_pendentes: títulos alterados que ainda não chegaram aos índices
+#     (ver gatilhos_busca e sincronizar_indice_busca).
+# O rowid codifica a origem de cada título: id * 2 em 'movies' e id * 2 + 1 em 'series'.
+TABELAS_BUSCA = {
+    'titulos_fts': """
+        CREATE VIRTUAL TABLE titulos_fts USING fts5(
+            title, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )
+    """,
+    'titulos_trigrama': "CREATE VIRTUAL TABLE titulos_trigrama USING fts5(title, tokenize = 'trigram', detail = 'none')",
+    'titulos_trigrama_vocab': "CREATE VIRTUAL TABLE titulos_trigrama_vocab USING fts5vocab(titulos_trigrama, 'row')",
+    'titulos_pendentes': 'CREATE TABLE titulos_pendentes (chave INTEGER PRIMARY KEY)',
+}
+
+# Tabelas de títulos cobertas pela busca, com o valor somado a id * 2 no rowid
+ORIGENS_BUSCA = {'movies': 0, 'series': 1}
+
+
+class _TabelaSemAcentos(dict):
+    # Tabela de str.translate: código do caractere -> caractere sem acento,
+    # calculada no primeiro uso de cada caractere
+    def __missing__(self, codigo):
+        decomposto = unicodedata.normalize('NFKD', chr(codigo))
+        self[codigo] = ''.join(c for c in decomposto if not unicodedata.combining(c))
+        return self[codigo]
+
+
+_SEM_ACENTOS = _TabelaSemAcentos()
+
+
+def normalizar_titulo(texto):
+    """
+    Remove acentos e diferenças de maiúsculas, como o índice de palavras
+    (unicode61 remove_diacritics 2) faz com os títulos. É o texto gravado
+    em titulos_trigrama, já que o tokenizador 'trigram' só remove acentos
+    a partir do SQLite 3.45.
+
+    Parâmetros:
+        texto (str): Texto a normalizar.
+
+    Retorno:
+        str: Texto sem acentos, em minúsculas.
+    """
+    return texto.translate(_SEM_ACENTOS).casefold()
+
+
+def gatilhos_busca(tabela, origem):
+    """
+    Monta os gatilhos que anotam em titulos_pendentes os títulos inseridos,
+    alterados ou removidos de uma tabela de títulos.
+
+    Os gatilhos não alteram os índices FTS5 diretamente: cada comando com
+    gatilho roda em um savepoint, e o FTS5 grava em disco o que tem em
+    memória a cada savepoint, o que deixava a gravação em lote cerca de
+    6 vezes mais lenta. As anotações são aplicadas de uma vez por
+    sincronizar_indice_busca.
+
+    Parâmetros:
+        tabela (str): 'movies' ou 'series'.
+        origem (int): Valor somado a id * 2 no rowid (ver ORIGENS_BUSCA).
+
+    Retorno:
+        dict: Nome do gatilho -> comando CREATE TRIGGER.
+    """
+    def anotar(registro):
+        return f'INSERT OR IGNORE INTO titulos_pendentes (chave) VALUES ({registro}.id * 2 + {origem});\n'
+
+    return {
+        f'{tabela}_busca_ai': f'CREATE TRIGGER {tabela}_busca_ai AFTER INSERT ON {tabela} '
+                              f'BEGIN\n{anotar("NEW")}END',
+        f'{tabela}_busca_ad': f'CREATE TRIGGER {tabela}_busca_ad AFTER DELETE ON {tabela} '
+                              f'BEGIN\n{anotar("OLD")}END',
+        f'{tabela}_busca_au': f'CREATE TRIGGER {tabela}_busca_au AFTER UPDATE OF id, title ON {tabela} '
+                              f'BEGIN\n{anotar("OLD")}{anotar("NEW")}END',
+    }
+
+
+TABELAS_SEQUENCIA = ('movies', 'series')
+
+
+def gatilhos_sequencia(tabela):
+    """
+    Monta os gatilhos que numeram as inserções e alterações de uma tabela
+    de títulos na coluna 'seq', com o contador de 'sequencia_alteracoes'.
+
+    No SQLite só uma transação grava por vez, do primeiro comando até o
+    commit, de modo que os números crescem na ordem dos commits: uma
+    leitura nunca vê um número maior antes de um menor que ainda vai ser
+    confirmado, como acontece com 'updated_at' (a hora é tomada antes da
+    gravação). A alteração feita pelo próprio gatilho, só na coluna
+    'seq', não dispara um novo número.
+
+    Parâmetros:
+        tabela (str): 'movies' ou 'series'.
+
+    Retorno:
+        dict: Nome do gatilho -> comando CREATE TRIGGER.
+    """
+    numerar = (
+        'UPDATE sequencia_alteracoes SET valor = valor + 1 WHERE id = 1;\n'
+        f'UPDATE {tabela} SET seq = (SELECT valor FROM sequencia_alteracoes WHERE id = 1) '
+        'WHERE id = NEW.id;\n'
+    )
+    return {
+        f'{tabela}_seq_ai': f'CREATE TRIGGER {tabela}_seq_ai AFTER INSERT ON {tabela} '
+                            f'BEGIN\n{numerar}END',
+        f'{tabela}_seq_au': f'CREATE TRIGGER {tabela}_seq_au AFTER UPDATE ON {tabela} '
+                            f'WHEN NEW.seq IS OLD.seq BEGIN\n{numerar}END',
+    }
+
+
+def aplicar_pragmas_sqlite(conexao_dbapi, registro_conexao):
+    """
+    Aplica PRAGMAS_SQLITE a uma nova conexão SQLite (evento 'connect').
+
+    Parâmetros:
+        conexao_dbapi (sqlite3.Connection): Conexão recém-aberta.
+        registro_conexao: Registro do pool (não utilizado).
+    """
+    cursor = conexao_dbapi.cursor()
+    for nome, valor in PRAGMAS_SQLITE.items():
+        cursor.execute(f'PRAGMA {nome} = {valor}')
+    cursor.close()
+
+
+def obter_engine(db_url = "sqlite:///data/imdb.db"):
+    """
+    Devolve a engine do processo para a URL informada, criando-a na
+    primeira chamada.
+
+    Todos os módulos (gravação, análise, exportação) compartilham assim a
+    mesma engine e o mesmo pool de conexões para cada banco. Em bancos
+    SQLite, cada conexão nova recebe PRAGMAS_SQLITE.
+
+    Parâmetros:
+        db_url (str, opcional): URL de conexão com o banco.
+            Padrão: 'sqlite:///data/imdb.db'.
+
+    Retorno:
+        sqlalchemy.Engine: Engine compartilhada para a URL informada.
+    """
+    with _trava_engines:
+        engine = _engines.get(db_url)
+        if engine is None:
+            engine = create_engine(db_url)
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', aplicar_pragmas_sqlite)
+            _engines[db_url] = engine
+        return engine
+
+
+def descartar_engines():
+    """
+    Fecha os pools de conexões de todas as engines criadas por
+    obter_engine e esvazia o registro.
+    """
+    with _trava_engines:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
 def criar_engine(db_url = "sqlite:///data/imdb.db"):
     """
-    Cria e devolve um objeto engine do SQLAlchemy para o banco de dados.
+    Devolve um objeto engine do SQLAlchemy para o banco de dados.
+
+    A engine é compartilhada com o restante do processo (ver obter_engine).
 
     Parâmetros:
         db_url (str, opcional): URL de conexão com o banco.
@@ -64,20 +490,259 @@ def criar_engine(db_url = "sqlite:///data/imdb.db"):
     Retorno:
         sqlalchemy.Engine: Engine configurado para a URL informada.
     """
-    return create_engine(db_url)
+    return obter_engine(db_url)
 
 
 def criar_tabelas(engine):
     """
     Cria as tabelas 'movies' e 'series' no banco de dados, caso ainda não existam.
 
+    Em bancos criados por versões anteriores do projeto, as colunas
+    novas são acrescentadas às tabelas existentes (ver migrar_colunas),
+    e a coluna 'seq', o resumo 'movies_resumo' e os índices de busca por
+    título são preenchidos (ver criar_sequencia_alteracoes,
+    criar_resumo_movies e criar_indice_busca).
+
     Parâmetros:
         engine (sqlalchemy.Engine): Engine conectada ao banco onde
             as tabelas serão criadas.
     """
     Base.metadata.create_all(engine)
+    migrar_colunas(engine)
+    criar_sequencia_alteracoes(engine)
+    criar_resumo_movies(engine)
+    criar_indice_busca(engine)
+
+
+def migrar_colunas(engine):
+    """
+    Acrescenta às tabelas já existentes as colunas declaradas nas
+    classes ORM que ainda não existem no banco (ALTER TABLE ... ADD COLUMN),
+    junto com os índices dessas tabelas.
+
+    Apenas acrescenta: nenhuma coluna é removida ou alterada.
+
+    Parâmetros:
+        engine (sqlalchemy.Engine): Engine conectada ao banco.
+    """
+    inspetor = inspect(engine)
+    with engine.begin() as conexao:
+        for tabela in Base.metadata.sorted_tables:
+            existentes = {coluna['name'] for coluna in inspetor.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name in existentes:
+                    continue
+                tipo = coluna.type.compile(dialect=engine.dialect)
+                conexao.execute(text(
+                    f'ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {tipo}'
+                ))
+        for tabela in Base.metadata.sorted_tables:
+            for indice in tabela.indexes:
+                indice.create(conexao, checkfirst=True)
+
+
+def linhas_gravadas(contagem):
+    # Contador de linhas das medições de gravação (ver src/metrics.py)
+    return {'linhas': contagem['inseridos'] + contagem['atualizados'] + contagem['ignorados']}
+
+
+def criar_sequencia_alteracoes(engine):
+    """
+    Cria os gatilhos de gatilhos_sequencia que ainda não existem e, se
+    algum foi criado, numera na mesma transação as linhas já gravadas
+    sem 'seq', na ordem de 'updated_at' e 'id'.
+
+    Só em bancos SQLite; nos demais, 'seq' fica vazia e a exportação
+    incremental não está disponível.
+
+    Parâmetros:
+        engine (sqlalchemy.Engine): Engine conectada ao banco.
+
+    Retorno:
+        bool: True se os gatilhos foram criados agora.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    gatilhos = {}
+    for tabela in TABELAS_SEQUENCIA:
+        gatilhos.update(gatilhos_sequencia(tabela))
+    with engine.begin() as conexao:
+        existentes = set(conexao.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        )).scalars())
+        faltando = [nome for nome in gatilhos if nome not in existentes]
+        if not faltando:
+            return False
+        for nome in faltando:
+            conexao.execute(text(gatilhos[nome]))
+        conexao.execute(text('INSERT OR IGNORE INTO sequencia_alteracoes (id, valor) VALUES (1, 0)'))
+        for tabela in TABELAS_SEQUENCIA:
+            conexao.execute(text(f"""
+                UPDATE {tabela} SET seq = contador.valor + ordem.numero
+                FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY updated_at, id) AS numero
+                      FROM {tabela} WHERE seq IS NULL) AS ordem,
+                     sequencia_alteracoes AS contador
+                WHERE {tabela}.id = ordem.id AND contador.id = 1
+            """))
+            conexao.execute(text(f"""
+                UPDATE sequencia_alteracoes
+                SET valor = MAX(valor, COALESCE((SELECT MAX(seq) FROM {tabela}), 0))
+                WHERE id = 1
+            """))
+    return True
+
+
+def reconstruir_resumo_movies(conexao):
+    """
+    Recalcula 'movies_resumo' inteira a partir de 'movies' (um único
+    GROUP BY). Usada ao criar os gatilhos e para corrigir o resumo.
+
+    Parâmetros:
+        conexao (sqlalchemy.Connection): Conexão dentro de uma transação.
+    """
+    resumo = MovieResumoDB.__table__
+    movies = MovieDB.__table__
+    nota = func.coalesce(movies.c.rating, AUSENTE)
+    conexao.execute(resumo.delete())
+    conexao.execute(resumo.insert().from_select(
+        ['year', 'rating', 'quantidade'],
+        select(movies.c.year, nota, func.count())
+        .where(movies.c.year.is_not(None))
+        .group_by(movies.c.year, nota),
+    ))
+
+
+def criar_resumo_movies(engine):
+    """
+    Cria os gatilhos de GATILHOS_RESUMO_MOVIES que ainda não existem e,
+    se algum foi criado, preenche 'movies_resumo' com os filmes já
+    gravados, na mesma transação (nenhuma gravação fica de fora).
+
+    Só em bancos SQLite; nos demais, o resumo é calculado com GROUP BY
+    na leitura (ver analysis.resumo_categoria_ano_materializado).
+
+    Parâmetros:
+        engine (sqlalchemy.Engine): Engine conectada ao banco.
 
+    Retorno:
+        bool: True se os gatilhos foram criados agora.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.begin() as conexao:
+        existentes = set(conexao.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'movies'"
+        )).scalars())
+        faltando = [nome for nome in GATILHOS_RESUMO_MOVIES if nome not in existentes]
+        if not faltando:
+            return False
+        for nome in faltando:
+            conexao.execute(text(GATILHOS_RESUMO_MOVIES[nome]))
+        reconstruir_resumo_movies(conexao)
+    return True
+
+
+def atualizar_indice_busca(conexao, chaves = None, tamanho_lote = 10000):
+    """
+    Grava nos índices de busca os títulos atuais de 'movies' e 'series' e
+    tira os antigos (ver TABELAS_BUSCA).
 
+    Parâmetros:
+        conexao (sqlalchemy.Connection): Conexão dentro de uma transação.
+        chaves (str, opcional): Nome de uma tabela com a coluna 'chave'
+            (rowids dos índices) para atualizar só esses títulos. Padrão:
+            todos os títulos (os índices são recriados e compactados).
+        tamanho_lote (int, opcional): Títulos normalizados em memória de
+            cada vez para titulos_trigrama. Padrão: 10000.
+    """
+    for indice in ('titulos_fts', 'titulos_trigrama'):
+        if chaves is None:
+            conexao.execute(text(f'DELETE FROM {indice}'))
+        else:
+            conexao.execute(text(f'DELETE FROM {indice} WHERE rowid IN (SELECT chave FROM {chaves})'))
+
+    for tabela, origem in ORIGENS_BUSCA.items():
+        if chaves is None:
+            selecao = f'SELECT id * 2 + {origem}, title FROM {tabela}'
+        else:
+            selecao = (f'SELECT p.chave, t.title FROM {chaves} AS p JOIN {tabela} AS t '
+                       f'ON t.id = p.chave / 2 WHERE p.chave % 2 = {origem}')
+        conexao.execute(text(f'INSERT INTO titulos_fts (rowid, title) {selecao}'))
+        for lote in conexao.execute(text(selecao)).partitions(tamanho_lote):
+            conexao.exec_driver_sql('INSERT INTO titulos_trigrama (rowid, title) VALUES (?, ?)',
+                                    [(chave, normalizar_titulo(titulo)) for chave, titulo in lote])
+
+    if chaves is None:
+        for indice in ('titulos_fts', 'titulos_trigrama'):
+            conexao.execute(text(f"INSERT INTO {indice} ({indice}) VALUES ('optimize')"))
+
+
+def criar_indice_busca(engine):
+    """
+    Cria as tabelas de TABELAS_BUSCA e os gatilhos de gatilhos_busca que
+    ainda não existem e, se algo foi criado, preenche os índices com os
+    títulos já gravados, na mesma transação.
+
+    Só em bancos SQLite com o módulo FTS5; nos demais, nada é criado e a
+    busca (ver src/search.py) não fica disponível.
+
+    Parâmetros:
+        engine (sqlalchemy.Engine): Engine conectada ao banco.
+
+    Retorno:
+        bool: True se o índice existe (criado agora ou antes).
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    gatilhos = {}
+    for tabela, origem in ORIGENS_BUSCA.items():
+        gatilhos.update(gatilhos_busca(tabela, origem))
+    try:
+        with engine.begin() as conexao:
+            existentes = set(conexao.execute(text(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+            )).scalars())
+            faltando = [comando for nome, comando in {**TABELAS_BUSCA, **gatilhos}.items()
+                        if nome not in existentes]
+            for comando in faltando:
+                conexao.execute(text(comando))
+            if faltando:
+                conexao.execute(text('DELETE FROM titulos_pendentes'))
+                atualizar_indice_busca(conexao)
+    except OperationalError:
+        # SQLite compilado sem FTS5 ("no such module: fts5")
+        return False
+    return True
+
+
+def sincronizar_indice_busca(engine):
+    """
+    Aplica aos índices de busca os títulos anotados em titulos_pendentes
+    pelos gatilhos (ver gatilhos_busca), em uma transação. É chamada ao
+    fim das gravações de catálogo e antes de cada busca; sem anotações,
+    só consulta titulos_pendentes.
+
+    Parâmetros:
+        engine (sqlalchemy.Engine): Engine conectada ao banco.
+
+    Retorno:
+        int: Quantidade de títulos aplicados (0 sem o índice de busca).
+    """
+    if engine.dialect.name != 'sqlite':
+        return 0
+    with engine.begin() as conexao:
+        if conexao.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'titulos_pendentes'"
+        )).first() is None:
+            return 0
+        pendentes = conexao.execute(text('SELECT count(*) FROM titulos_pendentes')).scalar()
+        if pendentes:
+            atualizar_indice_busca(conexao, 'titulos_pendentes')
+            conexao.execute(text('DELETE FROM titulos_pendentes'))
+    return pendentes
+
+
+@instrumentar('salvar_catalogo_no_banco', contar=linhas_gravadas)
 def salvar_catalogo_no_banco(catalog, engine):
     """
     Percorre a lista catalog (Movie e Series) e salva no banco de dados.
@@ -89,12 +754,19 @@ def salvar_catalogo_no_banco(catalog, engine):
           e uma mensagem é exibida.
 
     Parâmetros:
-        catalog (list[TV]): Lista contendo objetos Movie e Series.
+        catalog (Catalog ou list[TV]): Catálogo ou lista contendo objetos
+            Movie e Series.
         engine (sqlalchemy.Engine): Engine conectada ao banco onde
             os dados serão inseridos.
+
+    Retorno:
+        dict: Contagem com as chaves 'inseridos', 'atualizados' (sempre 0
+        neste caminho) e 'ignorados'.
     """
     Session = sessionmaker(bind=engine) # Criando uma fábrica de sessões
 
+    contagem = {'inseridos': 0, 'atualizados': 0, 'ignorados': 0}
+
     session = Session() # Criando uma sessão
 
     # Inserindo na base de dados os objetos Movie e Series armazenados na lista catalog (ex. 5)
@@ -104,7 +776,8 @@ def salvar_catalogo_no_banco(catalog, engine):
             novo_registro = MovieDB(
                 title=item.title,
                 year=item.year,
-                rating=item.rating
+                rating=item.rating,
+                imdb_id=item.imdb_id
             )
         elif isinstance(item, Series): # instância de Series -> tabela series
             # Instanciando um objeto SeriesDB com os atributos do objeto Series
@@ -112,10 +785,12 @@ def salvar_catalogo_no_banco(catalog, engine):
                 title=item.title,
                 year=item.year,
                 seasons=item.seasons,
-                episodes=item.episodes
+                episodes=item.episodes,
+                imdb_id=item.imdb_id
             )
         else:
             print('Item desconhecido, ignorando...')
+            contagem['ignorados'] += 1
             continue
 
         # Adicionando à sessão
@@ -125,12 +800,469 @@ def salvar_catalogo_no_banco(catalog, engine):
         try:
             # Tentando gravar a inserção
             session.commit()
+            contagem['inseridos'] += 1
         except IntegrityError: # Se violar a restrição de título único, dá erro de Integridade
             # Desfazendo a transação que falhou
             session.rollback()
             # Exibindo mensagem de erro
             print(f'Aviso: título duplicado ignorado: "{novo_registro.title}".')
+            contagem['ignorados'] += 1
 
     # Encerrando a sessão
     session.close()
 
+    sincronizar_indice_busca(engine)
+    return contagem
+
+
+# Colunas das linhas de separar_catalogo (as de Catalog.colunas_movies / colunas_series)
+COLUNAS_CATALOGO_MOVIES = ('title', 'year', 'rating', 'imdb_id')
+COLUNAS_CATALOGO_SERIES = ('title', 'year', 'seasons', 'episodes', 'imdb_id')
+
+
+def linhas_das_colunas(colunas):
+    """
+    Converte colunas paralelas (como as de Catalog.colunas_movies) em
+    linhas (tuplas) prontas para inserção, sem passar por objetos Movie/Series.
+
+    Marcadores de ausência (AUSENTE nas colunas inteiras e NaN nas notas)
+    viram None. Títulos repetidos são descartados (vale a primeira ocorrência).
+
+    Parâmetros:
+        colunas (dict): Nome da coluna -> lista ou array, com 'title' primeiro.
+
+    Retorno:
+        tuple: (nomes, linhas, descartados), em que 'nomes' são os nomes das
+        colunas e 'linhas' uma lista de tuplas na mesma ordem.
+    """
+    nomes = list(colunas)
+
+    # Convertendo os marcadores de ausência coluna a coluna (uma passada por coluna)
+    valores_colunas = []
+    for coluna in colunas.values():
+        tipo = getattr(coluna, 'typecode', None)
+        if tipo == 'd':
+            valores_colunas.append([None if valor != valor else valor for valor in coluna])  # NaN -> None
+        elif tipo is not None:
+            valores_colunas.append([None if valor == AUSENTE else valor for valor in coluna])
+        else:
+            valores_colunas.append(coluna)
+
+    linhas = []
+    titulos = set()
+    descartados = 0
+    for linha in zip(*valores_colunas):
+        if linha[0] in titulos:
+            descartados += 1
+            continue
+        titulos.add(linha[0])
+        linhas.append(linha)
+    return nomes, linhas, descartados
+
+
+def separar_catalogo(catalog):
+    """
+    Separa o catalog em linhas prontas para inserção nas tabelas
+    'movies' e 'series'.
+
+    Títulos repetidos dentro do próprio catalog são descartados (vale a
+    primeira ocorrência, como no caminho registro a registro). Um Catalog
+    é lido direto das suas colunas (ver linhas_das_colunas).
+
+    Parâmetros:
+        catalog (Catalog ou list[TV]): Catálogo ou lista contendo objetos
+            Movie e Series.
+
+    Retorno:
+        tuple: (movies, series, descartados), em que 'movies' e 'series'
+        são pares (nomes_das_colunas, lista_de_tuplas) e 'descartados' é
+        a quantidade de itens repetidos ou desconhecidos.
+    """
+    if isinstance(catalog, Catalog):
+        *movies, descartados_movies = linhas_das_colunas(catalog.colunas_movies())
+        *series, descartados_series = linhas_das_colunas(catalog.colunas_series())
+        return tuple(movies), tuple(series), descartados_movies + descartados_series
+
+    linhas_movies = []
+    linhas_series = []
+    titulos_movies = set()
+    titulos_series = set()
+    descartados = 0
+
+    for item in catalog:
+        if isinstance(item, Movie):
+            if item.title in titulos_movies:
+                descartados += 1
+                continue
+            titulos_movies.add(item.title)
+            linhas_movies.append((item.title, item.year, item.rating, item.imdb_id))
+        elif isinstance(item, Series):
+            if item.title in titulos_series:
+                descartados += 1
+                continue
+            titulos_series.add(item.title)
+            linhas_series.append((item.title, item.year, item.seasons,
+                                  item.episodes, item.imdb_id))
+        else:
+            descartados += 1
+
+    movies = (list(COLUNAS_CATALOGO_MOVIES), linhas_movies)
+    series = (list(COLUNAS_CATALOGO_SERIES), linhas_series)
+    return movies, series, descartados
+
+
+def gravar_lote(conexao, tabela, nomes, lote, atualizar = True):
+    """
+    Grava um lote de linhas em uma tabela com um único executemany
+    de INSERT ... ON CONFLICT (title).
+
+    O comando é montado com o SQLAlchemy Core e compilado uma vez; as
+    tuplas do lote vão direto para o executemany do driver, sem criar
+    um dicionário por linha.
+
+    Parâmetros:
+        conexao (sqlalchemy.Connection): Conexão com transação aberta.
+        tabela (sqlalchemy.Table): Tabela de destino ('movies' ou 'series').
+        nomes (list[str]): Nomes das colunas, na ordem dos valores das
+            tuplas (deve incluir 'title').
+        lote (list[tuple]): Linhas a gravar (títulos sem repetição).
+        atualizar (bool, opcional): Se True, títulos já existentes têm os
+            demais campos atualizados (DO UPDATE); se False, são
+            ignorados (DO NOTHING). Valores ausentes (None) nunca apagam
+            os já gravados (ex.: temporadas vindas do enriquecimento).
+            Padrão: True.
+
+    Linhas inseridas ou realmente alteradas recebem o momento atual em
+    'updated_at'.
+
+    Retorno:
+        dict: Contagem com as chaves 'inseridos', 'atualizados' e 'ignorados'.
+    """
+    funcao_insert = INSERTS_COM_CONFLITO[conexao.dialect.name]
+
+    # Descobrindo quais títulos do lote já estão no banco, para separar
+    # inserções de atualizações na contagem final
+    posicao_titulo = nomes.index('title')
+    titulos = [linha[posicao_titulo] for linha in lote]
+    existentes = set(conexao.scalars(
+        select(tabela.c.title).where(tabela.c.title.in_(titulos))
+    ))
+
+    colunas = [coluna for coluna in nomes if coluna != 'title']
+    nomes = list(nomes) + ['updated_at']
+
+    comando = funcao_insert(tabela)
+    if atualizar:
+        comando = comando.on_conflict_do_update(
+            index_elements=['title'],
+            set_={
+                **{
+                    coluna: func.coalesce(comando.excluded[coluna], tabela.c[coluna])
+                    for coluna in colunas
+                },
+                'updated_at': comando.excluded.updated_at,
+            },
+            # Só reescreve a linha quando algum valor informado realmente mudou
+            where=or_(*[
+                and_(
+                    comando.excluded[coluna].is_not(None),
+                    tabela.c[coluna].is_distinct_from(comando.excluded[coluna])
+                )
+                for coluna in colunas
+            ])
+        )
+    else:
+        comando = comando.on_conflict_do_nothing(index_elements=['title'])
+
+    compilado = comando.compile(dialect=conexao.dialect, column_keys=nomes)
+    agora = datetime.now()
+    if compilado.positiontup is not None:
+        # O executemany do driver não aplica o default/onupdate nem a
+        # conversão de tipos da coluna: o momento da gravação entra já
+        # convertido, como mais um valor de cada tupla
+        processar_data = tabela.c.updated_at.type.bind_processor(conexao.dialect)
+        agora = processar_data(agora) if processar_data else agora
+        lote = [linha + (agora,) for linha in lote]
+        # Estilo posicional ('?'): reordena os valores se o SQL pedir outra ordem
+        if list(compilado.positiontup) != list(nomes):
+            ordem = [nomes.index(nome) for nome in compilado.positiontup]
+            lote = [tuple(linha[i] for i in ordem) for linha in lote]
+        resultado = conexao.exec_driver_sql(str(compilado), lote)
+    else:
+        # Estilo nomeado (ex.: '%(title)s'): o driver precisa de dicionários
+        resultado = conexao.execute(comando, [dict(zip(nomes, linha + (agora,))) for linha in lote])
+
+    inseridos = len(lote) - len(existentes)
+    if not atualizar:
+        atualizados = 0
+    elif resultado.rowcount is None or resultado.rowcount < 0:
+        # Driver não informou o total de linhas afetadas
+        atualizados = len(existentes)
+    else:
+        atualizados = resultado.rowcount - inseridos
+
+    return {
+        'inseridos': inseridos,
+        'atualizados': atualizados,
+        'ignorados': len(lote) - inseridos - atualizados
+    }
+
+
+@instrumentar('salvar_catalogo_em_lote', contar=linhas_gravadas)
+def salvar_catalogo_em_lote(catalog, engine, tamanho_lote = 500, atualizar = True):
+    """
+    Salva o catalog (Movie e Series) no banco de dados em lotes.
+
+    Cada lote é gravado com um único INSERT ... ON CONFLICT (executemany)
+    dentro de uma única transação, em vez de um commit por registro.
+    Títulos já existentes são atualizados ou ignorados, conforme o
+    parâmetro 'atualizar', sem mensagens por item.
+
+    Caso o banco não suporte ON CONFLICT, usa salvar_catalogo_no_banco
+    (registro a registro) como alternativa.
+
+    Parâmetros:
+        catalog (Catalog ou list[TV]): Catálogo ou lista contendo objetos
+            Movie e Series.
+        engine (sqlalchemy.Engine): Engine conectada ao banco onde
+            os dados serão inseridos.
+        tamanho_lote (int, opcional): Quantidade de linhas por transação.
+            Padrão: 500.
+        atualizar (bool, opcional): Se True, atualiza títulos já existentes;
+            se False, apenas os ignora. Padrão: True.
+
+    Retorno:
+        dict: Contagem total com as chaves 'inseridos', 'atualizados'
+        e 'ignorados'.
+    """
+    if engine.dialect.name not in INSERTS_COM_CONFLITO:
+        return salvar_catalogo_no_banco(catalog, engine)
+    return _gravar_catalogos([catalog], engine, tamanho_lote, atualizar)
+
+
+@instrumentar('salvar_catalogos_em_lote', contar=linhas_gravadas)
+def salvar_catalogos_em_lote(catalogos, engine, tamanho_lote = 500, atualizar = True):
+    """
+    Versão em streaming de salvar_catalogo_em_lote: grava os catálogos
+    à medida que chegam (ex.: um por página, de models.gerar_catalogos),
+    sem juntar todos antes.
+
+    As linhas de catálogos seguidos se juntam no mesmo lote, e cada lote
+    cheio é gravado na hora, com o mesmo resultado de gravar um único
+    catálogo com todos os títulos: repetidos entre catálogos também são
+    descartados (vale o primeiro). Em memória ficam só o lote de cada
+    tabela e os títulos já gravados.
+
+    Parâmetros:
+        catalogos (iterable): Catálogos (Catalog ou list[TV]).
+        engine (sqlalchemy.Engine): Engine conectada ao banco.
+        tamanho_lote (int, opcional): Quantidade de linhas por transação.
+            Padrão: 500.
+        atualizar (bool, opcional): Se True, atualiza títulos já existentes;
+            se False, apenas os ignora. Padrão: True.
+
+    Retorno:
+        dict: Contagem total com as chaves 'inseridos', 'atualizados'
+        e 'ignorados'.
+    """
+    if engine.dialect.name not in INSERTS_COM_CONFLITO:
+        contagem = {'inseridos': 0, 'atualizados': 0, 'ignorados': 0}
+        for catalog in catalogos:
+            for chave, valor in salvar_catalogo_no_banco(catalog, engine).items():
+                contagem[chave] += valor
+        return contagem
+    return _gravar_catalogos(catalogos, engine, tamanho_lote, atualizar)
+
+
+def _gravar_catalogos(catalogos, engine, tamanho_lote, atualizar):
+    # Lotes de até 'tamanho_lote' linhas por tabela, preenchidos catálogo a catálogo
+    contagem = {'inseridos': 0, 'atualizados': 0, 'ignorados': 0}
+    destinos = [(MovieDB.__table__, [], set()), (SeriesDB.__table__, [], set())]
+
+    def gravar(tabela, nomes, lote):
+        # Uma transação por lote (commit automático ao sair do bloco)
+        with engine.begin() as conexao:
+            parcial = gravar_lote(conexao, tabela, nomes, lote, atualizar)
+        for chave in contagem:
+            contagem[chave] += parcial[chave]
+        lote.clear()
+
+    for catalog in catalogos:
+        *partes, descartados = separar_catalogo(catalog)
+        contagem['ignorados'] += descartados
+        for (tabela, lote, titulos), (nomes, linhas) in zip(destinos, partes):
+            for linha in linhas:
+                # Títulos repetidos entre catálogos: vale o primeiro
+                if linha[0] in titulos:
+                    contagem['ignorados'] += 1
+                    continue
+                titulos.add(linha[0])
+                lote.append(linha)
+                if len(lote) >= tamanho_lote:
+                    gravar(tabela, nomes, lote)
+
+    for (tabela, lote, _), nomes in zip(destinos, (COLUNAS_CATALOGO_MOVIES, COLUNAS_CATALOGO_SERIES)):
+        if lote:
+            gravar(tabela, list(nomes), lote)
+
+    sincronizar_indice_busca(engine)
+    return contagem
+
+
+def assinatura_tabela(conexao, tabela):
+    """
+    Resume o estado de uma tabela com 'id' e 'updated_at' em uma única
+    consulta de agregação, que usa os índices dessas colunas.
+
+    Qualquer gravação (inserção, atualização ou remoção) muda a
+    quantidade de linhas, o maior id ou o maior 'updated_at'.
+
+    Parâmetros:
+        conexao (sqlalchemy.Connection): Conexão aberta com o banco.
+        tabela (sqlalchemy.Table): Tabela (ex.: MovieDB.__table__).
+
+    Retorno:
+        dict: {'linhas', 'maior_id', 'maior_updated_at', 'colunas'}.
+    """
+    total, maior_id, maior_data = conexao.execute(
+        select(func.count(), func.max(tabela.c.id), func.max(tabela.c.updated_at))
+    ).one()
+    return {
+        'linhas': total,
+        'maior_id': maior_id,
+        'maior_updated_at': maior_data.isoformat() if maior_data else None,
+        'colunas': list(tabela.columns.keys()),
+    }
+
+
+def hash_ranking(itens):
+    """
+    Calcula o SHA-256 do estado de um ranking (título, posição e nota de
+    cada item, em ordem).
+
+    A quantidade de votos fica de fora: ela muda a toda hora e, sozinha,
+    não caracteriza mudança no ranking.
+
+    Parâmetros:
+        itens (list[dict]): Itens no formato de scraping.obter_filmes_top.
+
+    Retorno:
+        str: Hash em hexadecimal.
+    """
+    estado = [
+        (item.get('imdb_id') or item['titulo'], posicao, item['nota'])
+        for posicao, item in enumerate(itens, start=1)
+    ]
+    conteudo = json.dumps(estado, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def estado_atual_ranking(conexao, fonte):
+    """
+    Lê, do histórico, a última posição e nota registradas de cada título
+    de um ranking.
+
+    Parâmetros:
+        conexao (sqlalchemy.Connection): Conexão com o banco.
+        fonte (str): Nome do ranking.
+
+    Retorno:
+        dict: Chave do título (imdb_id ou, na falta dele, o título) ->
+        tupla (imdb_id, title, rank, rating) da última linha gravada.
+    """
+    snapshots = RankingSnapshotDB.__table__
+    chave = func.coalesce(snapshots.c.imdb_id, snapshots.c.title)
+    ultimas = (
+        select(func.max(snapshots.c.id))
+        .where(snapshots.c.source == fonte)
+        .group_by(chave)
+    )
+    consulta = (
+        select(chave, snapshots.c.imdb_id, snapshots.c.title,
+               snapshots.c.rank, snapshots.c.rating)
+        .where(snapshots.c.id.in_(ultimas))
+    )
+    return {linha[0]: tuple(linha[1:]) for linha in conexao.execute(consulta)}
+
+
+def registrar_snapshot_ranking(itens, engine, fonte, observado_em = None):
+    """
+    Registra no histórico a coleta de um ranking, gravando apenas o que mudou.
+
+    - Se o hash do ranking for igual ao da última coleta registrada da
+      mesma fonte, nada é gravado.
+    - Caso contrário, é criada uma linha em 'ranking_runs' e, em
+      'ranking_snapshots', apenas os títulos novos, os que mudaram de
+      posição ou de nota e os que saíram do ranking (rank nulo).
+
+    Parâmetros:
+        itens (list[dict]): Itens no formato de scraping.obter_filmes_top,
+            na ordem do ranking.
+        engine (sqlalchemy.Engine): Engine conectada ao banco.
+        fonte (str): Nome do ranking (ex.: 'top_filmes').
+        observado_em (datetime, opcional): Momento da coleta. Padrão: agora.
+
+    Retorno:
+        dict: Chaves 'run_id' (None se a coleta foi ignorada), 'ignorada'
+        (bool) e 'alterados' (linhas gravadas no histórico).
+    """
+    observado_em = observado_em or datetime.now()
+    hash_atual = hash_ranking(itens)
+    runs = RankingRunDB.__table__
+    snapshots = RankingSnapshotDB.__table__
+
+    with engine.begin() as conexao:
+        ultimo_hash = conexao.scalar(
+            select(runs.c.payload_hash)
+            .where(runs.c.source == fonte)
+            .order_by(runs.c.id.desc())
+            .limit(1)
+        )
+        if ultimo_hash == hash_atual:
+            return {'run_id': None, 'ignorada': True, 'alterados': 0}
+
+        estado_anterior = estado_atual_ranking(conexao, fonte)
+
+        mudancas = []
+        presentes = set()
+        for posicao, item in enumerate(itens, start=1):
+            chave = item.get('imdb_id') or item['titulo']
+            presentes.add(chave)
+            anterior = estado_anterior.get(chave)
+            if anterior is not None and anterior[2:] == (posicao, item['nota']):
+                continue
+            mudancas.append({
+                'imdb_id': item.get('imdb_id'),
+                'title': item['titulo'],
+                'rank': posicao,
+                'rating': item['nota'],
+                'votes': item.get('votos'),
+            })
+
+        # Títulos que estavam no ranking e saíram ganham uma linha com rank nulo
+        for chave, (imdb_id, titulo, rank, rating) in estado_anterior.items():
+            if chave not in presentes and rank is not None:
+                mudancas.append({
+                    'imdb_id': imdb_id,
+                    'title': titulo,
+                    'rank': None,
+                    'rating': rating,
+                    'votes': None,
+                })
+
+        run_id = conexao.execute(
+            runs.insert().values(
+                source=fonte,
+                observed_at=observado_em,
+                payload_hash=hash_atual,
+                rows_total=len(itens),
+                rows_changed=len(mudancas),
+            )
+        ).inserted_primary_key[0]
+
+        if mudancas:
+            for mudanca in mudancas:
+                mudanca.update(run_id=run_id, source=fonte, observed_at=observado_em)
+            conexao.execute(snapshots.insert(), mudancas)
+
+    return {'run_id': run_id, 'ignorada': False, 'alterados': len(mudancas)}
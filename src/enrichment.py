@@ -0,0 +1,283 @@
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from .database import MovieDB, SeriesDB, EnrichmentCheckpointDB, INSERTS_COM_CONFLITO
+from .fetching import ClienteHTTP
+from .metrics import em_contexto
+from .scraping import baixar_html, extrair_json_next_data
+
+
+# Marcador da tag <script> com os dados estruturados (JSON-LD) da página do título
+MARCADOR_JSON_LD = b'<script type="application/ld+json"'
+
+# Duração no formato ISO 8601 usado pelo IMDb (ex.: 'PT2H22M')
+PADRAO_DURACAO = re.compile(r'PT(?:(\d+)H)?(?:(\d+)M)?')
+
+# Endereço das páginas de detalhe (o identificador do IMDb é acrescentado ao final)
+URL_TITULO_PADRAO = 'https://www.imdb.com/pt/title/'
+
+
+def extrair_json_ld(html):
+    """
+    Localiza e decodifica o bloco JSON-LD da página de um título,
+    sem montar a árvore HTML.
+
+    Parâmetros:
+        html (bytes ou str): Conteúdo HTML da página.
+
+    Retorno:
+        dict ou None: Conteúdo do bloco, ou None se não existir ou for inválido.
+    """
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+
+    inicio_tag = html.find(MARCADOR_JSON_LD)
+    if inicio_tag == -1:
+        return None
+    inicio_json = html.find(b'>', inicio_tag) + 1
+    fim_json = html.find(b'</script>', inicio_json)
+    if inicio_json == 0 or fim_json == -1:
+        return None
+
+    try:
+        return json.loads(html[inicio_json:fim_json])
+    except ValueError:
+        return None
+
+
+def nomes_pessoas(valor):
+    """
+    Extrai os nomes de uma ou mais pessoas no formato JSON-LD
+    (dicionário ou lista de dicionários com a chave 'name').
+
+    Parâmetros:
+        valor (dict, list ou None): Campo 'director' ou 'creator' do JSON-LD.
+
+    Retorno:
+        list[str]: Nomes encontrados (apenas pessoas, sem empresas).
+    """
+    if isinstance(valor, dict):
+        valor = [valor]
+    nomes = []
+    for pessoa in valor or []:
+        if isinstance(pessoa, dict) and pessoa.get('@type', 'Person') == 'Person' and pessoa.get('name'):
+            nomes.append(pessoa['name'])
+    return nomes
+
+
+def temporadas_episodios(dados):
+    """
+    Procura, no JSON '__NEXT_DATA__' da página de uma série, a lista de
+    temporadas e o total de episódios.
+
+    Parâmetros:
+        dados (dict ou None): JSON '__NEXT_DATA__' já decodificado.
+
+    Retorno:
+        tuple: (temporadas, episodios), com None onde o dado não for encontrado.
+    """
+    pendentes = [dados] if dados is not None else []
+    while pendentes:
+        atual = pendentes.pop()
+        if isinstance(atual, dict):
+            if isinstance(atual.get('seasons'), list):
+                total = atual.get('totalEpisodes') or atual.get('episodes') or {}
+                episodios = total.get('total') if isinstance(total, dict) else None
+                return len(atual['seasons']) or None, episodios
+            pendentes.extend(atual.values())
+        elif isinstance(atual, list):
+            pendentes.extend(atual)
+    return None, None
+
+
+def extrair_detalhes_titulo(html, tipo = 'movie'):
+    """
+    Extrai da página de detalhe de um título os dados usados no
+    enriquecimento: gêneros, duração, diretores e, para séries,
+    temporadas e episódios.
+
+    Parâmetros:
+        html (bytes): Conteúdo HTML da página do título.
+        tipo (str, opcional): 'movie' ou 'series'. Padrão: 'movie'.
+
+    Retorno:
+        dict: Dicionário com as chaves 'genres', 'runtime', 'directors'
+        e, para séries, 'seasons' e 'episodes' (None quando ausentes).
+    """
+    json_ld = extrair_json_ld(html) or {}
+
+    generos = json_ld.get('genre') or []
+    if isinstance(generos, str):
+        generos = [generos]
+
+    duracao = None
+    encontrado = PADRAO_DURACAO.fullmatch(json_ld.get('duration') or '')
+    if encontrado and any(encontrado.groups()):
+        horas, minutos = encontrado.groups()
+        duracao = int(horas or 0) * 60 + int(minutos or 0)
+
+    # Séries costumam informar os criadores no lugar dos diretores
+    diretores = nomes_pessoas(json_ld.get('director')) or nomes_pessoas(json_ld.get('creator'))
+
+    detalhes = {
+        'genres': ', '.join(generos) or None,
+        'runtime': duracao,
+        'directors': ', '.join(diretores) or None,
+    }
+
+    if tipo == 'series':
+        temporadas, episodios = temporadas_episodios(extrair_json_next_data(html))
+        detalhes['seasons'] = temporadas
+        detalhes['episodes'] = episodios
+
+    return detalhes
+
+
+def titulos_pendentes(engine, idade_max_dias = 30):
+    """
+    Lista os títulos do banco que precisam de enriquecimento: os que
+    nunca foram concluídos e os concluídos há mais de 'idade_max_dias'.
+
+    Parâmetros:
+        engine (sqlalchemy.Engine): Engine conectada ao banco.
+        idade_max_dias (float, opcional): Idade máxima de um enriquecimento
+            para ele ainda ser considerado atual. Padrão: 30.
+
+    Retorno:
+        list[tuple]: Pares (imdb_id, tipo), com tipo 'movie' ou 'series'.
+    """
+    limite = datetime.now() - timedelta(days=idade_max_dias)
+    checkpoint = EnrichmentCheckpointDB.__table__
+
+    # Títulos com checkpoint 'ok' recente ficam de fora
+    recentes = (
+        select(checkpoint.c.imdb_id)
+        .where(checkpoint.c.status == 'ok')
+        .where(checkpoint.c.updated_at >= limite)
+    )
+
+    pendentes = []
+    with engine.connect() as conexao:
+        for tipo, tabela in (('movie', MovieDB.__table__), ('series', SeriesDB.__table__)):
+            consulta = (
+                select(tabela.c.imdb_id)
+                .where(tabela.c.imdb_id.is_not(None))
+                .where(tabela.c.imdb_id.not_in(recentes))
+                .order_by(tabela.c.id)
+            )
+            pendentes.extend((imdb_id, tipo) for imdb_id in conexao.scalars(consulta))
+    return pendentes
+
+
+def gravar_enriquecimento(engine, imdb_id, tipo, detalhes = None, erro = None):
+    """
+    Grava o resultado do enriquecimento de um título em uma única
+    transação: atualiza a linha em 'movies'/'series' e o checkpoint.
+
+    Parâmetros:
+        engine (sqlalchemy.Engine): Engine conectada ao banco.
+        imdb_id (str): Identificador do título no IMDb.
+        tipo (str): 'movie' ou 'series'.
+        detalhes (dict, opcional): Dados extraídos (quando houve sucesso).
+        erro (Exception, opcional): Erro ocorrido (quando houve falha).
+    """
+    agora = datetime.now()
+    checkpoint = EnrichmentCheckpointDB.__table__
+
+    if erro is None:
+        status, payload = 'ok', json.dumps(detalhes, ensure_ascii=False)
+    else:
+        status, payload = 'erro', json.dumps({'erro': str(erro)}, ensure_ascii=False)
+
+    funcao_insert = INSERTS_COM_CONFLITO[engine.dialect.name]
+    comando_checkpoint = funcao_insert(checkpoint).values(
+        imdb_id=imdb_id, kind=tipo, status=status, payload=payload,
+        attempts=1, updated_at=agora
+    )
+    comando_checkpoint = comando_checkpoint.on_conflict_do_update(
+        index_elements=['imdb_id'],
+        set_={
+            'status': comando_checkpoint.excluded.status,
+            'payload': comando_checkpoint.excluded.payload,
+            'attempts': checkpoint.c.attempts + 1,
+            'updated_at': comando_checkpoint.excluded.updated_at,
+        }
+    )
+
+    with engine.begin() as conexao:
+        if erro is None:
+            tabela = SeriesDB.__table__ if tipo == 'series' else MovieDB.__table__
+            # Valores não encontrados na página não apagam os já existentes
+            valores = {campo: valor for campo, valor in detalhes.items() if valor is not None}
+            valores['enriched_at'] = agora
+            valores['updated_at'] = agora
+            conexao.execute(
+                update(tabela).where(tabela.c.imdb_id == imdb_id).values(**valores)
+            )
+        conexao.execute(comando_checkpoint)
+
+
+def enriquecer_titulos(engine, cliente = None, cache = None, max_workers = 8,
+                       idade_max_dias = 30, url_base = URL_TITULO_PADRAO):
+    """
+    Visita a página de detalhe de cada título do banco e grava gêneros,
+    duração, diretores e, para séries, temporadas e episódios.
+
+    As páginas são baixadas por um pool de threads; o limite de conexões
+    simultâneas por host vem do cliente HTTP. Cada título concluído é
+    gravado na hora (junto com o checkpoint), de modo que uma execução
+    interrompida continua de onde parou. Títulos enriquecidos há menos
+    de 'idade_max_dias' são pulados.
+
+    Parâmetros:
+        engine (sqlalchemy.Engine): Engine conectada ao banco.
+        cliente (ClienteHTTP, opcional): Cliente HTTP compartilhado; se
+            omitido, é criado um com as configurações padrão, fechado ao
+            fim do enriquecimento.
+        cache (CacheHTTP, opcional): Cache de respostas HTTP. Padrão: None.
+        max_workers (int, opcional): Downloads simultâneos. Padrão: 8.
+        idade_max_dias (float, opcional): Idade máxima de um enriquecimento
+            considerado atual. Padrão: 30.
+        url_base (str, opcional): Prefixo da URL das páginas de detalhe.
+
+    Retorno:
+        dict: Contagem com as chaves 'enriquecidos', 'falhas' e 'pendentes'
+        (títulos que precisavam de enriquecimento no início).
+    """
+    cliente_temporario = cliente is None
+    if cliente_temporario:
+        cliente = ClienteHTTP()
+
+    pendentes = titulos_pendentes(engine, idade_max_dias)
+    contagem = {'enriquecidos': 0, 'falhas': 0, 'pendentes': len(pendentes)}
+
+    def baixar_detalhes(imdb_id, tipo):
+        html = baixar_html(f'{url_base}{imdb_id}/', cache=cache, cliente=cliente)
+        return extrair_detalhes_titulo(html, tipo)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futuros = {
+                executor.submit(em_contexto(baixar_detalhes), imdb_id, tipo): (imdb_id, tipo)
+                for imdb_id, tipo in pendentes
+            }
+            # As gravações acontecem nesta thread, uma por título concluído
+            for futuro in as_completed(futuros):
+                imdb_id, tipo = futuros[futuro]
+                try:
+                    detalhes = futuro.result()
+                except Exception as excecao:
+                    gravar_enriquecimento(engine, imdb_id, tipo, erro=excecao)
+                    contagem['falhas'] += 1
+                    continue
+                gravar_enriquecimento(engine, imdb_id, tipo, detalhes=detalhes)
+                contagem['enriquecidos'] += 1
+    finally:
+        if cliente_temporario:
+            cliente.fechar()
+
+    return contagem
@@ -0,0 +1,406 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import select
+
+from .arquivos import escrever_atomico
+from .database import MovieDB, SeriesDB
+from .metrics import em_contexto
+
+
+def escrever_csv(df, caminho, opcoes):
+    """
+    Escreve o DataFrame em CSV (UTF-8, sem a coluna do índice).
+
+    Parâmetros:
+        df (pandas.DataFrame): Dados a exportar.
+        caminho (str): Caminho do arquivo (o temporário de escrever_atomico).
+        opcoes (dict): Opções da exportação (ex.: 'compressao_parquet').
+    """
+    df.to_csv(caminho, index=False, encoding='utf-8')
+
+
+def escrever_json(df, caminho, opcoes):
+    """
+    Escreve o DataFrame em JSON compacto (sem indentação): um array com
+    um objeto por linha do DataFrame.
+
+    Parâmetros:
+        df (pandas.DataFrame): Dados a exportar.
+        caminho (str): Caminho do arquivo (o temporário de escrever_atomico).
+        opcoes (dict): Opções da exportação (ex.: 'compressao_parquet').
+    """
+    df.to_json(caminho, orient='records', force_ascii=False)
+
+
+def escrever_jsonl(df, caminho, opcoes):
+    """
+    Escreve o DataFrame em JSON Lines: um objeto por linha do arquivo,
+    que pode ser lido em streaming, sem carregar tudo.
+
+    Parâmetros:
+        df (pandas.DataFrame): Dados a exportar.
+        caminho (str): Caminho do arquivo (o temporário de escrever_atomico).
+        opcoes (dict): Opções da exportação (ex.: 'compressao_parquet').
+    """
+    df.to_json(caminho, orient='records', lines=True, force_ascii=False)
+
+
+def escrever_parquet(df, caminho, opcoes):
+    """
+    Escreve o DataFrame em Parquet, com a compressão de
+    opcoes['compressao_parquet'] (padrão: 'snappy'). Exige o pyarrow.
+
+    Parâmetros:
+        df (pandas.DataFrame): Dados a exportar.
+        caminho (str): Caminho do arquivo (o temporário de escrever_atomico).
+        opcoes (dict): Opções da exportação (ex.: 'compressao_parquet').
+    """
+    df.to_parquet(caminho, index=False, compression=opcoes.get('compressao_parquet', 'snappy'))
+
+
+def escrever_feather(df, caminho, opcoes):
+    """
+    Escreve o DataFrame em Feather (Arrow IPC). O Feather não guarda
+    índices fora do padrão, então o índice é refeito. Exige o pyarrow.
+
+    Parâmetros:
+        df (pandas.DataFrame): Dados a exportar.
+        caminho (str): Caminho do arquivo (o temporário de escrever_atomico).
+        opcoes (dict): Opções da exportação (ex.: 'compressao_parquet').
+    """
+    df.reset_index(drop=True).to_feather(caminho)
+
+
+# Formatos disponíveis: nome -> (extensão do arquivo, função de escrita).
+# Parquet e Feather (Arrow IPC) dependem do pacote opcional pyarrow.
+FORMATOS_EXPORTACAO = {
+    'csv': ('.csv', escrever_csv),
+    'json': ('.json', escrever_json),
+    'jsonl': ('.jsonl', escrever_jsonl),
+    'parquet': ('.parquet', escrever_parquet),
+    'feather': ('.feather', escrever_feather),
+}
+
+
+# Tabelas cobertas pela exportação incremental
+TABELAS_INCREMENTAIS = {
+    'movies': MovieDB.__table__,
+    'series': SeriesDB.__table__,
+}
+
+# Formatos que aceitam acréscimo no fim do arquivo (exportação incremental)
+FORMATOS_INCREMENTAIS = {'jsonl': '.jsonl', 'csv': '.csv'}
+
+# Nome do manifesto da exportação incremental (dentro da pasta de saída)
+NOME_MANIFESTO = 'manifest.json'
+
+# Versão 2: marca d'água em 'seq' (na versão 1, em 'updated_at')
+VERSAO_MANIFESTO = 2
+
+
+def exportar_artefato(df, caminho, formato, opcoes):
+    """
+    Exporta um DataFrame em um formato e mede o resultado.
+
+    Erros da escrita não são lançados: ficam em 'erro', para que os
+    demais arquivos da exportação continuem.
+
+    Parâmetros:
+        df (pandas.DataFrame): Dados a exportar.
+        caminho (str): Caminho do arquivo de saída.
+        formato (str): Formato de FORMATOS_EXPORTACAO.
+        opcoes (dict): Opções repassadas à função de escrita
+            (ex.: 'compressao_parquet').
+
+    Retorno:
+        dict: {'arquivo', 'caminho', 'formato', 'bytes', 'segundos', 'erro'},
+        com 'erro' = None quando a exportação deu certo.
+    """
+    _, funcao = FORMATOS_EXPORTACAO[formato]
+    resultado = {'arquivo': os.path.basename(caminho), 'caminho': caminho,
+                 'formato': formato, 'bytes': None, 'segundos': None, 'erro': None}
+    inicio = time.perf_counter()
+    try:
+        resultado['bytes'] = escrever_atomico(caminho, lambda temporario: funcao(df, temporario, opcoes))
+    except Exception as excecao:
+        resultado['erro'] = excecao
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+def exportar_dataframes(dataframes, pasta_saida = 'data', formatos = ('csv', 'json'),
+                        compressao_parquet = 'snappy', max_workers = 4):
+    """
+    Exporta vários DataFrames em vários formatos, em paralelo.
+
+    Cada combinação DataFrame × formato vira um arquivo
+    '<nome><extensão>' em pasta_saida, escrito por um pool de threads
+    (as escritas de Parquet/Feather liberam o GIL) e de forma atômica
+    (arquivo temporário + rename).
+
+    Parâmetros:
+        dataframes (dict): Nome do artefato -> pandas.DataFrame
+            (ex.: {'movies': df_movies, 'series': df_series}).
+        pasta_saida (str, opcional): Pasta onde os arquivos serão salvos.
+            Padrão: 'data'.
+        formatos (list[str], opcional): Formatos de FORMATOS_EXPORTACAO.
+            Padrão: ('csv', 'json').
+        compressao_parquet (str, opcional): Compressão do Parquet
+            ('snappy', 'zstd', 'gzip', 'brotli' ou None). Padrão: 'snappy'.
+        max_workers (int, opcional): Arquivos escritos ao mesmo tempo. Padrão: 4.
+
+    Retorno:
+        list[dict]: Um resultado por arquivo, na ordem (DataFrame, formato),
+        com as chaves 'arquivo', 'caminho', 'formato', 'bytes', 'segundos'
+        e 'erro' (a exceção, ou None se deu certo).
+
+    Exceções:
+        ValueError: Se algum formato não for conhecido.
+    """
+    desconhecidos = [formato for formato in formatos if formato not in FORMATOS_EXPORTACAO]
+    if desconhecidos:
+        raise ValueError(f'Formatos de exportação desconhecidos: {desconhecidos} '
+                         f'(disponíveis: {sorted(FORMATOS_EXPORTACAO)})')
+
+    os.makedirs(pasta_saida, exist_ok=True)
+    opcoes = {'compressao_parquet': compressao_parquet}
+
+    tarefas = []
+    for nome, df in dataframes.items():
+        for formato in formatos:
+            extensao, _ = FORMATOS_EXPORTACAO[formato]
+            tarefas.append((df, os.path.join(pasta_saida, nome + extensao), formato))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = [executor.submit(em_contexto(exportar_artefato), df, caminho, formato, opcoes)
+                   for df, caminho, formato in tarefas]
+        return [futuro.result() for futuro in futuros]
+
+
+def carregar_manifesto(pasta_saida):
+    """
+    Lê o manifesto da exportação incremental.
+
+    Parâmetros:
+        pasta_saida (str): Pasta da exportação incremental.
+
+    Retorno:
+        dict: Manifesto, com a chave 'tabelas' (vazia se ainda não existir).
+    """
+    caminho = os.path.join(pasta_saida, NOME_MANIFESTO)
+    if not os.path.exists(caminho):
+        return {'versao': VERSAO_MANIFESTO, 'tabelas': {}}
+    with open(caminho, mode='r', encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def gravar_manifesto(pasta_saida, manifesto):
+    """
+    Grava o manifesto da exportação incremental (de forma atômica).
+
+    Parâmetros:
+        pasta_saida (str): Pasta da exportação incremental.
+        manifesto (dict): Manifesto a gravar.
+    """
+    def escrever(caminho):
+        with open(caminho, mode='w', encoding='utf-8') as arquivo:
+            json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+
+    escrever_atomico(os.path.join(pasta_saida, NOME_MANIFESTO), escrever)
+
+
+def serializar_linhas(df, formato, cabecalho):
+    # Converte as linhas do DataFrame nos bytes de um segmento
+    if formato == 'csv':
+        texto = df.to_csv(index=False, header=cabecalho)
+    else:
+        texto = df.to_json(orient='records', lines=True, force_ascii=False,
+                            date_format='iso', date_unit='us')
+        if texto and not texto.endswith('\n'):
+            texto += '\n'
+    return texto.encode('utf-8')
+
+
+def exportar_tabela_incremental(engine, nome, tabela, pasta_saida, estado, formato,
+                                completo):
+    """
+    Exporta uma tabela para a exportação incremental: um snapshot completo
+    em um arquivo novo (nova geração) ou apenas as linhas alteradas desde
+    a marca d'água, acrescentadas ao fim do arquivo da geração atual.
+
+    Parâmetros:
+        engine (sqlalchemy.Engine): Engine conectada ao banco.
+        nome (str): Nome da tabela no manifesto e nos arquivos (ex.: 'movies').
+        tabela (sqlalchemy.Table): Tabela exportada.
+        pasta_saida (str): Pasta da exportação incremental.
+        estado (dict ou None): Entrada atual da tabela no manifesto.
+        formato (str): Formato de FORMATOS_INCREMENTAIS.
+        completo (bool): Se True, grava um snapshot completo (nova geração).
+
+    Retorno:
+        tuple: (estado, resultado), em que 'estado' é a nova entrada da
+        tabela no manifesto e 'resultado' o resumo da exportação.
+    """
+    inicio = time.perf_counter()
+    marca = estado['marca'] if estado and not completo else None
+
+    consulta = select(tabela).order_by(tabela.c.seq)
+    if not completo:
+        if marca is None:
+            consulta = consulta.where(tabela.c.seq.is_not(None))
+        else:
+            consulta = consulta.where(tabela.c.seq > marca)
+    with engine.connect() as conexao:
+        df = pd.read_sql(consulta, conexao)
+
+    resultado = {'tabela': nome, 'tipo': 'completo' if completo else 'incremental',
+                 'linhas': len(df), 'bytes': 0, 'segundos': None}
+    if not completo and df.empty:
+        resultado['tipo'] = None
+        resultado['arquivo'] = estado['arquivo']
+        resultado['segundos'] = time.perf_counter() - inicio
+        return estado, resultado
+
+    maior_seq = df['seq'].max() if not df.empty else None
+    marca_nova = int(maior_seq) if pd.notna(maior_seq) else marca
+    dados = serializar_linhas(df, formato, cabecalho=completo)
+    agora = datetime.now().isoformat()
+
+    if completo:
+        geracao = estado['geracao'] + 1 if estado else 1
+        arquivo = f'{nome}.{geracao:04d}{FORMATOS_INCREMENTAIS[formato]}'
+
+        def escrever(caminho):
+            with open(caminho, mode='wb') as saida:
+                saida.write(dados)
+
+        fim = escrever_atomico(os.path.join(pasta_saida, arquivo), escrever)
+        segmentos = []
+        inicio_segmento = 0
+    else:
+        geracao = estado['geracao']
+        arquivo = estado['arquivo']
+        segmentos = list(estado['segmentos'])
+        inicio_segmento = estado['bytes']
+        caminho = os.path.join(pasta_saida, arquivo)
+        with open(caminho, mode='r+b') as saida:
+            # Descarta o que uma execução interrompida escreveu depois do
+            # último segmento registrado no manifesto
+            saida.truncate(inicio_segmento)
+            saida.seek(inicio_segmento)
+            saida.write(dados)
+            saida.flush()
+            os.fsync(saida.fileno())
+        fim = inicio_segmento + len(dados)
+
+    segmentos.append({
+        'tipo': resultado['tipo'],
+        'byte_inicial': inicio_segmento,
+        'byte_final': fim,
+        'linhas': len(df),
+        'marca_anterior': marca,
+        'marca': marca_nova,
+        'criado_em': agora,
+    })
+    novo_estado = {
+        'formato': formato,
+        'geracao': geracao,
+        'arquivo': arquivo,
+        'bytes': fim,
+        'marca': marca_nova,
+        'segmentos': segmentos,
+    }
+    resultado.update(arquivo=arquivo, bytes=len(dados),
+                     segundos=time.perf_counter() - inicio)
+    return novo_estado, resultado
+
+
+def exportar_incremental(engine, pasta_saida = 'data/incremental', formato = 'jsonl',
+                         compactar = False, compactar_apos_segmentos = 50):
+    """
+    Exporta 'movies' e 'series' de forma incremental, acrescentando ao
+    fim dos arquivos apenas as linhas novas ou alteradas desde a última
+    exportação.
+
+    A marca d'água de cada tabela é o maior 'seq' já exportado (número
+    da alteração, crescente na ordem dos commits; ver
+    database.gatilhos_sequencia), e não o maior 'updated_at': a hora é
+    tomada antes da gravação, e uma transação confirmada depois da
+    exportação podia trazer linhas com hora anterior à marca, que nunca
+    seriam exportadas. Manifestos de versões anteriores, com a marca em
+    'updated_at', recomeçam com um snapshot completo.
+    Cada execução que encontra mudanças acrescenta um segmento ao arquivo
+    '<tabela>.<geração>.<extensão>' e o registra no manifesto
+    (manifest.json): bytes inicial e final, quantidade de linhas e
+    marcas d'água antes e depois. Sem mudanças, nada é escrito.
+
+    A compactação grava um snapshot completo em um arquivo de nova
+    geração (o primeiro segmento dele, com cabeçalho no caso do CSV) e
+    remove o arquivo da geração anterior. Ela acontece na primeira
+    exportação, quando 'compactar' é True, quando o formato muda ou
+    quando o arquivo atual já tem 'compactar_apos_segmentos' segmentos.
+    Como uma mesma linha pode aparecer em mais de um segmento, quem lê
+    deve ficar com a última ocorrência de cada 'id'.
+
+    Parâmetros:
+        engine (sqlalchemy.Engine): Engine conectada ao banco.
+        pasta_saida (str, opcional): Pasta dos arquivos e do manifesto.
+            Padrão: 'data/incremental'.
+        formato (str, opcional): 'jsonl' ou 'csv'. Padrão: 'jsonl'.
+        compactar (bool, opcional): Força um snapshot completo. Padrão: False.
+        compactar_apos_segmentos (int, opcional): Quantidade de segmentos
+            que dispara a compactação automática. Padrão: 50.
+
+    Retorno:
+        list[dict]: Um resumo por tabela, com as chaves 'tabela', 'arquivo',
+        'tipo' ('completo', 'incremental' ou None quando nada mudou),
+        'linhas', 'bytes' e 'segundos'.
+
+    Exceções:
+        ValueError: Se o formato não aceitar exportação incremental ou se
+            o banco não for SQLite (sem os gatilhos que numeram 'seq').
+    """
+    if formato not in FORMATOS_INCREMENTAIS:
+        raise ValueError(f'Formato sem suporte à exportação incremental: {formato} '
+                         f'(disponíveis: {sorted(FORMATOS_INCREMENTAIS)})')
+    if engine.dialect.name != 'sqlite':
+        raise ValueError('A exportação incremental exige um banco SQLite '
+                         f'(banco atual: {engine.dialect.name})')
+
+    os.makedirs(pasta_saida, exist_ok=True)
+    manifesto = carregar_manifesto(pasta_saida)
+
+    resultados = []
+    arquivos_antigos = []
+    for nome, tabela in TABELAS_INCREMENTAIS.items():
+        estado = manifesto['tabelas'].get(nome)
+        completo = (
+            compactar
+            or estado is None
+            or manifesto['versao'] != VERSAO_MANIFESTO
+            or estado['formato'] != formato
+            or len(estado['segmentos']) >= compactar_apos_segmentos
+            or not os.path.exists(os.path.join(pasta_saida, estado['arquivo']))
+        )
+        novo_estado, resultado = exportar_tabela_incremental(
+            engine, nome, tabela, pasta_saida, estado, formato, completo
+        )
+        if estado is not None and novo_estado['arquivo'] != estado['arquivo']:
+            arquivos_antigos.append(estado['arquivo'])
+        manifesto['tabelas'][nome] = novo_estado
+        resultados.append(resultado)
+
+    # O manifesto passa a apontar para os arquivos novos antes de os antigos sumirem
+    manifesto['versao'] = VERSAO_MANIFESTO
+    gravar_manifesto(pasta_saida, manifesto)
+    for arquivo in arquivos_antigos:
+        caminho = os.path.join(pasta_saida, arquivo)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+    return resultados
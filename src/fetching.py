@@ -0,0 +1,226 @@
+import http.client
+import queue
+import random
+import ssl
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+
+# Status HTTP que valem uma nova tentativa (com espera)
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+
+# Status HTTP de redirecionamento seguidos automaticamente
+STATUS_REDIRECIONAR = {301, 302, 303, 307, 308}
+
+
+class ErroHTTP(Exception):
+    """
+    Erro lançado quando a requisição termina com status HTTP de erro
+    ou quando as tentativas de conexão se esgotam.
+
+    Atributos:
+        url (str): URL requisitada.
+        status (int ou None): Status HTTP recebido (None se nem houve resposta).
+    """
+    def __init__(self, url, status = None, mensagem = ''):
+        super().__init__(mensagem or f'Falha ao acessar {url} (status {status})')
+        self.url = url
+        self.status = status
+
+
+class LimitadorTaxa:
+    """
+    Limitador de taxa no modelo "token bucket" (balde de fichas).
+
+    O balde começa cheio com 'capacidade' fichas e é reabastecido a
+    'taxa_por_segundo' fichas por segundo. Cada requisição consome uma
+    ficha; sem fichas disponíveis, a thread espera a próxima.
+
+    Atributos:
+        taxa_por_segundo (float): Fichas repostas por segundo.
+        capacidade (float): Máximo de fichas acumuladas (tamanho da rajada).
+    """
+    def __init__(self, taxa_por_segundo, capacidade = 1):
+        self.taxa_por_segundo = taxa_por_segundo
+        self.capacidade = capacidade
+        self._fichas = capacidade
+        self._ultima_reposicao = time.monotonic()
+        self._trava = threading.Lock()
+
+    def aguardar(self):
+        """
+        Consome uma ficha, esperando o tempo necessário se o balde estiver vazio.
+        """
+        with self._trava:
+            agora = time.monotonic()
+            self._fichas = min(
+                self.capacidade,
+                self._fichas + (agora - self._ultima_reposicao) * self.taxa_por_segundo
+            )
+            self._ultima_reposicao = agora
+            # A ficha é reservada já (o saldo pode ficar negativo) e a
+            # espera acontece fora da trava, para não bloquear as demais threads
+            self._fichas -= 1
+            espera = -self._fichas / self.taxa_por_segundo if self._fichas < 0 else 0
+        if espera > 0:
+            time.sleep(espera)
+
+
+class ClienteHTTP:
+    """
+    Cliente HTTP para uso concorrente, com conexões persistentes
+    (keep-alive) reaproveitadas por host.
+
+    Cada host tem:
+        - um pool de conexões abertas, limitado a 'max_conexoes_por_host'
+          requisições simultâneas;
+        - um limitador de taxa (token bucket).
+
+    Falhas de rede e status 429/5xx são repetidos até 'tentativas' vezes,
+    com espera exponencial (e respeitando 'Retry-After', quando enviado).
+
+    Atributos:
+        timeout (float): Tempo máximo de cada requisição, em segundos.
+        tentativas (int): Número máximo de tentativas por requisição.
+        espera_base (float): Espera da primeira repetição, em segundos
+            (dobra a cada nova tentativa).
+        max_conexoes_por_host (int): Requisições simultâneas por host.
+        requisicoes_por_segundo (float): Taxa máxima por host.
+        rajada (int): Requisições que podem sair de uma vez antes do limite.
+    """
+    def __init__(self, timeout = 30, tentativas = 3, espera_base = 0.5,
+                 max_conexoes_por_host = 4, requisicoes_por_segundo = 2, rajada = 4):
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self.max_conexoes_por_host = max_conexoes_por_host
+        self.requisicoes_por_segundo = requisicoes_por_segundo
+        self.rajada = rajada
+
+        self._trava = threading.Lock()
+        self._pools = {}
+        self._semaforos = {}
+        self._limitadores = {}
+
+    def _recursos_do_host(self, chave):
+        # Cria, na primeira vez, o pool, o semáforo e o limitador do host
+        with self._trava:
+            if chave not in self._pools:
+                self._pools[chave] = queue.LifoQueue()
+                self._semaforos[chave] = threading.BoundedSemaphore(self.max_conexoes_por_host)
+                self._limitadores[chave] = LimitadorTaxa(self.requisicoes_por_segundo, self.rajada)
+            return self._pools[chave], self._semaforos[chave], self._limitadores[chave]
+
+    def _nova_conexao(self, esquema, host, porta):
+        if esquema == 'https':
+            return http.client.HTTPSConnection(
+                host, porta, timeout=self.timeout, context=ssl.create_default_context()
+            )
+        return http.client.HTTPConnection(host, porta, timeout=self.timeout)
+
+    def _executar(self, url, headers, timeout):
+        # Faz uma única requisição GET usando uma conexão do pool do host
+        partes = urlsplit(url)
+        esquema = partes.scheme or 'http'
+        porta = partes.port or (443 if esquema == 'https' else 80)
+        chave = (esquema, partes.hostname, porta)
+        caminho = partes.path or '/'
+        if partes.query:
+            caminho += '?' + partes.query
+
+        pool, semaforo, limitador = self._recursos_do_host(chave)
+        limitador.aguardar()
+
+        with semaforo:
+            try:
+                conexao = pool.get_nowait()
+            except queue.Empty:
+                conexao = self._nova_conexao(esquema, partes.hostname, porta)
+
+            conexao.timeout = timeout
+            if conexao.sock is not None:
+                conexao.sock.settimeout(timeout)
+
+            try:
+                conexao.request('GET', caminho, headers=headers)
+                resposta = conexao.getresponse()
+                corpo = resposta.read()
+            except (OSError, http.client.HTTPException):
+                conexao.close()
+                raise
+
+            if resposta.will_close:
+                conexao.close()
+            else:
+                pool.put(conexao)
+
+        return resposta.status, resposta.headers, corpo
+
+    def _esperar_tentativa(self, tentativa, retry_after = None):
+        # Espera exponencial com um pouco de aleatoriedade
+        espera = self.espera_base * (2 ** tentativa) * (1 + random.random() * 0.1)
+        if retry_after and retry_after.isdigit():
+            espera = max(espera, int(retry_after))
+        time.sleep(espera)
+
+    def requisitar(self, url, headers = None, timeout = None):
+        """
+        Faz uma requisição GET, seguindo redirecionamentos e repetindo
+        falhas temporárias.
+
+        Parâmetros:
+            url (str): URL requisitada.
+            headers (dict, opcional): Cabeçalhos da requisição.
+            timeout (float, opcional): Tempo máximo desta requisição;
+                se omitido, usa o timeout do cliente.
+
+        Retorno:
+            tuple: (status, cabecalhos, corpo), em que 'cabecalhos' é o objeto
+            de cabeçalhos da resposta e 'corpo' são os bytes recebidos
+            (ainda comprimidos, se for o caso).
+
+        Exceções:
+            ErroHTTP: Se todas as tentativas falharem por erro de rede
+            ou status temporário.
+        """
+        headers = dict(headers or {})
+        timeout = timeout if timeout is not None else self.timeout
+        redirecionamentos = 0
+        tentativa = 0
+
+        while True:
+            try:
+                status, cabecalhos, corpo = self._executar(url, headers, timeout)
+            except (OSError, http.client.HTTPException) as erro:
+                tentativa += 1
+                if tentativa >= self.tentativas:
+                    raise ErroHTTP(url, mensagem=f'Falha de rede ao acessar {url}: {erro}') from erro
+                self._esperar_tentativa(tentativa - 1)
+                continue
+
+            if status in STATUS_REDIRECIONAR and cabecalhos.get('Location') and redirecionamentos < 5:
+                url = urljoin(url, cabecalhos['Location'])
+                redirecionamentos += 1
+                continue
+
+            if status in STATUS_REPETIR:
+                tentativa += 1
+                if tentativa >= self.tentativas:
+                    raise ErroHTTP(url, status)
+                self._esperar_tentativa(tentativa - 1, cabecalhos.get('Retry-After'))
+                continue
+
+            return status, cabecalhos, corpo
+
+    def fechar(self):
+        """
+        Fecha todas as conexões mantidas nos pools.
+        """
+        with self._trava:
+            for pool in self._pools.values():
+                while True:
+                    try:
+                        pool.get_nowait().close()
+                    except queue.Empty:
+                        break
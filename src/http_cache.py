@@ -0,0 +1,259 @@
+import gzip
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+try:
+    import brotli  # opcional: só é usado se estiver instalado
+except ImportError:
+    brotli = None
+
+
+class ForaDoCacheError(Exception):
+    """
+    Erro lançado no modo offline quando a URL pedida não está no cache.
+    """
+
+
+def aceitar_codificacoes():
+    """
+    Monta o valor do cabeçalho 'Accept-Encoding' de acordo com os
+    descompressores disponíveis no ambiente.
+
+    Retorno:
+        str: Ex.: 'gzip, deflate' ou 'gzip, deflate, br'.
+    """
+    codificacoes = ['gzip', 'deflate']
+    if brotli is not None:
+        codificacoes.append('br')
+    return ', '.join(codificacoes)
+
+
+def descomprimir(corpo, codificacao):
+    """
+    Descomprime o corpo de uma resposta HTTP conforme o 'Content-Encoding'.
+
+    Parâmetros:
+        corpo (bytes): Corpo recebido da rede.
+        codificacao (str ou None): Valor do cabeçalho 'Content-Encoding'.
+
+    Retorno:
+        bytes: Corpo descomprimido (ou o próprio corpo, se não houver compressão).
+    """
+    codificacao = (codificacao or '').strip().lower()
+    if codificacao in ('', 'identity'):
+        return corpo
+    if codificacao == 'gzip':
+        return gzip.decompress(corpo)
+    if codificacao == 'deflate':
+        try:
+            return zlib.decompress(corpo)
+        except zlib.error:
+            # Alguns servidores enviam deflate "cru", sem cabeçalho zlib
+            return zlib.decompress(corpo, -zlib.MAX_WBITS)
+    if codificacao == 'br' and brotli is not None:
+        return brotli.decompress(corpo)
+    raise ValueError(f'Content-Encoding não suportado: "{codificacao}"')
+
+
+class CacheHTTP:
+    """
+    Cache persistente de respostas HTTP, indexado pela URL e gravado
+    em um arquivo SQLite (por padrão em data/http_cache.db).
+
+    Cada entrada guarda o corpo já descomprimido e os cabeçalhos 'ETag'
+    e 'Last-Modified', usados para revalidar a resposta com o servidor
+    depois que o TTL expira. O tamanho total é limitado e as entradas
+    menos usadas recentemente (LRU) são removidas primeiro.
+
+    Atributos:
+        caminho (str): Arquivo SQLite do cache.
+        ttl_segundos (int): Tempo em que uma entrada é usada sem revalidação.
+        tamanho_max_bytes (int): Tamanho máximo somado dos corpos guardados.
+        offline (bool): Se True, as respostas vêm apenas do cache.
+        estatisticas (dict): Contadores 'acertos', 'faltas',
+            'revalidacoes', 'bytes_economizados' (corpos servidos pelo
+            cache, em acertos e respostas 304) e 'bytes_comprimidos'
+            (bytes a menos trafegados graças à compressão, nas faltas).
+    """
+    def __init__(self, caminho = 'data/http_cache.db', ttl_segundos = 3600,
+                 tamanho_max_bytes = 50 * 1024 * 1024, offline = False):
+        self.caminho = caminho
+        self.ttl_segundos = ttl_segundos
+        self.tamanho_max_bytes = tamanho_max_bytes
+        self.offline = offline
+        self.estatisticas = {
+            'acertos': 0,
+            'faltas': 0,
+            'revalidacoes': 0,
+            'bytes_economizados': 0,
+            'bytes_comprimidos': 0,
+        }
+
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+        # Uma única conexão protegida por trava (o cache pode ser usado por várias threads)
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute(
+            'CREATE TABLE IF NOT EXISTS respostas ('
+            ' url TEXT PRIMARY KEY,'
+            ' corpo BLOB NOT NULL,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' armazenado_em REAL NOT NULL,'
+            ' ultimo_acesso REAL NOT NULL,'
+            ' tamanho INTEGER NOT NULL)'
+        )
+        self._conexao.execute(
+            'CREATE INDEX IF NOT EXISTS ix_respostas_ultimo_acesso '
+            'ON respostas (ultimo_acesso)'
+        )
+        self._conexao.commit()
+
+    def obter(self, url):
+        """
+        Busca a entrada guardada para uma URL.
+
+        Parâmetros:
+            url (str): URL da página.
+
+        Retorno:
+            dict ou None: Entrada com as chaves 'corpo', 'etag',
+            'last_modified' e 'armazenado_em', ou None se não existir.
+        """
+        with self._trava:
+            linha = self._conexao.execute(
+                'SELECT corpo, etag, last_modified, armazenado_em '
+                'FROM respostas WHERE url = ?', (url,)
+            ).fetchone()
+        if linha is None:
+            return None
+        return {
+            'corpo': linha[0],
+            'etag': linha[1],
+            'last_modified': linha[2],
+            'armazenado_em': linha[3],
+        }
+
+    def esta_fresca(self, entrada):
+        """
+        Indica se a entrada ainda está dentro do TTL.
+
+        Parâmetros:
+            entrada (dict): Entrada devolvida por obter().
+
+        Retorno:
+            bool: True se pode ser usada sem revalidação.
+        """
+        return time.time() - entrada['armazenado_em'] < self.ttl_segundos
+
+    def cabecalhos_condicionais(self, entrada):
+        """
+        Monta os cabeçalhos de revalidação ('If-None-Match' e
+        'If-Modified-Since') a partir de uma entrada do cache.
+
+        Parâmetros:
+            entrada (dict ou None): Entrada devolvida por obter().
+
+        Retorno:
+            dict: Cabeçalhos a acrescentar na requisição.
+        """
+        cabecalhos = {}
+        if entrada is None:
+            return cabecalhos
+        if entrada['etag']:
+            cabecalhos['If-None-Match'] = entrada['etag']
+        if entrada['last_modified']:
+            cabecalhos['If-Modified-Since'] = entrada['last_modified']
+        return cabecalhos
+
+    def registrar_acerto(self, url, entrada, revalidada = False):
+        """
+        Contabiliza o uso de uma entrada do cache e atualiza seu último acesso.
+
+        Se a entrada foi revalidada pelo servidor (resposta 304), o TTL
+        volta a contar a partir de agora.
+
+        Parâmetros:
+            url (str): URL da página.
+            entrada (dict): Entrada devolvida por obter().
+            revalidada (bool, opcional): True se veio de uma resposta 304.
+        """
+        agora = time.time()
+        with self._trava:
+            if revalidada:
+                self._conexao.execute(
+                    'UPDATE respostas SET armazenado_em = ?, ultimo_acesso = ? '
+                    'WHERE url = ?', (agora, agora, url)
+                )
+                self.estatisticas['revalidacoes'] += 1
+            else:
+                self._conexao.execute(
+                    'UPDATE respostas SET ultimo_acesso = ? WHERE url = ?',
+                    (agora, url)
+                )
+            self._conexao.commit()
+            self.estatisticas['acertos'] += 1
+            self.estatisticas['bytes_economizados'] += len(entrada['corpo'])
+
+    def salvar(self, url, corpo, etag = None, last_modified = None, bytes_recebidos = None):
+        """
+        Guarda (ou substitui) a resposta de uma URL e aplica o limite
+        de tamanho, removendo as entradas menos usadas recentemente.
+
+        Parâmetros:
+            url (str): URL da página.
+            corpo (bytes): Corpo já descomprimido.
+            etag (str, opcional): Valor do cabeçalho 'ETag'.
+            last_modified (str, opcional): Valor do cabeçalho 'Last-Modified'.
+            bytes_recebidos (int, opcional): Bytes efetivamente trafegados;
+                a diferença para o corpo descomprimido conta como economia
+                da compressão ('bytes_comprimidos'), e não do cache.
+        """
+        agora = time.time()
+        with self._trava:
+            self.estatisticas['faltas'] += 1
+            if bytes_recebidos is not None:
+                self.estatisticas['bytes_comprimidos'] += max(len(corpo) - bytes_recebidos, 0)
+
+            if len(corpo) > self.tamanho_max_bytes:
+                # Resposta maior que o cache inteiro: não vale guardar
+                return
+
+            self._conexao.execute(
+                'INSERT OR REPLACE INTO respostas '
+                '(url, corpo, etag, last_modified, armazenado_em, ultimo_acesso, tamanho) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, corpo, etag, last_modified, agora, agora, len(corpo))
+            )
+            self._remover_excedente()
+            self._conexao.commit()
+
+    def _remover_excedente(self):
+        # Remove as entradas com acesso mais antigo até caber no limite
+        total = self._conexao.execute(
+            'SELECT COALESCE(SUM(tamanho), 0) FROM respostas'
+        ).fetchone()[0]
+        if total <= self.tamanho_max_bytes:
+            return
+        remover = []
+        for url, tamanho in self._conexao.execute(
+            'SELECT url, tamanho FROM respostas ORDER BY ultimo_acesso'
+        ).fetchall():
+            if total <= self.tamanho_max_bytes:
+                break
+            remover.append((url,))
+            total -= tamanho
+        self._conexao.executemany('DELETE FROM respostas WHERE url = ?', remover)
+
+    def fechar(self):
+        """
+        Fecha a conexão com o arquivo do cache.
+        """
+        with self._trava:
+            self._conexao.close()
@@ -0,0 +1,288 @@
+import gzip
+import time
+
+from sqlalchemy import Column, MetaData, String, Table, select
+
+from .database import MovieDB, SeriesDB, gravar_lote, sincronizar_indice_busca
+from .metrics import instrumentar, pico_memoria_mb
+from .streaming import agrupar, em_fila
+
+
+# Valor usado pelo IMDb nos arquivos TSV para campos vazios
+NULO_TSV = '\\N'
+
+# titleType dos arquivos do IMDb gravados em cada tabela
+TIPOS_FILME = {'movie'}
+TIPOS_SERIE = {'tvSeries', 'tvMiniSeries'}
+
+# Colunas gravadas em cada tabela, na ordem das tuplas montadas em linha_do_titulo
+COLUNAS_MOVIES = ['title', 'year', 'rating', 'imdb_id', 'runtime', 'genres']
+COLUNAS_SERIES = ['title', 'year', 'imdb_id', 'runtime', 'genres']
+
+# Títulos já gravados pela carga em andamento (tabela temporária, que só
+# existe na conexão da carga): entre títulos homônimos, vale o primeiro lido
+TITULOS_LIDOS = Table(
+    'titulos_lidos', MetaData(),
+    Column('tabela', String, primary_key=True),
+    Column('title', String, primary_key=True),
+    prefixes=['TEMPORARY'],
+    sqlite_with_rowid=False,
+)
+
+
+def ler_tsv_gz(caminho, colunas):
+    """
+    Lê um arquivo TSV comprimido com gzip linha a linha, descomprimindo
+    aos poucos (sem carregar o arquivo inteiro).
+
+    Parâmetros:
+        caminho (str): Caminho do arquivo .tsv.gz.
+        colunas (list[str]): Colunas desejadas (precisam estar no cabeçalho).
+
+    Retorno:
+        generator: Listas com os valores das colunas pedidas, na ordem
+        de 'colunas' ('\\N' vira None).
+
+    Exceções:
+        ValueError: Se alguma coluna não estiver no cabeçalho.
+    """
+    with gzip.open(caminho, mode='rt', encoding='utf-8', newline='\n') as arquivo:
+        cabecalho = arquivo.readline().rstrip('\n').split('\t')
+        faltando = [coluna for coluna in colunas if coluna not in cabecalho]
+        if faltando:
+            raise ValueError(f'Colunas ausentes em {caminho}: {faltando}')
+        posicoes = [cabecalho.index(coluna) for coluna in colunas]
+
+        for linha in arquivo:
+            campos = linha.rstrip('\n').split('\t')
+            yield [None if campos[i] == NULO_TSV else campos[i] for i in posicoes]
+
+
+def numero_tconst(tconst):
+    # 'tt0111161' -> 111161 (a ordem numérica vale também entre 7 e 8 dígitos)
+    return int(tconst[2:])
+
+
+def juntar_notas(titulos, notas):
+    """
+    Junta cada título à sua nota (merge join pelo número do tconst).
+
+    Os dois arquivos do IMDb vêm ordenados por tconst, de modo que basta
+    avançar os dois ao mesmo tempo: só uma linha de cada fica em memória.
+
+    Parâmetros:
+        titulos (iterable): Listas [tconst, ...] de title.basics.
+        notas (iterable): Listas [tconst, averageRating, numVotes] de title.ratings.
+
+    Retorno:
+        generator: Tuplas (campos_do_titulo, nota, votos), com nota e votos
+        None quando o título não tem avaliação.
+
+    Exceções:
+        ValueError: Se algum dos arquivos não estiver ordenado por tconst.
+    """
+    notas = iter(notas)
+    ultima_nota = -1
+
+    def proxima_nota():
+        nonlocal ultima_nota
+        campos = next(notas, None)
+        if campos is None:
+            return None
+        numero = numero_tconst(campos[0])
+        if numero <= ultima_nota:
+            raise ValueError(f'Arquivo de notas fora de ordem em {campos[0]}')
+        ultima_nota = numero
+        return numero, campos
+
+    nota_atual = proxima_nota()
+    ultimo_titulo = -1
+    for campos in titulos:
+        numero = numero_tconst(campos[0])
+        if numero <= ultimo_titulo:
+            raise ValueError(f'Arquivo de títulos fora de ordem em {campos[0]}')
+        ultimo_titulo = numero
+
+        while nota_atual is not None and nota_atual[0] < numero:
+            nota_atual = proxima_nota()
+        if nota_atual is not None and nota_atual[0] == numero:
+            yield campos, float(nota_atual[1][1]), int(nota_atual[1][2])
+        else:
+            yield campos, None, None
+
+
+def inteiro_ou_none(valor):
+    return int(valor) if valor is not None else None
+
+
+def linha_do_titulo(campos, nota):
+    """
+    Converte um título de title.basics (já com a nota) na tupla gravada
+    em 'movies' (COLUNAS_MOVIES) ou 'series' (COLUNAS_SERIES).
+
+    Retorno:
+        tuple: (tipo, linha), com tipo 'movie', 'series' ou None (título ignorado).
+    """
+    tconst, tipo_titulo, titulo, _, ano, duracao, generos = campos
+    if generos is not None:
+        generos = generos.replace(',', ', ')  # mesmo formato do enriquecimento
+    if tipo_titulo in TIPOS_FILME:
+        return 'movie', (titulo, inteiro_ou_none(ano), nota, tconst,
+                         inteiro_ou_none(duracao), generos)
+    if tipo_titulo in TIPOS_SERIE:
+        return 'series', (titulo, inteiro_ou_none(ano), tconst,
+                          inteiro_ou_none(duracao), generos)
+    return None, None
+
+
+def obter_titulos_dataset(caminho_basics, caminho_ratings, min_votos = None,
+                          incluir_adultos = False):
+    """
+    Lê os arquivos de dados em massa do IMDb (title.basics.tsv.gz e
+    title.ratings.tsv.gz) e gera os filmes e séries, já com as notas.
+
+    É a alternativa a scraping.obter_filmes_top para catálogos completos:
+    os dois arquivos são lidos em streaming e juntados por tconst
+    (ver juntar_notas), com memória constante.
+
+    Parâmetros:
+        caminho_basics (str): Caminho de title.basics.tsv.gz.
+        caminho_ratings (str): Caminho de title.ratings.tsv.gz.
+        min_votos (int, opcional): Se informado, só entram títulos
+            avaliados com pelo menos essa quantidade de votos.
+        incluir_adultos (bool, opcional): Se True, inclui títulos adultos.
+            Padrão: False.
+
+    Retorno:
+        generator: Tuplas (tipo, linha), com tipo 'movie' ou 'series' e a
+        linha nas colunas de COLUNAS_MOVIES ou COLUNAS_SERIES.
+    """
+    titulos = ler_tsv_gz(caminho_basics, [
+        'tconst', 'titleType', 'primaryTitle', 'isAdult', 'startYear',
+        'runtimeMinutes', 'genres'
+    ])
+    notas = ler_tsv_gz(caminho_ratings, ['tconst', 'averageRating', 'numVotes'])
+
+    for campos, nota, votos in juntar_notas(titulos, notas):
+        if campos[1] not in TIPOS_FILME and campos[1] not in TIPOS_SERIE:
+            continue
+        if not incluir_adultos and campos[3] == '1':
+            continue
+        if min_votos is not None and (votos is None or votos < min_votos):
+            continue
+        if campos[2] is None:
+            continue
+        yield linha_do_titulo(campos, nota)
+
+
+def anotar_titulos_lidos(conexao, nome_tabela, titulos):
+    # Acrescenta os títulos a TITULOS_LIDOS; com parâmetros posicionais (na
+    # ordem das colunas: tabela, title), as tuplas vão direto para o
+    # executemany do driver, sem um dicionário por linha (ver database.gravar_lote)
+    comando = TITULOS_LIDOS.insert()
+    compilado = comando.compile(dialect=conexao.dialect)
+    if compilado.positiontup is None:
+        conexao.execute(comando, [{'tabela': nome_tabela, 'title': titulo} for titulo in titulos])
+    else:
+        conexao.exec_driver_sql(str(compilado), [(nome_tabela, titulo) for titulo in titulos])
+
+
+@instrumentar('ingerir_datasets', contar=lambda contagem: {
+    'linhas': contagem['filmes'] + contagem['series']})
+def ingerir_datasets(engine, caminho_basics, caminho_ratings, tamanho_lote = 5000,
+                     atualizar = True, min_votos = None, incluir_adultos = False,
+                     tamanho_fila = 4):
+    """
+    Grava no banco os filmes e séries dos arquivos de dados em massa do
+    IMDb, em lotes (um INSERT ... ON CONFLICT por lote, ver gravar_lote).
+
+    A leitura dos arquivos roda em outra thread, em blocos de
+    'tamanho_lote' títulos, ligada à gravação por uma fila de até
+    'tamanho_fila' blocos (ver streaming.em_fila): o próximo bloco é
+    descomprimido e interpretado enquanto o anterior é gravado, e a
+    leitura espera quando a gravação fica para trás.
+
+    Como 'movies' e 'series' usam o título como chave única, títulos
+    homônimos ocupam uma única linha, e vale sempre o primeiro lido nos
+    arquivos (os seguintes contam como ignorados), qualquer que seja o
+    tamanho do lote: os títulos já gravados pela carga ficam em uma
+    tabela temporária (TITULOS_LIDOS) da conexão usada em todos os lotes,
+    e não em memória.
+
+    Parâmetros:
+        engine (sqlalchemy.Engine): Engine conectada ao banco (com ON CONFLICT).
+        caminho_basics (str): Caminho de title.basics.tsv.gz.
+        caminho_ratings (str): Caminho de title.ratings.tsv.gz.
+        tamanho_lote (int, opcional): Linhas por transação. Padrão: 5000.
+        atualizar (bool, opcional): Se True, atualiza títulos já existentes.
+            Padrão: True.
+        min_votos (int, opcional): Votos mínimos (ver obter_titulos_dataset).
+        incluir_adultos (bool, opcional): Se True, inclui títulos adultos.
+            Padrão: False.
+        tamanho_fila (int, opcional): Blocos lidos à frente da gravação;
+            com 0, leitura e gravação se alternam na mesma thread. Padrão: 4.
+
+    Retorno:
+        dict: Contagem com as chaves 'filmes', 'series', 'inseridos',
+        'atualizados', 'ignorados', 'segundos', 'linhas_por_segundo'
+        (títulos gravados por segundo) e 'pico_rss_mb'.
+    """
+    inicio = time.perf_counter()
+    contagem = {'filmes': 0, 'series': 0, 'inseridos': 0, 'atualizados': 0, 'ignorados': 0}
+    destinos = {
+        'movie': (MovieDB.__table__, COLUNAS_MOVIES, {}),
+        'series': (SeriesDB.__table__, COLUNAS_SERIES, {}),
+    }
+
+    def gravar(conexao, tabela, colunas, lote):
+        with conexao.begin():
+            # Títulos gravados por lotes anteriores desta carga: vale o primeiro
+            repetidos = set(conexao.scalars(select(TITULOS_LIDOS.c.title).where(
+                TITULOS_LIDOS.c.tabela == tabela.name, TITULOS_LIDOS.c.title.in_(list(lote))
+            )))
+            linhas = [linha for titulo, linha in lote.items() if titulo not in repetidos]
+            contagem['ignorados'] += len(repetidos)
+            if linhas:
+                parcial = gravar_lote(conexao, tabela, colunas, linhas, atualizar)
+                for chave in ('inseridos', 'atualizados', 'ignorados'):
+                    contagem[chave] += parcial[chave]
+                anotar_titulos_lidos(conexao, tabela.name, [linha[0] for linha in linhas])
+        lote.clear()
+
+    blocos = agrupar(obter_titulos_dataset(caminho_basics, caminho_ratings, min_votos, incluir_adultos),
+                     tamanho_lote)
+    if tamanho_fila:
+        blocos = em_fila(blocos, tamanho_fila)
+
+    with engine.connect() as conexao:
+        with conexao.begin():
+            TITULOS_LIDOS.create(conexao)
+        try:
+            for bloco in blocos:
+                for tipo, linha in bloco:
+                    tabela, colunas, lote = destinos[tipo]
+                    contagem['filmes' if tipo == 'movie' else 'series'] += 1
+                    # Títulos repetidos dentro do lote: vale o primeiro
+                    if linha[0] in lote:
+                        contagem['ignorados'] += 1
+                        continue
+                    lote[linha[0]] = linha
+                    if len(lote) >= tamanho_lote:
+                        gravar(conexao, tabela, colunas, lote)
+
+            for tabela, colunas, lote in destinos.values():
+                if lote:
+                    gravar(conexao, tabela, colunas, lote)
+        finally:
+            # A conexão volta ao pool: a tabela temporária não pode ficar nela
+            if conexao.in_transaction():
+                conexao.rollback()
+            with conexao.begin():
+                TITULOS_LIDOS.drop(conexao)
+    sincronizar_indice_busca(engine)
+
+    contagem['segundos'] = time.perf_counter() - inicio
+    total = contagem['filmes'] + contagem['series']
+    contagem['linhas_por_segundo'] = total / contagem['segundos'] if contagem['segundos'] else 0
+    contagem['pico_rss_mb'] = pico_memoria_mb()
+    return contagem
@@ -1,23 +1,27 @@
+import argparse
 import os
 import json
+import pstats
+import threading
+import tracemalloc
 
-# Scraping (src/scraping.py)
-from src.scraping import obter_filmes_top
+from src.arquivos import escrever_atomico, temporario_atomico
+from src.metrics import gravar_metricas, instrumentar
+from src.pipeline import Etapa, executar_pipeline, etapas_a_partir_de, hash_arquivo
 
-# Classes/objetos (src/models.py)
-from src.models import criar_catalogo
+# Os módulos do projeto (e com eles bs4, SQLAlchemy e Pandas) são importados
+# dentro de cada etapa, de modo que uma etapa só carrega o que usa:
+#   scrape  -> src/scraping.py, src/fetching.py, src/http_cache.py (bs4)
+#   load    -> src/models.py, src/database.py (SQLAlchemy)
+#   analyze, export, report -> src/analysis.py, src/exporting.py (Pandas)
 
-# Manipulação do banco (src/database)
-from src.database import criar_engine, criar_tabelas, salvar_catalogo_no_banco
 
-# Funções de análise e exportação (src/analysis.py)
-from src.analysis import (
-    carregar_dataframe_movies,
-    carregar_dataframe_series,
-    exportar_csv_json,
-    adicionar_categoria,
-    resumo_categoria_ano,
-)
+# Etapas do fluxo, na ordem em que rodam quando nenhuma é escolhida
+ETAPAS = ('scrape', 'load', 'analyze', 'export', 'report')
+
+# Protege a criação da engine e a leitura dos DataFrames compartilhados
+# pelas etapas que rodam ao mesmo tempo (analyze, export e report)
+_trava_contexto = threading.RLock()
 
 
 def carregar_config(caminho_config = "config.json"):
@@ -31,37 +35,364 @@ def carregar_config(caminho_config = "config.json"):
 
     Retorno:
         dict: Dicionário contendo pelo menos:
-            - "imdb_url": URL da página do IMDb Top 250.
-            - "n_filmes": quantidade de filmes a coletar (opcional).
+            - "fontes": lista de rankings a coletar, cada um com "nome",
+              "tipo" ("movie" ou "series"), "url", "n_titulos" e "ativo"
+              (opcionais). No formato antigo, "imdb_url" e "n_filmes"
+              descrevem um único ranking de filmes.
+            - "rede": parâmetros do download concorrente (max_workers,
+              max_conexoes_por_host, requisicoes_por_segundo, rajada,
+              timeout, tentativas, espera_base) (opcional).
+            - "gravacao": modo de gravação no banco ("lote" ou "registro"),
+              tamanho do lote e se títulos existentes são atualizados (opcional).
+            - "cache_http": parâmetros do cache de páginas baixadas
+              (ativo, caminho, ttl_segundos, tamanho_max_mb, offline) (opcional).
+            - "categorias": faixas da classificação textual das notas
+              ("limites" e "rotulos") (opcional).
+            - "enriquecimento": etapa opcional que visita a página de cada
+              título (ativo, max_workers, max_conexoes_por_host,
+              idade_max_dias) (opcional).
+            - "exportacao": formatos exportados no Ex. 8 ("csv", "json",
+              "jsonl", "parquet", "feather"), pasta de saída, compressão
+              do Parquet, escritas simultâneas e a exportação incremental
+              ("incremental": ativo, pasta_saida, formato,
+              compactar_apos_segmentos) (opcional).
+            - "cache_dataframes": cache em arquivos Arrow das tabelas lidas
+              no Ex. 7 (ativo, pasta) (opcional).
+            - "analise": se o resumo do Ex. 10 é lido da tabela
+              'movies_resumo' (materializado), se os Ex. 8 e 10 leem o
+              banco em blocos (em_blocos, tamanho_bloco), e o backend das
+              consultas dos Ex. 8 a 10 ("pandas" ou "duckdb"; ver
+              src/analysis_duckdb.py: "duckdb": fonte, pasta_parquet,
+              threads) (opcional).
+            - "datasets": carga opcional dos arquivos title.basics.tsv.gz
+              e title.ratings.tsv.gz do IMDb (ativo, basics, ratings,
+              tamanho_lote, min_votos) (opcional).
+            - "historico": se cada execução registra um snapshot dos
+              rankings (posição, nota e votos) (ativo) (opcional).
+            - "rankings_coletados": arquivo JSON em que a etapa 'scrape'
+              guarda os rankings para a etapa 'load' (opcional).
+            - "pipeline": manifesto com a última execução de cada etapa e
+              quantidade de etapas executadas ao mesmo tempo (manifesto,
+              max_workers) (opcional).
+            - "metricas": arquivos com as métricas de cada etapa (ativo,
+              arquivo, prometheus), o tracemalloc (tracemalloc) e o arquivo
+              do '--profile' (perfil) (opcional).
+            - "streaming": se a coleta, o catálogo e a gravação no banco
+              rodam ligados por filas limitadas, página a página, e
+              quantos itens cada fila guarda (ativo, tamanho_fila); vale
+              também para a leitura dos datasets (opcional).
+            - "servico": serviço HTTP somente leitura do catálogo (ver
+              src/service.py: banco, host, porta, conexoes, tamanho_cache,
+              tamanho_cache_mb) (opcional).
     """
     with open(caminho_config, mode='r', encoding='utf-8') as arquivo:
         config = json.load(arquivo)
     return config
 
 
-def main():
+def obter_fontes(config):
     """
-    Executa o fluxo completo do trabalho:
+    Monta a lista de rankings ativos a partir do config.
+
+    Aceita tanto a lista "fontes" quanto o formato antigo
+    ("imdb_url" e "n_filmes"), tratado como um único ranking de filmes.
 
-        1. Lê o arquivo de configuração (config.json).
-        2. Faz o scraping da página do IMDb (Exercícios 1 e 2).
-        3. Cria os objetos Movie e Series e monta a lista catalog (Ex. 3, 4 e 5).
-        4. Cria o banco de dados e grava os dados (Ex. 6).
-        5. Lê os dados do banco com Pandas (Ex. 7).
-        6. Filtra, ordena e exporta filmes/séries (Ex. 8).
-        7. Cria a coluna de categoria textual das notas (Ex. 9).
-        8. Gera o resumo de filmes por categoria e ano (Ex. 10).
+    Parâmetros:
+        config (dict): Configuração lida de config.json.
 
-    Ao longo da execução, imprime no terminal saídas que respondem
-    diretamente ao enunciado de cada exercício.
+    Retorno:
+        list[dict]: Fontes ativas, cada uma com 'nome', 'tipo', 'url' e 'n_titulos'.
     """
-    # 1. Lê o arquivo de configuração (config.json)
-    config = carregar_config()
-    url = config.get("imdb_url")
-    n_filmes = config.get("n_filmes", 250)  # default 250
+    if "fontes" not in config:
+        return [{
+            "nome": "top_filmes",
+            "tipo": "movie",
+            "url": config.get("imdb_url"),
+            "n_titulos": config.get("n_filmes", 250),  # default 250
+        }]
+    return [fonte for fonte in config["fontes"] if fonte.get("ativo", True)]
+
+
+def criar_cliente_http(config, secao = "rede"):
+    """
+    Cria o cliente HTTP compartilhado a partir da seção "rede" do config.
+
+    Parâmetros:
+        config (dict): Configuração lida de config.json.
+        secao (str, opcional): Seção cujos valores substituem os da seção
+            "rede" (ex.: "enriquecimento"). Padrão: "rede".
+
+    Retorno:
+        ClienteHTTP: Cliente com pool de conexões, limite de taxa e novas tentativas.
+    """
+    from src.fetching import ClienteHTTP
+
+    config_rede = {**config.get("rede", {}), **config.get(secao, {})}
+    return ClienteHTTP(
+        timeout=config_rede.get("timeout", 30),
+        tentativas=config_rede.get("tentativas", 3),
+        espera_base=config_rede.get("espera_base", 0.5),
+        max_conexoes_por_host=config_rede.get("max_conexoes_por_host", 4),
+        requisicoes_por_segundo=config_rede.get("requisicoes_por_segundo", 2),
+        rajada=config_rede.get("rajada", 4),
+    )
+
+
+def criar_cache_http(config):
+    """
+    Cria o cache de respostas HTTP a partir da seção "cache_http" do config.
+
+    Parâmetros:
+        config (dict): Configuração lida de config.json.
+
+    Retorno:
+        CacheHTTP ou None: Cache pronto para uso, ou None se estiver desativado.
+    """
+    from src.http_cache import CacheHTTP
+
+    config_cache = config.get("cache_http", {})
+    if not config_cache.get("ativo", True):
+        return None
+    return CacheHTTP(
+        caminho=config_cache.get("caminho", "data/http_cache.db"),
+        ttl_segundos=config_cache.get("ttl_segundos", 3600),
+        tamanho_max_bytes=config_cache.get("tamanho_max_mb", 50) * 1024 * 1024,
+        offline=config_cache.get("offline", False),
+    )
+
+
+def salvar_rankings(rankings, caminho):
+    """
+    Guarda os rankings coletados em JSON, para a etapa 'load' rodar
+    separada da etapa 'scrape'. A escrita é atômica (ver
+    arquivos.escrever_atomico), de modo que o arquivo nunca fica pela metade.
+
+    Parâmetros:
+        rankings (dict): Rankings no formato de obter_rankings.
+        caminho (str): Caminho do arquivo JSON.
+    """
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+
+    def escrever(temporario):
+        with open(temporario, mode='w', encoding='utf-8') as arquivo:
+            json.dump(rankings, arquivo, ensure_ascii=False)
+
+    escrever_atomico(caminho, escrever)
+
+
+def salvar_rankings_em_fluxo(rankings, caminho):
+    """
+    Versão em streaming de salvar_rankings: grava cada ranking assim que
+    ele chega e o repassa adiante, sem juntar todos antes. O arquivo
+    final é idêntico ao de salvar_rankings e só substitui o anterior
+    depois que o último ranking passa (ver arquivos.temporario_atomico);
+    se a coleta falhar ou o gerador for fechado antes do fim, o arquivo
+    anterior fica como estava.
+
+    Parâmetros:
+        rankings (iterable): Pares (fonte, itens), como os de scraping.gerar_rankings.
+        caminho (str): Caminho do arquivo JSON.
+
+    Retorno:
+        generator: Os mesmos pares, depois de gravados.
+    """
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with temporario_atomico(caminho) as temporario, open(temporario, mode='w', encoding='utf-8') as arquivo:
+        arquivo.write('{')
+        for posicao, (fonte, itens) in enumerate(rankings):
+            if posicao:
+                arquivo.write(', ')
+            arquivo.write(json.dumps(fonte['nome'], ensure_ascii=False) + ': ')
+            json.dump({'tipo': fonte.get('tipo', 'movie'), 'itens': itens}, arquivo, ensure_ascii=False)
+            yield fonte, itens
+        arquivo.write('}')
+
+
+def carregar_rankings(config, contexto):
+    """
+    Devolve os rankings coletados nesta execução ou, se a etapa 'scrape'
+    não rodou agora, os guardados pela última coleta.
+
+    Exceções:
+        FileNotFoundError: Se ainda não houve nenhuma coleta.
+    """
+    if "rankings" in contexto:
+        return contexto["rankings"]
+    caminho = config.get("rankings_coletados", "data/rankings.json")
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(
+            f'Rankings não encontrados em "{caminho}": execute antes a etapa "scrape".'
+        )
+    with open(caminho, mode='r', encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def obter_engine_banco(contexto):
+    # Engine do banco (data/imdb.db), com as tabelas criadas
+    with _trava_contexto:
+        if "engine" not in contexto:
+            from src.database import criar_engine, criar_tabelas
+
+            # Garante que a pasta 'data' exista antes de criar o banco
+            os.makedirs("data", exist_ok=True)
+
+            # Usa o caminho padrão configurado em criar_engine: sqlite:///data/imdb.db
+            contexto["engine"] = criar_engine()
+            criar_tabelas(contexto["engine"])
+        return contexto["engine"]
+
+
+def obter_dataframes(config, contexto):
+    # DataFrames de filmes e séries (lidos uma vez, pela primeira etapa que os usar)
+    with _trava_contexto:
+        if "df_movies" not in contexto:
+            from src.analysis import CacheDataFrames, carregar_dataframe_movies, carregar_dataframe_series
+
+            obter_engine_banco(contexto)
+
+            # Com o cache ativo, as tabelas só são lidas do banco quando mudaram
+            config_cache_df = config.get("cache_dataframes", {})
+            cache_df = None
+            if config_cache_df.get("ativo", True):
+                cache_df = CacheDataFrames(pasta=config_cache_df.get("pasta", "data/cache"))
+            contexto["df_movies"] = carregar_dataframe_movies(cache=cache_df) # Usa o caminho default para o banco
+            contexto["df_series"] = carregar_dataframe_series(cache=cache_df) # Usa o caminho default para o banco
+            contexto["cache_df"] = cache_df
+        return contexto["df_movies"], contexto["df_series"]
+
+
+def obter_analise_duckdb(config, contexto):
+    # Backend DuckDB da análise (criado uma vez), ou None com o backend padrão (Pandas)
+    with _trava_contexto:
+        if "analise_duckdb" not in contexto:
+            config_analise = config.get("analise", {})
+            backend = config_analise.get("backend", "pandas")
+            if backend not in ("pandas", "duckdb"):
+                raise ValueError(f'Backend de análise desconhecido: "{backend}" (use "pandas" ou "duckdb")')
+            analise = None
+            if backend == "duckdb":
+                from src.analysis_duckdb import AnaliseDuckDB
+
+                obter_engine_banco(contexto)
+                config_duckdb = config_analise.get("duckdb", {})
+                analise = AnaliseDuckDB(
+                    caminho_banco="data/imdb.db",
+                    fonte=config_duckdb.get("fonte", "sqlite"),
+                    # Fonte 'parquet': os arquivos da última exportação
+                    pasta_parquet=config_duckdb.get(
+                        "pasta_parquet", config.get("exportacao", {}).get("pasta_saida", "data")
+                    ),
+                    threads=config_duckdb.get("threads"),
+                )
+            contexto["analise_duckdb"] = analise
+        return contexto["analise_duckdb"]
+
+
+def carregar_em_streaming(config, contexto, rankings):
+    """
+    Monta o catálogo e grava no banco os rankings à medida que são
+    coletados: coleta, catálogo e gravação são geradores ligados por filas
+    de até "streaming.tamanho_fila" itens (ver src/streaming.py). Cada
+    página vira um catálogo próprio (models.gerar_catalogos), gravado em
+    lotes (database.salvar_catalogos_em_lote) enquanto as páginas
+    seguintes são baixadas e extraídas.
+
+    Parâmetros:
+        config (dict): Configuração lida de config.json.
+        contexto (dict): Dados compartilhados entre as etapas desta execução.
+        rankings (iterable): Pares (fonte, itens), como os de scraping.gerar_rankings.
+
+    Retorno:
+        tuple: (primeiros_filmes, contagem), com até 10 filmes, na ordem
+        das fontes, e a contagem da gravação (inseridos, atualizados, ignorados).
+    """
+    from src.database import salvar_catalogos_em_lote
+    from src.models import gerar_catalogos
+    from src.streaming import em_fila
+
+    tamanho_fila = config.get("streaming", {}).get("tamanho_fila", 4)
+    config_gravacao = config.get("gravacao", {})
+    primeiros_filmes = []
+
+    def tipos_e_itens(rankings):
+        # Guarda os primeiros filmes (Ex. 1 e 2) e repassa só o que o catálogo usa
+        for fonte, itens in rankings:
+            tipo = fonte.get('tipo', 'movie')
+            if tipo != 'series' and len(primeiros_filmes) < 10:
+                primeiros_filmes.extend(itens[:10 - len(primeiros_filmes)])
+            yield tipo, itens
+
+    catalogos = em_fila(gerar_catalogos(em_fila(tipos_e_itens(rankings), tamanho_fila)), tamanho_fila)
+    contagem = salvar_catalogos_em_lote(
+        catalogos,
+        obter_engine_banco(contexto),
+        tamanho_lote=config_gravacao.get("tamanho_lote", 500),
+        atualizar=config_gravacao.get("atualizar_existentes", True),
+    )
+    return primeiros_filmes, contagem
+
+
+@instrumentar('etapa_scrape')
+def etapa_scrape(config, contexto):
+    """
+    Faz o scraping dos rankings do IMDb (Exercícios 1 e 2) e guarda o
+    resultado para a etapa 'load'.
 
-    # 2. Faz o scraping da página do IMDb (Exercícios 1 e 2)
-    lista_filmes = obter_filmes_top(url, n_filmes=n_filmes)
+    Parâmetros:
+        config (dict): Configuração lida de config.json.
+        contexto (dict): Dados compartilhados entre as etapas desta execução.
+    """
+    from src.scraping import gerar_rankings, obter_rankings
+
+    fontes = obter_fontes(config)
+    caminho_rankings = config.get("rankings_coletados", "data/rankings.json")
+
+    # 2. Faz o scraping das páginas do IMDb, em paralelo (Exercícios 1 e 2)
+    # (cliente e cache são fechados mesmo que a coleta ou a gravação falhe)
+    cache_http = criar_cache_http(config)
+    try:
+        cliente_http = criar_cliente_http(config)
+        try:
+            if config.get("streaming", {}).get("ativo", False):
+                # Streaming: cada página já segue para o catálogo e o banco (Ex. 5 e 6)
+                # enquanto as próximas são baixadas; a etapa 'load' não grava de novo
+                rankings = gerar_rankings(
+                    fontes,
+                    cache=cache_http,
+                    cliente=cliente_http,
+                    max_workers=config.get("rede", {}).get("max_workers", 4),
+                )
+                lista_filmes, contagem = carregar_em_streaming(
+                    config, contexto, salvar_rankings_em_fluxo(rankings, caminho_rankings)
+                )
+                contexto["carga_streaming"] = contagem
+            else:
+                rankings = obter_rankings(
+                    fontes,
+                    cache=cache_http,
+                    cliente=cliente_http,
+                    max_workers=config.get("rede", {}).get("max_workers", 4),
+                )
+                contexto["rankings"] = rankings
+                salvar_rankings(rankings, caminho_rankings)
+
+                lista_filmes = []
+                for ranking in rankings.values():
+                    if ranking['tipo'] != 'series':
+                        lista_filmes.extend(ranking['itens'])
+        finally:
+            cliente_http.fechar()
+
+        if cache_http is not None:
+            estatisticas = cache_http.estatisticas
+            print(f'Cache HTTP - acertos: {estatisticas["acertos"]} | '
+                  f'faltas: {estatisticas["faltas"]} | '
+                  f'revalidações: {estatisticas["revalidacoes"]} | '
+                  f'bytes economizados: {estatisticas["bytes_economizados"]} | '
+                  f'bytes poupados pela compressão: {estatisticas["bytes_comprimidos"]}\n')
+    finally:
+        if cache_http is not None:
+            cache_http.fechar()
     
 
 
@@ -86,7 +417,30 @@ def main():
         ano = filme['ano_lancamento']
         nota = filme['nota']
         print(f'{i+1}) "{titulo}" ({ano}) - Nota: {nota}')
-    
+
+
+@instrumentar('etapa_load')
+def etapa_load(config, contexto):
+    """
+    Monta o catálogo (Ex. 3, 4 e 5) e grava os dados no banco (Ex. 6),
+    junto com as etapas opcionais de carga: arquivos de dados do IMDb,
+    histórico dos rankings e enriquecimento.
+
+    Parâmetros:
+        config (dict): Configuração lida de config.json.
+        contexto (dict): Dados compartilhados entre as etapas desta execução.
+    """
+    from src.models import criar_catalogo
+    from src.database import (
+        salvar_catalogo_no_banco,
+        salvar_catalogo_em_lote,
+        registrar_snapshot_ranking,
+    )
+
+    # Com o streaming, a etapa 'scrape' desta execução já gravou o catálogo
+    config_streaming = config.get("streaming", {})
+    carga_streaming = contexto.get("carga_streaming")
+
 
 
     # EXERCÍCIO 3 - Classe base TV
@@ -105,12 +459,26 @@ def main():
     # EXERCÍCIO 5 - Lista de objetos a partir do scraping
     print('\n\nEXERCÍCIO 5 - Lista de objetos a partir do scraping\n')
 
-    # 3. Cria os objetos Movie e Series e monta a lista catalog (Ex. 3, 4 e 5)
-    catalog = criar_catalogo(lista_filmes)
+    if carga_streaming is None:
+        rankings = carregar_rankings(config, contexto)
 
-    print('Todos os itens na lista catalog:')
-    for item in catalog:
-        print(item)
+        # Juntando os itens de cada tipo, na ordem das fontes
+        lista_filmes = []
+        lista_series = None
+        for ranking in rankings.values():
+            if ranking['tipo'] == 'series':
+                lista_series = (lista_series or []) + ranking['itens']
+            else:
+                lista_filmes.extend(ranking['itens'])
+
+        # 3. Cria os objetos Movie e Series e monta a lista catalog (Ex. 3, 4 e 5)
+        catalog = criar_catalogo(lista_filmes, lista_series)
+
+        print('Todos os itens na lista catalog:')
+        for item in catalog:
+            print(item)
+    else:
+        print('Catálogo montado página a página durante a coleta (streaming).')
 
 
 
@@ -118,16 +486,98 @@ def main():
     print('\n\nEXERCÍCIO 6 - Banco de dados imdb.db com SQLAlchemy')
 
     # 4. Cria o banco de dados e grava os dados (Ex. 6)
-    # Garante que a pasta 'data' exista antes de criar o banco
-    os.makedirs("data", exist_ok=True)
-
-    # Usa o caminho padrão configurado em criar_engine: sqlite:///data/imdb.db
-    engine = criar_engine()
-    criar_tabelas(engine)
-    salvar_catalogo_no_banco(catalog, engine)
+    engine = obter_engine_banco(contexto)
+    config_gravacao = config.get("gravacao", {})
+    if carga_streaming is not None:
+        # Gravado em lotes pela etapa 'scrape', à medida que as páginas chegavam
+        contagem = carga_streaming
+    elif config_gravacao.get("modo", "lote") == "lote":
+        contagem = salvar_catalogo_em_lote(
+            catalog,
+            engine,
+            tamanho_lote=config_gravacao.get("tamanho_lote", 500),
+            atualizar=config_gravacao.get("atualizar_existentes", True),
+        )
+    else:
+        # Caminho antigo: um commit por registro
+        contagem = salvar_catalogo_no_banco(catalog, engine)
 
     print('\nBanco data/imdb.db criado com sucesso!')
-    print('Registros inseridos nas tabelas com sucesso!')
+    print(f'Registros inseridos: {contagem["inseridos"]} | '
+          f'atualizados: {contagem["atualizados"]} | '
+          f'ignorados: {contagem["ignorados"]}')
+
+    # Catálogo completo a partir dos arquivos TSV do IMDb (opcional)
+    config_datasets = config.get("datasets", {})
+    if config_datasets.get("ativo", False):
+        from src.ingestion import ingerir_datasets
+
+        contagem = ingerir_datasets(
+            engine,
+            config_datasets.get("basics", "data/datasets/title.basics.tsv.gz"),
+            config_datasets.get("ratings", "data/datasets/title.ratings.tsv.gz"),
+            tamanho_lote=config_datasets.get("tamanho_lote", 5000),
+            atualizar=config_gravacao.get("atualizar_existentes", True),
+            min_votos=config_datasets.get("min_votos"),
+            # Com o streaming, o próximo bloco dos arquivos é lido enquanto o anterior é gravado
+            tamanho_fila=config_streaming.get("tamanho_fila", 4) if config_streaming.get("ativo", False) else 0,
+        )
+        pico = contagem["pico_rss_mb"]
+        print(f'Datasets IMDb - filmes: {contagem["filmes"]} | séries: {contagem["series"]} | '
+              f'inseridos: {contagem["inseridos"]} | atualizados: {contagem["atualizados"]} | '
+              f'ignorados: {contagem["ignorados"]}')
+        print(f'Datasets IMDb - {contagem["segundos"]:.1f} s | '
+              f'{contagem["linhas_por_segundo"]:.0f} títulos/s | '
+              f'pico de memória: {f"{pico:.0f} MB" if pico is not None else "n/d"}')
+
+    # Histórico dos rankings: grava apenas as posições/notas que mudaram
+    if config.get("historico", {}).get("ativo", True):
+        for nome, ranking in carregar_rankings(config, contexto).items():
+            snapshot = registrar_snapshot_ranking(ranking['itens'], engine, nome)
+            if snapshot['ignorada']:
+                print(f'Histórico "{nome}" - ranking inalterado desde a última execução')
+            else:
+                print(f'Histórico "{nome}" - execução {snapshot["run_id"]} | '
+                      f'linhas alteradas: {snapshot["alterados"]}')
+
+    # Enriquecimento opcional com as páginas de detalhe (gêneros, duração, diretores, temporadas)
+    config_enriquecimento = config.get("enriquecimento", {})
+    if config_enriquecimento.get("ativo", False):
+        from src.enrichment import enriquecer_titulos
+
+        # Cliente e cache são fechados mesmo que o enriquecimento falhe
+        cache_http = criar_cache_http(config)
+        try:
+            cliente_detalhes = criar_cliente_http(config, secao="enriquecimento")
+            try:
+                contagem = enriquecer_titulos(
+                    engine,
+                    cliente=cliente_detalhes,
+                    cache=cache_http,
+                    max_workers=config_enriquecimento.get("max_workers", 8),
+                    idade_max_dias=config_enriquecimento.get("idade_max_dias", 30),
+                )
+            finally:
+                cliente_detalhes.fechar()
+        finally:
+            if cache_http is not None:
+                cache_http.fechar()
+        print(f'Enriquecimento - pendentes: {contagem["pendentes"]} | '
+              f'enriquecidos: {contagem["enriquecidos"]} | '
+              f'falhas: {contagem["falhas"]}')
+
+
+@instrumentar('etapa_analyze')
+def etapa_analyze(config, contexto):
+    """
+    Lê os dados do banco com Pandas (Ex. 7) e consulta os filmes com
+    melhor avaliação (Ex. 8).
+
+    Parâmetros:
+        config (dict): Configuração lida de config.json.
+        contexto (dict): Dados compartilhados entre as etapas desta execução.
+    """
+    from src.analysis import consultar_movies, melhores_movies_em_blocos
 
 
 
@@ -135,8 +585,13 @@ def main():
     print('\n\nEXERCÍCIO 7 - Lendo os dados do banco com Pandas\n')
 
     # 5. Lê os dados do banco com Pandas (Ex. 7)
-    df_movies = carregar_dataframe_movies() # Usa o caminho default para o banco
-    df_series = carregar_dataframe_series() # Usa o caminho default para o banco
+    df_movies, df_series = obter_dataframes(config, contexto)
+
+    cache_df = contexto["cache_df"]
+    if cache_df is not None:
+        for tabela, carga in cache_df.cargas.items():
+            print(f'Carga de "{tabela}" - origem: {carga["origem"]} | '
+                  f'tempo: {carga["segundos"] * 1000:.1f} ms')
 
     # Exibindo as 5 primeiras linhas do DataFrame com filmes
     print('\n5 primeiras linhas do DataFrame com filmes:')
@@ -153,34 +608,119 @@ def main():
 
     # 6. Filtra, ordena e exporta filmes/séries (Ex. 8)
 
-    # Filtrando filmes com nota maior que 9.0
-    df_melhores_filmes = df_movies[df_movies['rating'] > 9.0]
-
-    # Ordenando filmes filtrados pela nota (do maior para o menor)
-    df_melhores_filmes_sorted = df_melhores_filmes.sort_values(
-        by=['rating'], ascending=False
-    )
+    # Filtrando filmes com nota maior que 9.0 e ordenando pela nota (do maior
+    # para o menor), com filtro, ordenação e limite executados no banco
+    # (ou no DuckDB, com o backend "duckdb")
+    analise = obter_analise_duckdb(config, contexto)
+    config_analise = config.get("analise", {})
+    if analise is None and config_analise.get("em_blocos", False):
+        # Catálogos grandes: lê 'movies' do banco em blocos, guardando só os 5 melhores
+        df_melhores_filmes_sorted = melhores_movies_em_blocos(
+            n=5,
+            nota_min=9.0,
+            nota_min_inclusiva=False,
+            tamanho_bloco=config_analise.get("tamanho_bloco", 100_000),
+        )
+    else:
+        df_melhores_filmes_sorted = (analise.consultar_movies if analise is not None else consultar_movies)(
+            nota_min=9.0,
+            nota_min_inclusiva=False,
+            ordenar_por=['-rating', 'id'],
+            limite=5,
+        )
 
     # Exibindo os 5 filmes com melhor avaliação após o filtro
     print('5 filmes com melhor avaliação:')
-    print(df_melhores_filmes_sorted.head(5))
+    print(df_melhores_filmes_sorted)
 
-    # Exportando CSV e JSON (com mensagens e tratamento de erro) para a pasta data/
-    exportar_csv_json(df_movies, df_series, pasta_saida="data")
 
+@instrumentar('etapa_export')
+def etapa_export(config, contexto):
+    """
+    Exporta filmes e séries nos formatos do config (Ex. 8) e, se ativa,
+    faz a exportação incremental.
 
+    Parâmetros:
+        config (dict): Configuração lida de config.json.
+        contexto (dict): Dados compartilhados entre as etapas desta execução.
+    """
+    from src.analysis import exportar_dados
+
+    df_movies, df_series = obter_dataframes(config, contexto)
+
+    # Exportando nos formatos do config (com tamanho, tempo e tratamento de erro) para a pasta data/
+    config_exportacao = config.get("exportacao", {})
+    exportar_dados(
+        df_movies,
+        df_series,
+        pasta_saida=config_exportacao.get("pasta_saida", "data"),
+        formatos=config_exportacao.get("formatos", ["csv", "json"]),
+        compressao_parquet=config_exportacao.get("compressao_parquet", "snappy"),
+        max_workers=config_exportacao.get("max_workers", 4),
+    )
+
+    # Exportação incremental: acrescenta apenas as linhas novas ou alteradas
+    config_incremental = config_exportacao.get("incremental", {})
+    if config_incremental.get("ativo", False):
+        from src.exporting import exportar_incremental
+
+        for resultado in exportar_incremental(
+            obter_engine_banco(contexto),
+            pasta_saida=config_incremental.get("pasta_saida", "data/incremental"),
+            formato=config_incremental.get("formato", "jsonl"),
+            compactar_apos_segmentos=config_incremental.get("compactar_apos_segmentos", 50),
+        ):
+            if resultado['tipo'] is None:
+                print(f'Exportação incremental "{resultado["tabela"]}" - sem mudanças')
+            else:
+                print(f'Exportação incremental "{resultado["tabela"]}" ({resultado["tipo"]}) - '
+                      f'{resultado["linhas"]} linhas, {resultado["bytes"]} bytes em '
+                      f'"{resultado["arquivo"]}" ({resultado["segundos"]:.3f} s)')
+
+
+@instrumentar('etapa_report')
+def etapa_report(config, contexto):
+    """
+    Classifica as notas (Ex. 9) e gera o resumo de filmes por categoria
+    e ano (Ex. 10).
+
+    Parâmetros:
+        config (dict): Configuração lida de config.json.
+        contexto (dict): Dados compartilhados entre as etapas desta execução.
+    """
+    from src.analysis import (
+        adicionar_categoria,
+        resumo_categoria_ano,
+        resumo_categoria_ano_em_blocos,
+        resumo_categoria_ano_materializado,
+        FAIXAS_CATEGORIA_PADRAO,
+    )
+
+    analise = obter_analise_duckdb(config, contexto)
 
     # EXERCÍCIO 9 - Classificação textual das notas (no DataFrame)
     print('\n\nEXERCÍCIO 9 - Classificação textual das notas (no DataFrame)\n')
 
     # 7. Cria a coluna de categoria textual das notas (Ex. 9).
-
-    # Criando a coluna 'categoria' que recebe a categoria textual correspondente ao 'rating'
-    df_movies = adicionar_categoria(df_movies)
+    if analise is not None:
+        # Backend DuckDB: a classificação roda no DuckDB, sem carregar a tabela no Pandas
+        df_primeiros = analise.consultar_movies(
+            colunas=['title', 'rating'],
+            ordenar_por=['id'],
+            limite=10,
+            faixas_categoria=config.get("categorias") or FAIXAS_CATEGORIA_PADRAO,
+        )
+    else:
+        df_movies, _ = obter_dataframes(config, contexto)
+
+        # Criando a coluna 'categoria' que recebe a categoria textual correspondente ao 'rating'
+        # (em uma cópia rasa: a etapa 'export' pode estar lendo o mesmo DataFrame)
+        df_movies = adicionar_categoria(df_movies.copy(deep=False), faixas=config.get("categorias"))
+        df_primeiros = df_movies[['title', 'rating', 'categoria']].head(10)
 
     # Exibindo os 10 primeiros filmes com title, rating e categoria
     print('10 primeiros filmes:')
-    print(df_movies[['title', 'rating', 'categoria']].head(10))
+    print(df_primeiros)
 
 
 
@@ -188,12 +728,243 @@ def main():
     print('\n\nEXERCÍCIO 10 - Resumo de filmes por categoria\n')
 
     #  8. Gera o resumo de filmes por categoria e ano (Ex. 10).
-    resumo = resumo_categoria_ano(df_movies)
+    config_analise = config.get("analise", {})
+    if analise is not None:
+        # Classificação e contagens por (categoria, ano) no DuckDB
+        resumo = analise.resumo_categoria_ano(faixas=config.get("categorias"))
+    elif config_analise.get("materializado", True):
+        # Contagens por ano e nota mantidas pelo banco (tabela 'movies_resumo')
+        resumo = resumo_categoria_ano_materializado(faixas=config.get("categorias"))
+    elif config_analise.get("em_blocos", False):
+        # Catálogos grandes: lê 'movies' do banco em blocos, com memória limitada
+        resumo = resumo_categoria_ano_em_blocos(
+            faixas=config.get("categorias"),
+            tamanho_bloco=config_analise.get("tamanho_bloco", 100_000),
+        )
+    else:
+        resumo = resumo_categoria_ano(df_movies)
     
     print('Resumo de quantidade de filmes por categoria e ano de lançamento:')
     print(resumo)
 
 
+def saidas_scrape(config, contexto):
+    # Artefato da coleta: o arquivo com os rankings
+    return {"rankings": hash_arquivo(config.get("rankings_coletados", "data/rankings.json"))}
+
+
+def entradas_load(config):
+    # Arquivos de dados do IMDb lidos pela carga (tamanho e data, sem ler o conteúdo)
+    config_datasets = config.get("datasets", {})
+    if not config_datasets.get("ativo", False):
+        return {}
+    entradas = {}
+    for chave, padrao in (("basics", "data/datasets/title.basics.tsv.gz"),
+                          ("ratings", "data/datasets/title.ratings.tsv.gz")):
+        caminho = config_datasets.get(chave, padrao)
+        if os.path.exists(caminho):
+            estado = os.stat(caminho)
+            entradas[caminho] = [estado.st_size, estado.st_mtime_ns]
+        else:
+            entradas[caminho] = None
+    return entradas
+
+
+def saidas_banco(config, contexto):
+    # Artefato da carga: o estado das tabelas 'movies' e 'series' do banco
+    from src.database import assinatura_tabela, MovieDB, SeriesDB
+
+    with obter_engine_banco(contexto).connect() as conexao:
+        return {
+            "movies": assinatura_tabela(conexao, MovieDB.__table__),
+            "series": assinatura_tabela(conexao, SeriesDB.__table__),
+        }
+
+
+def saidas_export(config, contexto):
+    # Artefatos da exportação: hash de cada arquivo gerado
+    config_exportacao = config.get("exportacao", {})
+    pasta_saida = config_exportacao.get("pasta_saida", "data")
+    saidas = {}
+    for nome in ("movies", "series"):
+        for formato in config_exportacao.get("formatos", ["csv", "json"]):
+            # A extensão de cada formato é o próprio nome (ver FORMATOS_EXPORTACAO)
+            caminho = os.path.join(pasta_saida, f"{nome}.{formato}")
+            saidas[caminho] = hash_arquivo(caminho)
+    config_incremental = config_exportacao.get("incremental", {})
+    if config_incremental.get("ativo", False):
+        caminho = os.path.join(config_incremental.get("pasta_saida", "data/incremental"), "manifest.json")
+        saidas[caminho] = hash_arquivo(caminho)
+    return saidas
+
+
+# Etapas do pipeline, em ordem topológica. 'analyze', 'export' e 'report'
+# só dependem do banco e, por isso, rodam ao mesmo tempo.
+PIPELINE = [
+    Etapa(
+        'scrape', etapa_scrape,
+        # Com o streaming, a coleta também monta o catálogo e grava no banco
+        modulos=('main.py', 'scraping.py', 'fetching.py', 'http_cache.py', 'models.py', 'database.py',
+                 'streaming.py'),
+        secoes=('fontes', 'rede', 'cache_http', 'streaming', 'gravacao'),
+        saidas=saidas_scrape,
+        externa=True,  # as páginas do IMDb mudam sem aviso (o cache HTTP cuida disso)
+    ),
+    Etapa(
+        'load', etapa_load,
+        depende_de=('scrape',),
+        modulos=('main.py', 'models.py', 'database.py', 'ingestion.py', 'enrichment.py', 'streaming.py'),
+        secoes=('gravacao', 'datasets', 'historico', 'enriquecimento', 'streaming'),
+        entradas=entradas_load,
+        saidas=saidas_banco,
+        # O enriquecimento visita as páginas de detalhe: com ele, a carga roda sempre
+        externa=lambda config: config.get("enriquecimento", {}).get("ativo", False),
+    ),
+    Etapa(
+        'analyze', etapa_analyze,
+        depende_de=('load',),
+        modulos=('main.py', 'analysis.py', 'analysis_duckdb.py', 'database.py'),
+        secoes=('analise',),
+    ),
+    Etapa(
+        'export', etapa_export,
+        depende_de=('load',),
+        modulos=('main.py', 'analysis.py', 'exporting.py', 'database.py'),
+        secoes=('exportacao',),
+        saidas=saidas_export,
+    ),
+    Etapa(
+        'report', etapa_report,
+        depende_de=('load',),
+        modulos=('main.py', 'analysis.py', 'analysis_duckdb.py'),
+        secoes=('categorias', 'analise'),
+    ),
+]
+
+
+def criar_parser():
+    """
+    Monta o parser da linha de comando, com um subcomando por etapa.
+
+    Retorno:
+        argparse.ArgumentParser: Parser pronto para uso.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m src.main',
+        description='Scraping, banco de dados e análise do IMDb Top 250. '
+                    'Sem subcomando, executa todas as etapas, em ordem.',
+    )
+    parser.add_argument('--config', default='config.json',
+                        help='arquivo de configuração (padrão: config.json)')
+    parser.add_argument('--force', action='store_true',
+                        help='executa as etapas mesmo sem mudanças desde a última execução')
+    parser.add_argument('--from', dest='a_partir_de', choices=ETAPAS, metavar='ETAPA',
+                        help='executa a partir de ETAPA (inclusive), refazendo-a e as '
+                             'etapas que dependem dela; as anteriores não rodam')
+    parser.add_argument('--profile', action='store_true',
+                        help='grava as estatísticas do cProfile da execução (ver metricas.perfil '
+                             'no config) e exibe as funções mais demoradas')
+    subcomandos = parser.add_subparsers(dest='etapa', metavar='{' + ','.join(ETAPAS) + '}')
+    subcomandos.add_parser('scrape', help='coleta os rankings do IMDb (Ex. 1 e 2)')
+    subcomandos.add_parser('load', help='monta o catálogo e grava no banco (Ex. 3 a 6)')
+    subcomandos.add_parser('analyze', help='lê o banco com Pandas e consulta os melhores filmes (Ex. 7 e 8)')
+    subcomandos.add_parser('export', help='exporta filmes e séries para arquivos (Ex. 8)')
+    subcomandos.add_parser('report', help='classifica as notas e gera o resumo (Ex. 9 e 10)')
+    return parser
+
+
+def main(argv = None):
+    """
+    Executa o fluxo do trabalho, inteiro ou apenas uma etapa:
+
+        scrape:  faz o scraping da página do IMDb (Exercícios 1 e 2).
+        load:    cria os objetos Movie e Series e monta a lista catalog
+                 (Ex. 3, 4 e 5), cria o banco de dados e grava os dados (Ex. 6).
+        analyze: lê os dados do banco com Pandas (Ex. 7) e filtra e
+                 ordena os filmes (Ex. 8).
+        export:  exporta filmes/séries (Ex. 8).
+        report:  cria a coluna de categoria textual das notas (Ex. 9) e
+                 gera o resumo de filmes por categoria e ano (Ex. 10).
+
+    Sem subcomando (python -m src.main), todas as etapas rodam, como um
+    pipeline (ver PIPELINE e src/pipeline.py): etapas cujas entradas, código
+    e configuração não mudaram desde a última execução são puladas (a saída
+    delas é exibida de novo), e 'analyze', 'export' e 'report' rodam ao
+    mesmo tempo. '--force' refaz todas as etapas e '--from ETAPA' refaz a
+    partir de ETAPA. Ao longo da execução, imprime no terminal saídas que
+    respondem diretamente ao enunciado de cada exercício.
+
+    Ao final, grava as métricas de tempo, memória e E/S das etapas (ver
+    src/metrics.py) e, com '--profile', as estatísticas do cProfile.
+
+    Parâmetros:
+        argv (list[str], opcional): Argumentos da linha de comando.
+            Padrão: sys.argv[1:].
+    """
+    parser = criar_parser()
+    argumentos = parser.parse_args(argv)
+    if argumentos.etapa is not None and argumentos.a_partir_de is not None:
+        parser.error('--from não pode ser usado junto com um subcomando')
+
+    # 1. Lê o arquivo de configuração (config.json)
+    config = carregar_config(argumentos.config)
+    config_pipeline = config.get("pipeline", {})
+
+    if argumentos.etapa is not None:
+        etapas = [argumentos.etapa]
+    elif argumentos.a_partir_de is not None:
+        etapas = etapas_a_partir_de(PIPELINE, argumentos.a_partir_de)
+    else:
+        etapas = list(ETAPAS)
+    forcar = etapas if argumentos.force or argumentos.a_partir_de else ()
+
+    config_metricas = config.get("metricas", {})
+    if config_metricas.get("tracemalloc", False):
+        # Pico de memória alocada por etapa (deixa a execução mais lenta)
+        tracemalloc.start()
+
+    # Com '--profile', as etapas rodam uma de cada vez: cada uma tem o seu
+    # cProfile, e perfis ativos ao mesmo tempo em threads diferentes não
+    # são aceitos em todas as versões do Python
+    perfis = [] if argumentos.profile else None
+    resultados = executar_pipeline(
+        PIPELINE,
+        config,
+        contexto={},
+        selecionadas=etapas,
+        forcar=forcar,
+        caminho_manifesto=config_pipeline.get("manifesto", "data/pipeline.json"),
+        max_workers=1 if argumentos.profile else config_pipeline.get("max_workers", 3),
+        perfis=perfis,
+    )
+
+    print('\nPipeline - ' + ' | '.join(
+        f'{nome}: {resultado["situacao"]} ({resultado["segundos"]:.2f} s)'
+        for nome, resultado in resultados.items()
+    ))
+
+    if config_metricas.get("ativo", True):
+        caminho_metricas = config_metricas.get("arquivo", "data/metrics.json")
+        caminho_prometheus = config_metricas.get("prometheus")
+        gravar_metricas(caminho_metricas, caminho_prometheus)
+        print(f'Métricas gravadas em "{caminho_metricas}"'
+              + (f' e "{caminho_prometheus}"' if caminho_prometheus else ''))
+
+    if perfis:
+        caminho_perfil = config_metricas.get("perfil", "data/profile.pstats")
+        estatisticas = pstats.Stats(*perfis)
+        os.makedirs(os.path.dirname(caminho_perfil) or ".", exist_ok=True)
+        estatisticas.dump_stats(caminho_perfil)
+        print(f'Perfil (cProfile) gravado em "{caminho_perfil}" - 15 funções com maior tempo acumulado:')
+        estatisticas.sort_stats('cumulative').print_stats(15)
+    for nome, resultado in resultados.items():
+        erro = resultado["erro"]
+        if isinstance(erro, FileNotFoundError):
+            # Ex.: 'load' sem uma coleta anterior (etapa 'scrape')
+            parser.exit(1, f'Erro na etapa "{nome}": {erro}\n')
+        if erro is not None:
+            raise erro
+
+
 if __name__ == "__main__":
     main()
-
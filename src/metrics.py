@@ -0,0 +1,273 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from .arquivos import escrever_atomico
+
+# resource só existe em sistemas Unix: sem ele, o pico de memória não é informado
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Contadores somados em cada medição (ver registrar)
+CONTADORES = ('bytes_lidos', 'bytes_escritos', 'linhas')
+
+# Métricas do formato Prometheus: nome -> (campo da medição, tipo, descrição)
+METRICAS_PROMETHEUS = {
+    'imdb_etapa_chamadas_total': ('chamadas', 'counter', 'Chamadas da etapa.'),
+    'imdb_etapa_segundos_total': ('segundos', 'counter', 'Tempo de parede gasto na etapa, em segundos.'),
+    'imdb_etapa_cpu_segundos_total': ('cpu_segundos', 'counter',
+                                      'Tempo de CPU da etapa (incluindo as threads dos pools), em segundos.'),
+    'imdb_etapa_bytes_lidos_total': ('bytes_lidos', 'counter', 'Bytes baixados da rede pela etapa.'),
+    'imdb_etapa_bytes_escritos_total': ('bytes_escritos', 'counter', 'Bytes gravados em arquivos pela etapa.'),
+    'imdb_etapa_linhas_total': ('linhas', 'counter', 'Linhas (títulos) processadas pela etapa.'),
+    'imdb_etapa_pico_rss_mb': ('pico_rss_mb', 'gauge',
+                               'Pico de memória residente do processo ao fim da etapa, em MB.'),
+    'imdb_etapa_pico_tracemalloc_mb': ('pico_tracemalloc_mb', 'gauge',
+                                       'Pico de memória alocada durante a etapa (tracemalloc), em MB.'),
+}
+
+
+def pico_memoria_mb():
+    # Pico de memória residente (RSS) do processo, em MB (None fora do Unix)
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Metricas:
+    """
+    Registro das medições de tempo, memória e E/S de cada etapa.
+
+    Cada medição (ver medir) soma, por nome: chamadas, tempo de parede,
+    tempo de CPU, bytes lidos da rede, bytes escritos e linhas
+    processadas, e guarda os picos de memória. Os contadores de E/S e de
+    linhas são informados de dentro das funções com registrar, e valem
+    para todas as medições abertas no contexto atual (uma medição dentro
+    de outra conta para as duas).
+
+    As medições abertas ficam em uma ContextVar: tarefas enviadas a um
+    pool de threads com em_contexto (ex.: os downloads do scraping) veem
+    as medições de quem as enviou, de modo que os contadores e o tempo de
+    CPU dessas threads também contam para a etapa.
+
+    O pico de memória RSS é o do processo (nunca diminui). O pico do
+    tracemalloc só é medido com o tracemalloc ativo (tracemalloc.start());
+    como o tracemalloc é do processo inteiro, medições em threads
+    simultâneas incluem as alocações umas das outras.
+
+    Atributos:
+        medicoes (dict): Nome -> totais da medição.
+        inicio (float): Momento da criação do registro (time.time()).
+    """
+    def __init__(self):
+        self.medicoes = {}
+        self.inicio = time.time()
+        self._trava = threading.Lock()
+        # Medições abertas no contexto atual, da mais externa à mais interna
+        self._pilha = contextvars.ContextVar(f'metricas_{id(self)}', default=())
+        self._abertas = []  # medições em andamento (todas as threads)
+
+    def _acumular_pico_tracemalloc(self):
+        # Guarda o pico atual nas medições abertas antes de zerá-lo
+        pico = tracemalloc.get_traced_memory()[1]
+        for aberta in self._abertas:
+            aberta['pico_tracemalloc'] = max(aberta['pico_tracemalloc'], pico)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def medir(self, nome):
+        """
+        Mede o bloco 'with' com o nome informado.
+
+        Parâmetros:
+            nome (str): Nome da medição (ex.: 'obter_filmes_top').
+        """
+        medicao = {'pico_tracemalloc': 0, 'cpu_outras_threads': 0.0,
+                   **{contador: 0 for contador in CONTADORES}}
+        with self._trava:
+            if tracemalloc.is_tracing():
+                self._acumular_pico_tracemalloc()
+            self._abertas.append(medicao)
+        pilha = self._pilha.get()
+        self._pilha.set(pilha + (medicao,))
+        inicio, inicio_cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield medicao
+        finally:
+            segundos = time.perf_counter() - inicio
+            cpu_segundos = time.thread_time() - inicio_cpu
+            self._pilha.set(pilha)
+            with self._trava:
+                if tracemalloc.is_tracing():
+                    self._acumular_pico_tracemalloc()
+                self._abertas = [aberta for aberta in self._abertas if aberta is not medicao]
+
+                total = self.medicoes.setdefault(nome, {
+                    'chamadas': 0, 'segundos': 0.0, 'cpu_segundos': 0.0,
+                    **{contador: 0 for contador in CONTADORES},
+                    'pico_rss_mb': None, 'pico_tracemalloc_mb': None,
+                })
+                total['chamadas'] += 1
+                total['segundos'] += segundos
+                total['cpu_segundos'] += cpu_segundos + medicao['cpu_outras_threads']
+                for contador in CONTADORES:
+                    total[contador] += medicao[contador]
+                total['pico_rss_mb'] = pico_memoria_mb()
+                if tracemalloc.is_tracing():
+                    total['pico_tracemalloc_mb'] = max(total['pico_tracemalloc_mb'] or 0,
+                                                       medicao['pico_tracemalloc'] / 1024 / 1024)
+
+    def registrar(self, **contadores):
+        """
+        Soma contadores (bytes_lidos, bytes_escritos, linhas) às medições
+        abertas no contexto atual. Fora de uma medição, não faz nada.
+        """
+        pilha = self._pilha.get()
+        if not pilha:
+            return
+        # Threads de um pool podem somar à mesma medição ao mesmo tempo
+        with self._trava:
+            for medicao in pilha:
+                for contador, valor in contadores.items():
+                    medicao[contador] += valor
+
+    def em_contexto(self, funcao):
+        """
+        Prepara 'funcao' para rodar em outra thread (ex.: executor.submit)
+        com as medições abertas na thread atual: o que ela registrar e o
+        tempo de CPU da thread que a executar contam para essas medições.
+
+        Deve ser chamada uma vez por tarefa, na thread que a envia.
+
+        Parâmetros:
+            funcao (callable): Função executada na outra thread.
+
+        Retorno:
+            callable: Função com os mesmos parâmetros e retorno.
+        """
+        contexto = contextvars.copy_context()
+        pilha = contexto.get(self._pilha)
+
+        def executar(*args, **kwargs):
+            inicio_cpu = time.thread_time()
+            try:
+                return contexto.run(funcao, *args, **kwargs)
+            finally:
+                if pilha:
+                    cpu_segundos = time.thread_time() - inicio_cpu
+                    with self._trava:
+                        for medicao in pilha:
+                            medicao['cpu_outras_threads'] += cpu_segundos
+        return executar
+
+    def para_dict(self):
+        """
+        Devolve as medições em um dicionário pronto para JSON.
+
+        Retorno:
+            dict: {'inicio', 'segundos', 'pico_rss_mb', 'medicoes'}.
+        """
+        with self._trava:
+            medicoes = {nome: dict(total) for nome, total in self.medicoes.items()}
+        return {
+            'inicio': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.inicio)),
+            'segundos': time.time() - self.inicio,
+            'pico_rss_mb': pico_memoria_mb(),
+            'medicoes': medicoes,
+        }
+
+    def para_prometheus(self):
+        """
+        Formata as medições no formato de texto do Prometheus (por exemplo,
+        para o 'textfile collector' do node_exporter).
+
+        Retorno:
+            str: Uma série por métrica e etapa, com o rótulo 'etapa'.
+        """
+        medicoes = self.para_dict()['medicoes']
+        linhas = []
+        for metrica, (campo, tipo, descricao) in METRICAS_PROMETHEUS.items():
+            linhas.append(f'# HELP {metrica} {descricao}')
+            linhas.append(f'# TYPE {metrica} {tipo}')
+            for nome, total in medicoes.items():
+                if total[campo] is not None:
+                    linhas.append(f'{metrica}{{etapa="{nome}"}} {total[campo]}')
+        return '\n'.join(linhas) + '\n'
+
+
+# Registro do processo, usado por instrumentar e registrar
+REGISTRO = Metricas()
+
+
+def medir(nome):
+    # Mede um bloco 'with' no registro do processo (ver Metricas.medir)
+    return REGISTRO.medir(nome)
+
+
+def registrar(**contadores):
+    # Soma contadores às medições abertas no contexto atual (ver Metricas.registrar)
+    REGISTRO.registrar(**contadores)
+
+
+def em_contexto(funcao):
+    # Leva as medições abertas para uma tarefa de outra thread (ver Metricas.em_contexto)
+    return REGISTRO.em_contexto(funcao)
+
+
+def instrumentar(nome, contar = None):
+    """
+    Decorador que mede cada chamada da função no registro do processo.
+
+    Parâmetros:
+        nome (str): Nome da medição.
+        contar (callable, opcional): contar(resultado) -> dict com contadores
+            (ver Metricas.registrar) tirados do valor devolvido pela função.
+
+    Retorno:
+        callable: Decorador.
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            with medir(nome):
+                resultado = funcao(*args, **kwargs)
+                if contar is not None:
+                    registrar(**contar(resultado))
+                return resultado
+        return medida
+    return decorador
+
+
+def gravar_metricas(caminho_json, caminho_prometheus = None, metricas = None):
+    """
+    Grava as medições em JSON e, opcionalmente, no formato do Prometheus.
+    Cada arquivo é escrito de forma atômica (ver arquivos.escrever_atomico),
+    de modo que quem lê (ex.: o node_exporter) nunca encontra um arquivo
+    pela metade.
+
+    Parâmetros:
+        caminho_json (str): Caminho do arquivo JSON.
+        caminho_prometheus (str, opcional): Caminho do arquivo .prom.
+        metricas (Metricas, opcional): Registro gravado. Padrão: REGISTRO.
+    """
+    metricas = metricas or REGISTRO
+    arquivos = [(caminho_json, json.dumps(metricas.para_dict(), ensure_ascii=False, indent=2))]
+    if caminho_prometheus:
+        arquivos.append((caminho_prometheus, metricas.para_prometheus()))
+
+    for caminho, conteudo in arquivos:
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+
+        def escrever(temporario):
+            with open(temporario, mode='w', encoding='utf-8') as arquivo:
+                arquivo.write(conteudo)
+
+        escrever_atomico(caminho, escrever)
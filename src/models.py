@@ -1,14 +1,31 @@
+import sys
+from array import array
+
+from .metrics import instrumentar
+
+
+# Valor guardado nas colunas inteiras do Catalog quando o dado não existe
+AUSENTE = -1
+
+
 class TV:
     """
     Classe base para representar qualquer mídia de TV/cinema.
 
+    Usa __slots__ (sem __dict__ por objeto), o que deixa cada instância
+    mais leve.
+
     Atributos:
         title (str): Título da obra.
         year (int): Ano de lançamento.
+        imdb_id (str): Identificador do título no IMDb (opcional).
     """
-    def __init__(self, title, year):
+    __slots__ = ('title', 'year', 'imdb_id')
+
+    def __init__(self, title, year, imdb_id = None):
         self.title = title
         self.year = year
+        self.imdb_id = imdb_id
 
     def __str__(self):
         return f'"{self.title}" ({self.year})'
@@ -22,10 +39,13 @@ class Movie(TV):
         title (str): Título do filme.
         year (int): Ano de lançamento.
         rating (float): Nota do filme no IMDb.
+        imdb_id (str): Identificador do filme no IMDb (opcional).
     """
-    def __init__(self, title, year, rating):
-        # Herdando os atributos title e year da classe pai 'TV'
-        super().__init__(title, year)
+    __slots__ = ('rating',)
+
+    def __init__(self, title, year, rating, imdb_id = None):
+        # Herdando os atributos title, year e imdb_id da classe pai 'TV'
+        super().__init__(title, year, imdb_id)
         # Adicionando o atributo rating
         self.rating = rating
 
@@ -43,10 +63,13 @@ class Series(TV):
         year (int): Ano de lançamento.
         seasons (int): Quantidade de temporadas.
         episodes (int): Quantidade total de episódios.
+        imdb_id (str): Identificador da série no IMDb (opcional).
     """
-    def __init__(self, title, year, seasons, episodes):
-        # Herdando os atributos title e year da classe pai 'TV'
-        super().__init__(title, year)
+    __slots__ = ('seasons', 'episodes')
+
+    def __init__(self, title, year, seasons, episodes, imdb_id = None):
+        # Herdando os atributos title, year e imdb_id da classe pai 'TV'
+        super().__init__(title, year, imdb_id)
         # Adicionando os atributos seasons e episodes
         self.seasons = seasons
         self.episodes = episodes
@@ -56,37 +79,218 @@ class Series(TV):
         return f'"{self.title}" ({self.year}) - Temporadas: {self.seasons}, Episódios: {self.episodes}'
 
 
-def criar_catalogo(lista_filmes_scraping):
+def _inteiro_ou_ausente(valor):
+    # Converte None no marcador AUSENTE das colunas inteiras
+    return AUSENTE if valor is None else valor
+
+
+def _inteiro_ou_none(valor):
+    # Converte o marcador AUSENTE de volta em None
+    return None if valor == AUSENTE else valor
+
+
+class Catalog:
+    """
+    Catálogo de filmes e séries guardado em colunas, em vez de uma lista
+    com um objeto por título.
+
+    Cada tipo tem colunas paralelas:
+        - títulos e identificadores do IMDb em listas (títulos "internados"
+          com sys.intern, de modo que títulos repetidos dividem a mesma string);
+        - ano, temporadas e episódios em array('h'/'i') de inteiros
+          (AUSENTE = -1 quando o dado não existe);
+        - nota em array('d'), com NaN quando não existe.
+
+    Ao percorrer o catálogo (for item in catalog), são gerados objetos
+    Movie e Series leves (com __slots__) na hora, primeiro os filmes e
+    depois as séries, de modo que print(item) continua funcionando.
+    As colunas podem ser entregues diretamente à gravação em lote no
+    banco (colunas_movies/colunas_series) e ao Pandas (para_dataframe).
+    """
+    def __init__(self):
+        self.movies_title = []
+        self.movies_year = array('h')
+        self.movies_rating = array('d')
+        self.movies_imdb_id = []
+
+        self.series_title = []
+        self.series_year = array('h')
+        self.series_seasons = array('i')
+        self.series_episodes = array('i')
+        self.series_imdb_id = []
+
+    def adicionar_movie(self, title, year, rating, imdb_id = None):
+        """
+        Acrescenta um filme às colunas do catálogo.
+
+        Parâmetros:
+            title (str): Título do filme.
+            year (int ou None): Ano de lançamento.
+            rating (float ou None): Nota do filme no IMDb.
+            imdb_id (str, opcional): Identificador do filme no IMDb.
+        """
+        self.movies_title.append(sys.intern(title))
+        self.movies_year.append(_inteiro_ou_ausente(year))
+        self.movies_rating.append(float('nan') if rating is None else rating)
+        self.movies_imdb_id.append(imdb_id)
+
+    def adicionar_series(self, title, year, seasons, episodes, imdb_id = None):
+        """
+        Acrescenta uma série às colunas do catálogo.
+
+        Parâmetros:
+            title (str): Título da série.
+            year (int ou None): Ano de lançamento.
+            seasons (int ou None): Quantidade de temporadas.
+            episodes (int ou None): Quantidade total de episódios.
+            imdb_id (str, opcional): Identificador da série no IMDb.
+        """
+        self.series_title.append(sys.intern(title))
+        self.series_year.append(_inteiro_ou_ausente(year))
+        self.series_seasons.append(_inteiro_ou_ausente(seasons))
+        self.series_episodes.append(_inteiro_ou_ausente(episodes))
+        self.series_imdb_id.append(imdb_id)
+
+    def append(self, item):
+        """
+        Acrescenta um objeto Movie ou Series (compatível com a lista antiga).
+
+        Parâmetros:
+            item (Movie ou Series): Objeto a ser guardado nas colunas.
+
+        Exceções:
+            TypeError: Se o item não for Movie nem Series.
+        """
+        if isinstance(item, Movie):
+            self.adicionar_movie(item.title, item.year, item.rating, item.imdb_id)
+        elif isinstance(item, Series):
+            self.adicionar_series(item.title, item.year, item.seasons,
+                                  item.episodes, item.imdb_id)
+        else:
+            raise TypeError(f'Item desconhecido para o catálogo: {item!r}')
+
+    def __len__(self):
+        return len(self.movies_title) + len(self.series_title)
+
+    def __iter__(self):
+        for title, year, rating, imdb_id in zip(self.movies_title, self.movies_year,
+                                                self.movies_rating, self.movies_imdb_id):
+            yield Movie(title, _inteiro_ou_none(year),
+                        None if rating != rating else rating, imdb_id)  # NaN -> None
+        for title, year, seasons, episodes, imdb_id in zip(
+            self.series_title, self.series_year, self.series_seasons,
+            self.series_episodes, self.series_imdb_id
+        ):
+            yield Series(title, _inteiro_ou_none(year), _inteiro_ou_none(seasons),
+                         _inteiro_ou_none(episodes), imdb_id)
+
+    def colunas_movies(self):
+        """
+        Devolve as colunas dos filmes, com os nomes das colunas da tabela 'movies'.
+
+        Retorno:
+            dict: {'title': list, 'year': array, 'rating': array, 'imdb_id': list}.
+        """
+        return {
+            'title': self.movies_title,
+            'year': self.movies_year,
+            'rating': self.movies_rating,
+            'imdb_id': self.movies_imdb_id,
+        }
+
+    def colunas_series(self):
+        """
+        Devolve as colunas das séries, com os nomes das colunas da tabela 'series'.
+
+        Retorno:
+            dict: {'title': list, 'year': array, 'seasons': array,
+            'episodes': array, 'imdb_id': list}.
+        """
+        return {
+            'title': self.series_title,
+            'year': self.series_year,
+            'seasons': self.series_seasons,
+            'episodes': self.series_episodes,
+            'imdb_id': self.series_imdb_id,
+        }
+
+    def para_dataframe(self, tipo = 'movies'):
+        """
+        Monta um DataFrame a partir das colunas, sem criar objetos por linha.
+
+        As colunas numéricas são lidas direto da memória dos arrays
+        (numpy.frombuffer) e os dados ausentes viram <NA>/NaN.
+
+        Parâmetros:
+            tipo (str, opcional): 'movies' ou 'series'. Padrão: 'movies'.
+
+        Retorno:
+            pandas.DataFrame: Uma linha por título, com as mesmas colunas
+            da tabela correspondente no banco (exceto 'id').
+        """
+        import numpy as np
+        import pandas as pd
+
+        colunas = self.colunas_movies() if tipo == 'movies' else self.colunas_series()
+        dados = {}
+        for nome, coluna in colunas.items():
+            if isinstance(coluna, list):
+                dados[nome] = coluna
+            elif coluna.typecode == 'd':
+                dados[nome] = np.frombuffer(coluna, dtype=np.float64)
+            else:
+                valores = np.frombuffer(coluna, dtype=np.dtype(coluna.typecode))
+                dados[nome] = pd.arrays.IntegerArray(valores, valores == AUSENTE)
+        return pd.DataFrame(dados)
+
+
+@instrumentar('criar_catalogo', contar=lambda catalog: {'linhas': len(catalog)})
+def criar_catalogo(lista_filmes_scraping, lista_series_scraping = None):
     """
-    Cria uma lista de objetos (catalog) a partir dos dados do scraping.
+    Cria o catálogo (catalog) a partir dos dados do scraping.
 
-    A partir da lista de dicionários retornada pelo scraping do IMDb:
+    A partir das listas de dicionários retornadas pelo scraping do IMDb:
         - cria um objeto Movie para cada filme;
-        - adiciona manualmente duas séries fictícias (Breaking Bad e Better Call Saul).
+        - cria um objeto Series para cada série, quando algum ranking de
+          séries foi coletado; caso contrário, adiciona manualmente duas
+          séries fictícias (Breaking Bad e Better Call Saul).
 
     Parâmetros:
         lista_filmes_scraping (list[dict]): Lista de filmes obtida do scraping,
             em que cada dicionário possui as chaves:
             'titulo', 'ano_lancamento', 'nota'.
+        lista_series_scraping (list[dict], opcional): Lista de séries obtida
+            do scraping, com as chaves 'titulo', 'ano_lancamento' e,
+            se disponível, 'episodios'. Padrão: None.
 
     Retorno:
-        list[TV]: Lista contendo objetos Movie e Series.
+        Catalog: Catálogo em colunas; percorrê-lo gera objetos Movie e Series.
     """
-    catalog = []
+    catalog = Catalog()
 
     # Utilizando os dados do exercício 2 (lista de dicionários representando os filmes)
     for filme in lista_filmes_scraping:
-        titulo = filme['titulo']
-        ano = filme['ano_lancamento']
-        nota = filme['nota']
-
-        # Criando objeto da classe Movie a partir dos dados no dicionário
-        objeto_movie = Movie(title=titulo, year=ano, rating=nota)
+        # Guardando título, ano e nota direto nas colunas do catálogo
+        catalog.adicionar_movie(
+            title=filme['titulo'],
+            year=filme['ano_lancamento'],
+            rating=filme['nota'],
+            imdb_id=filme.get('imdb_id')
+        )
 
-        # Armazenando na lista catalog
-        catalog.append(objeto_movie)
+    if lista_series_scraping is not None:
+        # Séries vindas do ranking de TV (temporadas não aparecem no ranking)
+        for serie in lista_series_scraping:
+            catalog.adicionar_series(
+                title=serie['titulo'],
+                year=serie['ano_lancamento'],
+                seasons=None,
+                episodes=serie.get('episodios'),
+                imdb_id=serie.get('imdb_id')
+            )
+        return catalog
 
-    # Criando manualmente dois objetos Series e inserindo na lista catalog
+    # Criando manualmente dois objetos Series e inserindo no catalog
     series1 = Series(title='Breaking Bad', year=2008, seasons=5, episodes=62)
     catalog.append(series1)
     series2 = Series(title='Better Call Saul', year=2015, seasons=6, episodes=63)
@@ -94,3 +298,39 @@ def criar_catalogo(lista_filmes_scraping):
 
     return catalog
 
+
+def gerar_catalogos(rankings):
+    """
+    Versão em streaming de criar_catalogo: para cada ranking recebido,
+    gera um Catalog só com os títulos dele, sem juntar todos antes.
+
+    Como em criar_catalogo, se nenhum ranking de séries passar, as duas
+    séries fictícias (Breaking Bad e Better Call Saul) vêm em um último
+    catálogo, depois dos demais.
+
+    Parâmetros:
+        rankings (iterable): Pares (tipo, itens), com tipo "movie" ou
+            "series" e 'itens' no formato de scraping.obter_filmes_top.
+
+    Retorno:
+        generator: Um Catalog por ranking.
+    """
+    com_series = False
+    for tipo, itens in rankings:
+        catalog = Catalog()
+        if tipo == 'series':
+            com_series = True
+            for serie in itens:
+                catalog.adicionar_series(serie['titulo'], serie['ano_lancamento'], None,
+                                         serie.get('episodios'), serie.get('imdb_id'))
+        else:
+            for filme in itens:
+                catalog.adicionar_movie(filme['titulo'], filme['ano_lancamento'],
+                                        filme['nota'], filme.get('imdb_id'))
+        yield catalog
+
+    if not com_series:
+        catalog = Catalog()
+        catalog.append(Series(title='Breaking Bad', year=2008, seasons=5, episodes=62))
+        catalog.append(Series(title='Better Call Saul', year=2015, seasons=6, episodes=63))
+        yield catalog
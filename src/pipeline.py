@@ -0,0 +1,310 @@
+import cProfile
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from .arquivos import escrever_atomico
+
+
+# Pasta do pacote 'src', de onde é lido o código de cada etapa
+PASTA_CODIGO = os.path.dirname(os.path.abspath(__file__))
+
+
+class Etapa:
+    """
+    Etapa do pipeline, com as entradas e saídas declaradas.
+
+    A impressão digital (fingerprint) da etapa é o SHA-256 de: nome, código
+    dos módulos em 'modulos', seções 'secoes' do config, entradas extras
+    (função 'entradas') e saídas atuais das etapas de 'depende_de'. Se a
+    impressão for a mesma da última execução e as saídas da etapa (função
+    'saidas') ainda estiverem como ela as deixou, a etapa é pulada e a
+    saída de terminal guardada é exibida de novo.
+
+    Atributos:
+        nome (str): Nome da etapa (também o subcomando da linha de comando).
+        funcao (callable): funcao(config, contexto), que executa a etapa.
+        depende_de (tuple[str]): Etapas cujas saídas a etapa lê.
+        modulos (tuple[str]): Arquivos de src/ com o código da etapa.
+        secoes (tuple[str]): Seções do config que afetam o resultado.
+        entradas (callable, opcional): entradas(config) -> dict com outras
+            entradas (ex.: tamanho e data de arquivos lidos).
+        saidas (callable, opcional): saidas(config, contexto) -> dict com o
+            resumo (hash, assinatura) de cada artefato produzido.
+        externa (bool ou callable): True (ou externa(config) -> True) se a
+            etapa depende de algo fora do projeto (ex.: o site do IMDb) e,
+            por isso, roda sempre.
+    """
+    def __init__(self, nome, funcao, depende_de = (), modulos = (), secoes = (),
+                 entradas = None, saidas = None, externa = False):
+        self.nome = nome
+        self.funcao = funcao
+        self.depende_de = tuple(depende_de)
+        self.modulos = tuple(modulos)
+        self.secoes = tuple(secoes)
+        self.entradas = entradas
+        self.saidas = saidas
+        self.externa = externa
+
+    def eh_externa(self, config):
+        return self.externa(config) if callable(self.externa) else bool(self.externa)
+
+    def saidas_atuais(self, config, contexto):
+        # Resumo atual dos artefatos da etapa ({} se ela só escreve no terminal)
+        return self.saidas(config, contexto) if self.saidas is not None else {}
+
+
+def hash_arquivo(caminho, tamanho_bloco = 1 << 20):
+    """
+    Calcula o SHA-256 do conteúdo de um arquivo, lido em blocos.
+
+    Parâmetros:
+        caminho (str): Caminho do arquivo.
+        tamanho_bloco (int, opcional): Bytes lidos por vez. Padrão: 1 MB.
+
+    Retorno:
+        str ou None: Hash em hexadecimal, ou None se o arquivo não existir.
+    """
+    if not os.path.exists(caminho):
+        return None
+    resumo = hashlib.sha256()
+    with open(caminho, mode='rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def hash_codigo(modulos):
+    # Versão do código: hash de cada arquivo de src/ usado pela etapa
+    return {modulo: hash_arquivo(os.path.join(PASTA_CODIGO, modulo)) for modulo in modulos}
+
+
+def impressao_digital(etapa, config, entradas_dependencias):
+    """
+    Calcula a impressão digital de uma etapa.
+
+    Parâmetros:
+        etapa (Etapa): Etapa do pipeline.
+        config (dict): Configuração lida de config.json.
+        entradas_dependencias (dict): Nome da dependência -> saídas atuais dela.
+
+    Retorno:
+        str: SHA-256 em hexadecimal.
+    """
+    conteudo = json.dumps({
+        'etapa': etapa.nome,
+        'codigo': hash_codigo(etapa.modulos),
+        'config': {secao: config.get(secao) for secao in etapa.secoes},
+        'entradas': etapa.entradas(config) if etapa.entradas is not None else {},
+        'dependencias': entradas_dependencias,
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def carregar_manifesto_pipeline(caminho):
+    # Manifesto da última execução de cada etapa ({} se ainda não existir)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, mode='r', encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def gravar_manifesto_pipeline(manifesto, caminho):
+    # Grava o manifesto de forma atômica (ver arquivos.escrever_atomico)
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+
+    def escrever(temporario):
+        with open(temporario, mode='w', encoding='utf-8') as arquivo:
+            json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+
+    escrever_atomico(caminho, escrever)
+
+
+class SaidaPorThread(io.TextIOBase):
+    """
+    Substituto de sys.stdout que, nas threads que estão executando uma
+    etapa, guarda o texto em um buffer próprio da etapa. Assim, etapas
+    executadas ao mesmo tempo não misturam as saídas no terminal, e a
+    saída de cada uma pode ser guardada no manifesto.
+
+    Nas demais threads, o texto vai direto para a saída original.
+    """
+    def __init__(self, original):
+        self.original = original
+        self._local = threading.local()
+
+    def capturar(self, buffer):
+        # Passa a guardar em 'buffer' o que a thread atual escrever (None encerra)
+        self._local.buffer = buffer
+
+    def write(self, texto):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            return self.original.write(texto)
+        return buffer.write(texto)
+
+    def flush(self):
+        self.original.flush()
+
+
+def etapas_a_partir_de(etapas, nome):
+    """
+    Devolve a etapa 'nome' e todas as que dependem dela, direta ou
+    indiretamente, na ordem de 'etapas'.
+
+    Parâmetros:
+        etapas (list[Etapa]): Etapas do pipeline, em ordem topológica.
+        nome (str): Nome da etapa inicial.
+
+    Retorno:
+        list[str]: Nomes das etapas.
+    """
+    selecionadas = {nome}
+    for etapa in etapas:
+        if selecionadas.intersection(etapa.depende_de):
+            selecionadas.add(etapa.nome)
+    return [etapa.nome for etapa in etapas if etapa.nome in selecionadas]
+
+
+def executar_pipeline(etapas, config, contexto, selecionadas = None, forcar = (),
+                      caminho_manifesto = 'data/pipeline.json', max_workers = 3,
+                      perfis = None):
+    """
+    Executa as etapas selecionadas do pipeline, respeitando as dependências.
+
+    Etapas independentes entre si (ex.: exportação e resumo, que só leem o
+    banco) rodam ao mesmo tempo em um pool de threads. Cada etapa só roda
+    se a sua impressão digital mudou desde a última execução (ver Etapa),
+    se for externa ou se estiver em 'forcar'. A saída de terminal de cada
+    etapa é exibida inteira, na ordem de 'etapas', quando ela termina.
+
+    Se uma etapa falha, as que dependem dela não rodam; as demais seguem.
+
+    Parâmetros:
+        etapas (list[Etapa]): Etapas do pipeline, em ordem topológica.
+        config (dict): Configuração lida de config.json.
+        contexto (dict): Dados compartilhados entre as etapas desta execução.
+        selecionadas (list[str], opcional): Etapas a executar. As demais não
+            rodam, mas as saídas atuais delas valem como entrada. Padrão: todas.
+        forcar (iterable[str], opcional): Etapas executadas mesmo sem mudanças.
+        caminho_manifesto (str, opcional): Arquivo JSON com a impressão,
+            as saídas e a saída de terminal da última execução de cada etapa.
+            Padrão: 'data/pipeline.json'.
+        max_workers (int, opcional): Etapas executadas ao mesmo tempo. Padrão: 3.
+        perfis (list, opcional): Se informada, cada etapa executada roda sob
+            um cProfile.Profile próprio (o cProfile só enxerga a thread em
+            que foi ativado), acrescentado a esta lista. Padrão: None.
+
+    Retorno:
+        dict: Nome da etapa -> {'situacao': 'executada', 'reaproveitada',
+        'falhou' ou 'bloqueada', 'segundos', 'erro' (a exceção ou None)},
+        na ordem de 'etapas'.
+    """
+    por_nome = {etapa.nome: etapa for etapa in etapas}
+    if selecionadas is None:
+        selecionadas = [etapa.nome for etapa in etapas]
+    selecionadas = [etapa.nome for etapa in etapas if etapa.nome in set(selecionadas)]
+    forcar = set(forcar)
+
+    manifesto = carregar_manifesto_pipeline(caminho_manifesto)
+    trava = threading.Lock()
+    saidas_atuais = {}
+    resultados = {}
+    textos = {}
+
+    def saidas_de(nome):
+        # Saídas atuais de uma etapa (calculadas uma vez por execução)
+        with trava:
+            if nome in saidas_atuais:
+                return saidas_atuais[nome]
+        saidas = por_nome[nome].saidas_atuais(config, contexto)
+        with trava:
+            saidas_atuais[nome] = saidas
+        return saidas
+
+    def rodar(etapa):
+        inicio = time.perf_counter()
+        impressao = impressao_digital(
+            etapa, config, {nome: saidas_de(nome) for nome in etapa.depende_de}
+        )
+        anterior = manifesto.get(etapa.nome, {})
+        if (etapa.nome not in forcar and not etapa.eh_externa(config)
+                and anterior.get('impressao') == impressao
+                and anterior.get('saidas') == saidas_de(etapa.nome)):
+            texto = (f'\n[Etapa "{etapa.nome}" sem mudanças desde {anterior["concluida_em"]}: '
+                     f'saída da última execução]\n' + anterior.get('texto', ''))
+            return 'reaproveitada', texto, time.perf_counter() - inicio, None
+
+        buffer = io.StringIO()
+        perfil = cProfile.Profile() if perfis is not None else None
+        saida.capturar(buffer)
+        try:
+            if perfil is not None:
+                perfil.runcall(etapa.funcao, config, contexto)
+            else:
+                etapa.funcao(config, contexto)
+        except Exception as erro:
+            return 'falhou', buffer.getvalue(), time.perf_counter() - inicio, erro
+        finally:
+            saida.capturar(None)
+            if perfil is not None:
+                with trava:
+                    perfis.append(perfil)
+        with trava:
+            saidas_atuais.pop(etapa.nome, None)
+        texto = buffer.getvalue()
+        registro = {
+            'impressao': impressao,
+            'saidas': saidas_de(etapa.nome),
+            'concluida_em': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'texto': texto,
+        }
+        with trava:
+            manifesto[etapa.nome] = registro
+            gravar_manifesto_pipeline(manifesto, caminho_manifesto)
+        return 'executada', texto, time.perf_counter() - inicio, None
+
+    def exibir_concluidas():
+        # Exibe, na ordem das etapas, as saídas que já podem ser exibidas
+        for nome in selecionadas:
+            if nome not in resultados:
+                return
+            if nome in textos:
+                saida.original.write(textos.pop(nome))
+                saida.original.flush()
+
+    saida = SaidaPorThread(sys.stdout)
+    sys.stdout = saida
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pendentes = list(selecionadas)
+            em_execucao = {}
+            while pendentes or em_execucao:
+                for nome in list(pendentes):
+                    dependencias = [dep for dep in por_nome[nome].depende_de if dep in selecionadas]
+                    if any(resultados.get(dep, {}).get('situacao') in ('falhou', 'bloqueada')
+                           for dep in dependencias):
+                        pendentes.remove(nome)
+                        resultados[nome] = {'situacao': 'bloqueada', 'segundos': 0.0, 'erro': None}
+                    elif all(dep in resultados for dep in dependencias):
+                        pendentes.remove(nome)
+                        em_execucao[executor.submit(rodar, por_nome[nome])] = nome
+                if not em_execucao:
+                    continue
+
+                concluidos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+                for futuro in concluidos:
+                    nome = em_execucao.pop(futuro)
+                    situacao, textos[nome], segundos, erro = futuro.result()
+                    resultados[nome] = {'situacao': situacao, 'segundos': segundos, 'erro': erro}
+                exibir_concluidas()
+        exibir_concluidas()
+    finally:
+        sys.stdout = saida.original
+
+    return {nome: resultados[nome] for nome in selecionadas}
@@ -1,54 +1,257 @@
-import urllib.request
-from bs4 import BeautifulSoup
+import gzip
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from bs4 import BeautifulSoup, SoupStrainer
 
+from .fetching import ClienteHTTP, ErroHTTP
+from .http_cache import ForaDoCacheError, aceitar_codificacoes, descomprimir
+from .metrics import em_contexto, instrumentar, registrar
 
-def get_soup(url):
+
+# Marcador da tag <script> em que o IMDb embute os dados da página em JSON
+MARCADOR_NEXT_DATA = b'<script id="__NEXT_DATA__"'
+
+# Padrão para extrair o identificador do IMDb (ex.: tt0111161) de um link
+PADRAO_IMDB_ID = re.compile(r'/title/(tt\d+)')
+
+# Padrões para o ano (em séries vem como "2008–2013") e a quantidade de episódios ("62 eps")
+PADRAO_ANO = re.compile(r'\d{4}')
+PADRAO_EPISODIOS = re.compile(r'(\d+)\s*(?:eps|episódios|episodes)', re.IGNORECASE)
+
+# Ordem dos campos nas tuplas devolvidas por extrair_rankings_arquivos
+CAMPOS_TITULO = ('titulo', 'ano_lancamento', 'nota', 'imdb_id', 'votos', 'duracao_min', 'episodios')
+
+# Extensões das páginas salvas lidas por listar_arquivos_html
+EXTENSOES_HTML = ('.html', '.htm', '.html.gz', '.htm.gz')
+
+
+def baixar_html(url, cache = None, timeout = 30, cliente = None):
     """
-    Baixa o HTML de uma URL e devolve um objeto BeautifulSoup.
+    Baixa o conteúdo HTML bruto de uma URL.
+
+    A requisição aceita respostas comprimidas (gzip/deflate/br), que são
+    descomprimidas aqui. Se um cache for informado:
+        - uma resposta guardada dentro do TTL é usada sem acessar a rede;
+        - uma resposta vencida é revalidada com 'If-None-Match' /
+          'If-Modified-Since' (resposta 304 reaproveita o corpo guardado);
+        - no modo offline, apenas o cache é consultado.
 
     Parâmetros:
         url (str): Endereço da página que será acessada.
+        cache (CacheHTTP, opcional): Cache de respostas. Padrão: None (sem cache).
+        timeout (float, opcional): Tempo máximo de espera da rede, em segundos.
+            Padrão: 30.
+        cliente (ClienteHTTP, opcional): Cliente com conexões persistentes,
+            limite de taxa e novas tentativas. Se omitido, é criado um
+            cliente só para esta requisição, fechado ao fim dela.
 
     Retorno:
-        BeautifulSoup: Objeto contendo a estrutura HTML da página,
-        pronto para ser navegada e ter elementos extraídos.
+        bytes: Conteúdo HTML da página, ainda não interpretado.
     """
+    entrada = cache.obter(url) if cache is not None else None
+
+    if cache is not None and entrada is not None:
+        if cache.offline or cache.esta_fresca(entrada):
+            cache.registrar_acerto(url, entrada)
+            return entrada['corpo']
+
+    if cache is not None and cache.offline:
+        raise ForaDoCacheError(f'URL fora do cache (modo offline): {url}')
+
     headers = {
         'User-Agent': (
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
             'AppleWebKit/537.36 (KHTML, like Gecko) '
             'Chrome/58.0.3029.110 Safari/537.36'
-        )
+        ),
+        'Accept-Encoding': aceitar_codificacoes(),
     }
-    requisicao = urllib.request.Request(url, headers=headers)
-    resposta = urllib.request.urlopen(requisicao)
-    html = resposta.read()
+    if cache is not None:
+        headers.update(cache.cabecalhos_condicionais(entrada))
+
+    # Sem cliente, as conexões de um cliente temporário são fechadas ao fim
+    cliente_temporario = cliente is None
+    if cliente_temporario:
+        cliente = ClienteHTTP(timeout=timeout)
+    try:
+        status, cabecalhos, corpo_recebido = cliente.requisitar(url, headers, timeout=timeout)
+    finally:
+        if cliente_temporario:
+            cliente.fechar()
+    registrar(bytes_lidos=len(corpo_recebido))
+
+    # 304: o conteúdo não mudou desde a versão guardada no cache
+    if status == 304 and entrada is not None:
+        cache.registrar_acerto(url, entrada, revalidada=True)
+        return entrada['corpo']
+    if status >= 400:
+        raise ErroHTTP(url, status)
+
+    html = descomprimir(corpo_recebido, cabecalhos.get('Content-Encoding'))
+
+    if cache is not None:
+        cache.salvar(
+            url,
+            html,
+            etag=cabecalhos.get('ETag'),
+            last_modified=cabecalhos.get('Last-Modified'),
+            bytes_recebidos=len(corpo_recebido),
+        )
+
+    return html
+
+
+@instrumentar('get_soup')
+def get_soup(url, cache = None):
+    """
+    Baixa o HTML de uma URL e devolve um objeto BeautifulSoup.
+
+    Parâmetros:
+        url (str): Endereço da página que será acessada.
+        cache (CacheHTTP, opcional): Cache de respostas (ver baixar_html).
+
+    Retorno:
+        BeautifulSoup: Objeto contendo a estrutura HTML da página,
+        pronto para ser navegada e ter elementos extraídos.
+    """
+    html = baixar_html(url, cache=cache)
     soup = BeautifulSoup(html, 'html.parser')
     return soup
 
 
-def obter_filmes_top(url, n_filmes = 250):
+def extrair_json_next_data(html):
     """
-    Acessa a página do IMDb Top 250 e extrai dados dos filmes.
+    Localiza e decodifica o bloco JSON '__NEXT_DATA__' embutido na página,
+    sem montar a árvore HTML completa (busca direta pelo marcador da tag).
 
-    Para cada filme encontrado, extrai:
-        - título
-        - ano de lançamento
-        - nota (rating) no IMDb
+    Parâmetros:
+        html (bytes ou str): Conteúdo HTML da página.
+
+    Retorno:
+        dict ou None: Conteúdo do bloco JSON, ou None se a página
+        não possuir o bloco (ou se ele estiver inválido).
+    """
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+
+    inicio_tag = html.find(MARCADOR_NEXT_DATA)
+    if inicio_tag == -1:
+        return None
+
+    # O JSON começa logo após o fechamento da tag de abertura '<script ...>'
+    inicio_json = html.find(b'>', inicio_tag) + 1
+    fim_json = html.find(b'</script>', inicio_json)
+    if inicio_json == 0 or fim_json == -1:
+        return None
+
+    try:
+        return json.loads(html[inicio_json:fim_json])
+    except ValueError:
+        return None
+
+
+def buscar_chave(dados, chave):
+    """
+    Procura recursivamente (em dicionários e listas) o primeiro valor
+    associado a uma chave.
 
     Parâmetros:
-        url (str): URL da página do IMDb Top 250 (ou equivalente).
+        dados (dict ou list): Estrutura JSON já decodificada.
+        chave (str): Nome da chave procurada.
+
+    Retorno:
+        object ou None: Valor encontrado, ou None se a chave não existir.
+    """
+    pendentes = [dados]
+    while pendentes:
+        atual = pendentes.pop()
+        if isinstance(atual, dict):
+            if chave in atual:
+                return atual[chave]
+            pendentes.extend(atual.values())
+        elif isinstance(atual, list):
+            pendentes.extend(atual)
+    return None
+
+
+def extrair_filmes_json(html, n_filmes = 250):
+    """
+    Extrai os filmes do ranking a partir do JSON embutido na página
+    ('__NEXT_DATA__'), sem usar o BeautifulSoup.
+
+    Além de título, ano e nota, o JSON traz de graça o identificador
+    do IMDb, a quantidade de votos e a duração.
+
+    Parâmetros:
+        html (bytes ou str): Conteúdo HTML da página do ranking.
         n_filmes (int, opcional): Quantidade máxima de filmes a serem
             coletados a partir do topo do ranking. Padrão: 250.
 
     Retorno:
-        list[dict]: Lista de dicionários, em que cada dicionário
-        representa um filme com as chaves:
-            - 'titulo' (str)
-            - 'ano_lancamento' (int)
-            - 'nota' (float)
+        list[dict] ou None: Lista de filmes no mesmo formato de
+        obter_filmes_top, ou None se o JSON não estiver disponível
+        ou não tiver a estrutura esperada.
+    """
+    dados = extrair_json_next_data(html)
+    if dados is None:
+        return None
+
+    chart_titles = buscar_chave(dados, 'chartTitles')
+    if not isinstance(chart_titles, dict) or not chart_titles.get('edges'):
+        return None
+
+    lista_filmes = []
+
+    try:
+        for aresta in chart_titles['edges'][:n_filmes]:
+            no = aresta['node']
+            resumo_notas = no.get('ratingsSummary') or {}
+            duracao = no.get('runtime') or {}
+            episodios = (no.get('episodes') or {}).get('episodes') or {}
+            nota = resumo_notas.get('aggregateRating')
+
+            filme = {
+                'titulo': no['titleText']['text'],
+                'ano_lancamento': int(no['releaseYear']['year']),
+                # Títulos recentes (ex.: MovieMeter) podem ainda não ter nota
+                'nota': float(nota) if nota is not None else None,
+                'imdb_id': no.get('id'),
+                'votos': resumo_notas.get('voteCount'),
+                'duracao_min': (
+                    duracao['seconds'] // 60 if duracao.get('seconds') else None
+                ),
+                'episodios': episodios.get('total'),
+            }
+            lista_filmes.append(filme)
+    except (KeyError, TypeError, ValueError):
+        # Estrutura diferente da esperada: quem chamou usa o HTML
+        return None
+
+    return lista_filmes
+
+
+def extrair_filmes_dom(html, n_filmes = 250):
+    """
+    Extrai os filmes do ranking percorrendo as tags HTML da lista.
+
+    Apenas a tag 'ul' de classe 'ipc-metadata-list' é interpretada
+    (SoupStrainer), em vez da página inteira.
+
+    Parâmetros:
+        html (bytes ou str): Conteúdo HTML da página do ranking.
+        n_filmes (int, opcional): Quantidade máxima de filmes a serem
+            coletados a partir do topo do ranking. Padrão: 250.
+
+    Retorno:
+        list[dict]: Lista de filmes no mesmo formato de obter_filmes_top
+        ('votos' e 'duracao_min' ficam como None neste caminho).
     """
-    soup = get_soup(url)
+    somente_lista = SoupStrainer('ul', class_='ipc-metadata-list')
+    soup = BeautifulSoup(html, 'html.parser', parse_only=somente_lista)
 
     ul_filmes = soup.find('ul', class_='ipc-metadata-list')
 
@@ -64,21 +267,40 @@ def obter_filmes_top(url, n_filmes = 250):
         texto_titulo = tag_h3_titulo.get_text(strip=True)
 
         # Extraindo o ano de lançamento do filme
-        # É armazenado dentro da PRIMEIRA tag 'span' de classe 'cli-title-metadata-item' (usar método 'find')
-        tag_span_ano_lancamento = tag_li_filme.find('span', class_='cli-title-metadata-item')
-        texto_ano_lancamento = tag_span_ano_lancamento.get_text(strip=True)
-        int_ano_lancamento = int(texto_ano_lancamento)
+        # É armazenado dentro da PRIMEIRA tag 'span' de classe 'cli-title-metadata-item'
+        # (em séries o texto é um intervalo, ex.: "2008–2013", e vale o primeiro ano)
+        tags_span_metadados = tag_li_filme.find_all('span', class_='cli-title-metadata-item')
+        texto_ano_lancamento = tags_span_metadados[0].get_text(strip=True)
+        int_ano_lancamento = int(PADRAO_ANO.search(texto_ano_lancamento).group())
+
+        # Em séries, um dos metadados seguintes é a quantidade de episódios ("62 eps")
+        episodios = None
+        for tag_span in tags_span_metadados[1:]:
+            encontrado = PADRAO_EPISODIOS.search(tag_span.get_text(strip=True))
+            if encontrado:
+                episodios = int(encontrado.group(1))
+                break
 
-        # Extraindo a nota do filme
+        # Extraindo a nota do filme (títulos recentes podem ainda não ter nota)
         tag_span_nota = tag_li_filme.find('span', class_='ipc-rating-star--rating')
-        texto_nota = tag_span_nota.get_text(strip=True)
-        float_nota = float(texto_nota.replace(',', '.'))
+        float_nota = None
+        if tag_span_nota is not None:
+            texto_nota = tag_span_nota.get_text(strip=True)
+            float_nota = float(texto_nota.replace(',', '.'))
+
+        # Extraindo o identificador do IMDb a partir do link do título
+        tag_link = tag_li_filme.find('a', href=PADRAO_IMDB_ID)
+        imdb_id = PADRAO_IMDB_ID.search(tag_link['href']).group(1) if tag_link else None
 
         # Montando um dicionário contendo título, ano de lançamento e nota no IMDb de cada filme
         filme = {
             'titulo': texto_titulo,
             'ano_lancamento': int_ano_lancamento,
-            'nota': float_nota
+            'nota': float_nota,
+            'imdb_id': imdb_id,
+            'votos': None,
+            'duracao_min': None,
+            'episodios': episodios,
         }
 
         # Armazenando na lista os dicionários dos filmes
@@ -86,3 +308,227 @@ def obter_filmes_top(url, n_filmes = 250):
 
     return lista_filmes
 
+
+def extrair_filmes_html(html, n_filmes = 250):
+    """
+    Extrai os filmes do ranking de uma página já baixada.
+
+    Tenta primeiro o caminho rápido (JSON embutido) e, se ele não
+    estiver disponível, percorre as tags HTML da lista.
+
+    Parâmetros:
+        html (bytes ou str): Conteúdo HTML da página do ranking.
+        n_filmes (int, opcional): Quantidade máxima de filmes. Padrão: 250.
+
+    Retorno:
+        list[dict]: Lista de filmes no formato de obter_filmes_top.
+    """
+    lista_filmes = extrair_filmes_json(html, n_filmes)
+    if lista_filmes is None:
+        lista_filmes = extrair_filmes_dom(html, n_filmes)
+    return lista_filmes
+
+
+@instrumentar('obter_filmes_top', contar=lambda filmes: {'linhas': len(filmes)})
+def obter_filmes_top(url, n_filmes = 250, cache = None, cliente = None):
+    """
+    Acessa a página do IMDb Top 250 e extrai dados dos filmes.
+
+    Para cada filme encontrado, extrai:
+        - título
+        - ano de lançamento
+        - nota (rating) no IMDb
+        - identificador do IMDb, quantidade de votos e duração
+          (quando disponíveis)
+
+    Parâmetros:
+        url (str): URL da página do IMDb Top 250 (ou equivalente).
+        n_filmes (int, opcional): Quantidade máxima de filmes a serem
+            coletados a partir do topo do ranking. Padrão: 250.
+        cache (CacheHTTP, opcional): Cache de respostas HTTP. Padrão: None.
+        cliente (ClienteHTTP, opcional): Cliente HTTP compartilhado. Padrão: None.
+
+    Retorno:
+        list[dict]: Lista de dicionários, em que cada dicionário
+        representa um filme com as chaves:
+            - 'titulo' (str)
+            - 'ano_lancamento' (int)
+            - 'nota' (float ou None)
+            - 'imdb_id' (str ou None)
+            - 'votos' (int ou None)
+            - 'duracao_min' (int ou None)
+            - 'episodios' (int ou None; apenas em rankings de séries)
+    """
+    html = baixar_html(url, cache=cache, cliente=cliente)
+    return extrair_filmes_html(html, n_filmes)
+
+
+def obter_rankings(fontes, cache = None, cliente = None, max_workers = 4):
+    """
+    Baixa e extrai vários rankings do IMDb ao mesmo tempo.
+
+    As páginas são baixadas em paralelo por um pool de threads que
+    compartilha o mesmo cliente HTTP (conexões reaproveitadas por host,
+    limite de taxa e novas tentativas), de modo que o tempo total fica
+    próximo ao do download mais lento, e não à soma de todos.
+
+    Parâmetros:
+        fontes (list[dict]): Rankings a coletar, cada um com as chaves
+            'nome', 'url', 'tipo' ("movie" ou "series") e, opcionalmente,
+            'n_titulos' (padrão: 250).
+        cache (CacheHTTP, opcional): Cache de respostas HTTP. Padrão: None.
+        cliente (ClienteHTTP, opcional): Cliente HTTP compartilhado; se
+            omitido, é criado um com as configurações padrão.
+        max_workers (int, opcional): Downloads simultâneos. Padrão: 4.
+
+    Retorno:
+        dict: Para cada 'nome' de fonte, um dicionário com as chaves
+        'tipo' e 'itens' (lista no formato de obter_filmes_top),
+        na mesma ordem de 'fontes'.
+    """
+    rankings = {}
+    for fonte, itens in gerar_rankings(fontes, cache=cache, cliente=cliente, max_workers=max_workers):
+        rankings[fonte['nome']] = {'tipo': fonte.get('tipo', 'movie'), 'itens': itens}
+    return rankings
+
+
+def gerar_rankings(fontes, cache = None, cliente = None, max_workers = 4):
+    """
+    Versão em streaming de obter_rankings: gera cada ranking assim que a
+    sua página é baixada e extraída, na ordem de 'fontes', sem esperar
+    pelos demais.
+
+    No máximo 'max_workers' páginas ficam em download ou prontas à frente
+    da que está sendo consumida: se quem consome demora (ex.: gravando no
+    banco), os downloads seguintes esperam, e a memória não cresce com a
+    quantidade de fontes.
+
+    Parâmetros:
+        fontes (iterable): Rankings a coletar (ver obter_rankings).
+        cache (CacheHTTP, opcional): Cache de respostas HTTP. Padrão: None.
+        cliente (ClienteHTTP, opcional): Cliente HTTP compartilhado; se
+            omitido, é criado um com as configurações padrão, fechado ao
+            fim da coleta.
+        max_workers (int, opcional): Downloads simultâneos. Padrão: 4.
+
+    Retorno:
+        generator: Pares (fonte, itens), com 'itens' no formato de obter_filmes_top.
+    """
+    cliente_temporario = cliente is None
+    if cliente_temporario:
+        cliente = ClienteHTTP()
+
+    def coletar(fonte):
+        return obter_filmes_top(
+            fonte['url'],
+            n_filmes=fonte.get('n_titulos', 250),
+            cache=cache,
+            cliente=cliente,
+        )
+
+    fontes = iter(fontes)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pendentes = deque(
+                (fonte, executor.submit(em_contexto(coletar), fonte)) for fonte in islice(fontes, max_workers)
+            )
+            try:
+                while pendentes:
+                    fonte, futuro = pendentes.popleft()
+                    itens = futuro.result()
+                    # Uma página consumida libera a vaga para a próxima fonte
+                    for proxima in islice(fontes, 1):
+                        pendentes.append((proxima, executor.submit(em_contexto(coletar), proxima)))
+                    yield fonte, itens
+            finally:
+                for _, futuro in pendentes:
+                    futuro.cancel()
+    finally:
+        # Depois do pool: nenhum download ainda usa as conexões
+        if cliente_temporario:
+            cliente.fechar()
+
+
+def listar_arquivos_html(origem):
+    """
+    Monta a lista de páginas salvas a processar.
+
+    Parâmetros:
+        origem (str ou iterable): Pasta com as páginas (arquivos de
+            EXTENSOES_HTML, em ordem alfabética) ou lista de caminhos.
+
+    Retorno:
+        list[str]: Caminhos dos arquivos.
+    """
+    if isinstance(origem, (str, os.PathLike)) and os.path.isdir(origem):
+        return sorted(
+            os.path.join(origem, nome) for nome in os.listdir(origem)
+            if nome.lower().endswith(EXTENSOES_HTML)
+        )
+    return [os.fspath(caminho) for caminho in origem]
+
+
+def extrair_arquivo_ranking(caminho, n_filmes = 250):
+    """
+    Lê uma página de ranking salva em disco (.html ou .html.gz) e extrai
+    os títulos com extrair_filmes_html.
+
+    Executada nos processos do pool de extrair_rankings_arquivos: devolve
+    tuplas (leves para enviar de volta ao processo principal) em vez de
+    dicionários ou objetos do BeautifulSoup.
+
+    Parâmetros:
+        caminho (str): Caminho do arquivo.
+        n_filmes (int, opcional): Quantidade máxima de títulos. Padrão: 250.
+
+    Retorno:
+        tuple: (itens, erro), em que 'itens' é uma tupla de tuplas na ordem
+        de CAMPOS_TITULO (None em caso de erro) e 'erro' a mensagem do erro
+        (None se deu certo).
+    """
+    try:
+        abrir = gzip.open if caminho.lower().endswith('.gz') else open
+        with abrir(caminho, 'rb') as arquivo:
+            html = arquivo.read()
+        filmes = extrair_filmes_html(html, n_filmes)
+    except Exception as excecao:
+        return None, f'{type(excecao).__name__}: {excecao}'
+    return tuple(tuple(filme[campo] for campo in CAMPOS_TITULO) for filme in filmes), None
+
+
+def extrair_rankings_arquivos(origem, n_filmes = 250, max_workers = None):
+    """
+    Extrai os títulos de muitas páginas de ranking salvas em disco (ex.:
+    um arquivo de snapshots antigos), distribuindo a interpretação do
+    HTML entre processos (ProcessPoolExecutor), um por núcleo, já que
+    esse trabalho usa a CPU e não anda em paralelo em threads (GIL).
+
+    Parâmetros:
+        origem (str ou iterable): Pasta com as páginas ou lista de caminhos
+            (ver listar_arquivos_html).
+        n_filmes (int, opcional): Quantidade máxima de títulos por página.
+            Padrão: 250.
+        max_workers (int, opcional): Quantidade de processos. Padrão: um
+            por núcleo da máquina; com 1, tudo roda no próprio processo.
+
+    Retorno:
+        list[tuple]: Um item (caminho, itens, erro) por arquivo, na mesma
+        ordem da entrada, com 'itens' e 'erro' como em extrair_arquivo_ranking.
+        Para voltar ao formato de obter_filmes_top:
+        [dict(zip(CAMPOS_TITULO, item)) for item in itens].
+    """
+    caminhos = listar_arquivos_html(origem)
+    max_workers = max_workers or os.cpu_count() or 1
+    n_filmes_por_arquivo = [n_filmes] * len(caminhos)
+
+    if max_workers == 1 or len(caminhos) <= 1:
+        resultados = map(extrair_arquivo_ranking, caminhos, n_filmes_por_arquivo)
+        return [(caminho, *resultado) for caminho, resultado in zip(caminhos, resultados)]
+
+    # Vários arquivos por envio, para diluir o custo de comunicação entre processos
+    tamanho_pacote = max(1, len(caminhos) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        resultados = executor.map(extrair_arquivo_ranking, caminhos, n_filmes_por_arquivo,
+                                  chunksize=tamanho_pacote)
+        return [(caminho, *resultado) for caminho, resultado in zip(caminhos, resultados)]
+
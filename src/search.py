@@ -0,0 +1,326 @@
+import re
+
+from sqlalchemy import bindparam, select, text
+
+from .database import (
+    obter_engine, normalizar_titulo, sincronizar_indice_busca, ORIGENS_BUSCA, MovieDB, SeriesDB,
+)
+from .metrics import instrumentar, registrar
+
+# Tipo do título (como em Catalog e nas fontes) -> tabela de origem
+TABELAS_TIPO = {'movie': MovieDB.__table__, 'series': SeriesDB.__table__}
+
+# Tipo do título -> valor somado a id * 2 no rowid dos índices de busca
+ORIGENS_TIPO = {'movie': ORIGENS_BUSCA['movies'], 'series': ORIGENS_BUSCA['series']}
+
+# Palavras da consulta (letras e dígitos, em qualquer alfabeto)
+_PALAVRA = re.compile(r'\w+')
+
+# Menor palavra incompleta aceita na busca por palavras (ver expressao_fts)
+MIN_PREFIXO = 2
+
+# Na busca aproximada: quantos trechos de 3 letras (os mais raros no índice)
+# entram na consulta, e quantos títulos candidatos são comparados um a um
+MAX_TRIGRAMAS = 12
+MAX_CANDIDATOS = 100
+
+
+def distancia_edicao(a, b, maximo = None):
+    """
+    Distância de Levenshtein: menor número de inserções, remoções e trocas
+    de caracteres que transformam 'a' em 'b'.
+
+    Usa o algoritmo de vetores de bits de Myers (na forma de Hyyrö): cada
+    coluna da tabela de distâncias é guardada nos bits de dois inteiros,
+    de modo que cada caractere de 'a' custa algumas operações com inteiros
+    em vez de um laço sobre os caracteres de 'b'.
+
+    Parâmetros:
+        a (str): Primeiro texto.
+        b (str): Segundo texto.
+        maximo (int, opcional): Maior distância de interesse. Acima dela, o
+            cálculo é interrompido assim que possível e devolve maximo + 1.
+
+    Retorno:
+        int: Distância entre os dois textos (no máximo maximo + 1).
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if maximo is not None and len(a) - len(b) > maximo:
+        return maximo + 1
+    if not b:
+        return len(a)
+
+    # Posições (bits) de cada caractere em 'b'
+    posicoes = {}
+    for i, caractere in enumerate(b):
+        posicoes[caractere] = posicoes.get(caractere, 0) | (1 << i)
+    todos = (1 << len(b)) - 1
+    ultimo = 1 << (len(b) - 1)
+
+    # Diferenças +1 e -1 entre linhas vizinhas da coluna atual
+    positivos, negativos, distancia = todos, 0, len(b)
+    for j, caractere in enumerate(a, 1):
+        iguais = posicoes.get(caractere, 0)
+        xv = iguais | negativos
+        xh = (((iguais & positivos) + positivos) ^ positivos) | iguais
+        ph = negativos | (~(xh | positivos) & todos)
+        mh = positivos & xh
+        if ph & ultimo:
+            distancia += 1
+        elif mh & ultimo:
+            distancia -= 1
+        # Cada caractere restante reduz a distância em no máximo 1
+        if maximo is not None and distancia - (len(a) - j) > maximo:
+            return maximo + 1
+        ph = ((ph << 1) | 1) & todos
+        mh = (mh << 1) & todos
+        positivos = mh | (~(xv | ph) & todos)
+        negativos = ph & xv
+    return distancia
+
+
+def similaridade(consulta, titulo, minimo = 0.0):
+    """
+    Semelhança entre a consulta e o título, de 0 a 1, pela distância de
+    edição (ver distancia_edicao) entre os textos normalizados. Cada
+    sequência de palavras do título com o mesmo número de palavras da
+    consulta é comparada, de modo que 'godfater' fica próximo de 'The
+    Godfather Part II'.
+
+    Parâmetros:
+        consulta (str): Consulta já normalizada (ver normalizar_titulo), com as
+            palavras separadas por um espaço.
+        titulo (str): Título como gravado no banco.
+        minimo (float, opcional): Semelhança de interesse. Abaixo dela, o
+            valor devolvido é só um limite inferior (o cálculo é abreviado).
+
+    Retorno:
+        float: 1 para textos iguais; perto de 0 para textos sem relação.
+    """
+    palavras = _PALAVRA.findall(normalizar_titulo(titulo))
+    n = min(len(consulta.split()), len(palavras))
+    melhor = 0.0
+    for trecho in {' '.join(palavras[i:i + n]) for i in range(len(palavras) - n + 1)}:
+        tamanho = max(len(consulta), len(trecho))
+        # Distância acima da qual o trecho não supera o melhor nem o mínimo
+        maximo = int(tamanho * (1 - max(melhor, minimo)))
+        distancia = distancia_edicao(consulta, trecho, maximo)
+        if distancia <= maximo:
+            melhor = max(melhor, 1 - distancia / tamanho)
+    return melhor
+
+
+def expressao_fts(consulta, prefixo = True):
+    """
+    Converte o texto digitado em uma expressão MATCH do FTS5: cada palavra
+    vira uma frase entre aspas (sem operadores do FTS5) e todas precisam
+    aparecer no título. Com prefixo, a última palavra (com pelo menos
+    MIN_PREFIXO letras) também casa com as que começam por ela, como em
+    uma busca feita enquanto se digita ('poderoso che' encontra 'O
+    Poderoso Chefão').
+
+    Parâmetros:
+        consulta (str): Texto digitado.
+        prefixo (bool, opcional): Aceitar a última palavra incompleta.
+            Padrão: True.
+
+    Retorno:
+        str ou None: Expressão MATCH, ou None se a consulta não tem palavras.
+    """
+    palavras = _PALAVRA.findall(consulta)
+    if not palavras:
+        return None
+    frases = [f'"{palavra}"' for palavra in palavras]
+    # Uma letra só casaria com boa parte do vocabulário (e não tem índice de prefixo)
+    if prefixo and len(palavras[-1]) >= MIN_PREFIXO:
+        frases[-1] += '*'
+    return ' '.join(frases)
+
+
+def trigramas(consulta):
+    """
+    Trechos de 3 caracteres de cada palavra da consulta, sem acentos e em
+    minúsculas, como são guardados em titulos_trigrama.
+
+    Parâmetros:
+        consulta (str): Texto digitado.
+
+    Retorno:
+        list: Trechos sem repetição, na ordem em que aparecem.
+    """
+    trechos = {}
+    for palavra in _PALAVRA.findall(normalizar_titulo(consulta)):
+        for i in range(len(palavra) - 2):
+            trechos[palavra[i:i + 3]] = None
+    return list(trechos)
+
+
+def _filtro_tipo(tipo):
+    # Condição SQL sobre o rowid para limitar a busca a filmes ou séries
+    if tipo is None:
+        return ''
+    if tipo not in ORIGENS_TIPO:
+        raise ValueError(f"Tipo de título inválido: {tipo!r} (use 'movie' ou 'series')")
+    return f' AND rowid % 2 = {ORIGENS_TIPO[tipo]}'
+
+
+def _buscar_exato(conexao, consulta, limite, tipo, prefixo):
+    # Busca por palavras no índice titulos_fts, da maior para a menor relevância (bm25)
+    expressao = expressao_fts(consulta, prefixo)
+    if expressao is None:
+        return []
+    linhas = conexao.execute(text(
+        'SELECT rowid, bm25(titulos_fts) AS relevancia FROM titulos_fts '
+        f'WHERE titulos_fts MATCH :expressao{_filtro_tipo(tipo)} '
+        'ORDER BY relevancia LIMIT :limite'
+    ), {'expressao': expressao, 'limite': limite}).all()
+    # bm25 é negativo e menor para os mais relevantes
+    return [(rowid, -relevancia) for rowid, relevancia in linhas]
+
+
+def _candidatos_trigramas(conexao, palavras, tipo, conhecidas):
+    # Títulos com mais trechos de 3 letras raros em comum com as palavras (um
+    # erro de digitação estraga no máximo 3 trechos da palavra em que ocorre),
+    # entre os que têm todas as palavras conhecidas
+    trechos = trigramas(' '.join(palavras))
+    if not trechos:
+        return []
+    # Em quantos títulos aparece cada trecho (trechos ausentes do índice ficam de fora)
+    frequencias = dict(conexao.execute(
+        text('SELECT term, doc FROM titulos_trigrama_vocab WHERE term IN :trechos')
+        .bindparams(bindparam('trechos', expanding=True)),
+        {'trechos': trechos},
+    ).all())
+    raros = sorted(frequencias, key=frequencias.get)[:MAX_TRIGRAMAS]
+    if not raros:
+        return []
+    parametros = {'candidatos': MAX_CANDIDATOS,
+                  **{f't{i}': f'"{trecho}"' for i, trecho in enumerate(raros)}}
+    ocorrencias = ' UNION ALL '.join(
+        f'SELECT rowid FROM titulos_trigrama WHERE titulos_trigrama MATCH :t{i}{_filtro_tipo(tipo)}'
+        for i in range(len(raros))
+    )
+    filtro = ''
+    if conhecidas:
+        filtro = ' WHERE rowid IN (SELECT rowid FROM titulos_fts WHERE titulos_fts MATCH :conhecidas)'
+        parametros['conhecidas'] = expressao_fts(' '.join(conhecidas), prefixo=False)
+    return conexao.execute(text(
+        'SELECT c.rowid, t.title FROM ('
+        f'SELECT rowid, count(*) AS comuns FROM ({ocorrencias}){filtro} '
+        'GROUP BY rowid ORDER BY comuns DESC LIMIT :candidatos'
+        ') AS c JOIN titulos_trigrama AS t ON t.rowid = c.rowid'
+    ), parametros).all()
+
+
+def _buscar_aproximado(conexao, consulta, limite, tipo, min_similaridade):
+    # Busca tolerante a erros de digitação: escolhe até MAX_CANDIDATOS títulos
+    # parecidos com a consulta e os ordena pela distância de edição (ver
+    # similaridade)
+    palavras = _PALAVRA.findall(normalizar_titulo(consulta))
+    if not palavras:
+        return []
+    # As palavras com erro são as que não existem no índice de palavras
+    desconhecidas = [palavra for palavra in palavras if conexao.execute(text(
+        'SELECT rowid FROM titulos_fts WHERE titulos_fts MATCH :palavra LIMIT 1'
+    ), {'palavra': f'"{palavra}"'}).first() is None]
+    conhecidas = [palavra for palavra in palavras if palavra not in desconhecidas]
+
+    candidatos = []
+    if desconhecidas and conhecidas:
+        # Poucos títulos com todas as palavras conhecidas: são os candidatos
+        candidatos = conexao.execute(text(
+            'SELECT rowid, title FROM titulos_trigrama WHERE rowid IN ('
+            'SELECT rowid FROM titulos_fts WHERE titulos_fts MATCH :conhecidas'
+            f'{_filtro_tipo(tipo)} LIMIT :limite)'
+        ), {'conhecidas': expressao_fts(' '.join(conhecidas), prefixo=False),
+            'limite': MAX_CANDIDATOS + 1}).all()
+        if len(candidatos) > MAX_CANDIDATOS:
+            # Muitos: os trechos das palavras com erro escolhem entre eles
+            candidatos = _candidatos_trigramas(conexao, desconhecidas, tipo, conhecidas)
+    if not candidatos:
+        # Nenhuma palavra desconhecida (ou nenhum título com as conhecidas)
+        candidatos = _candidatos_trigramas(conexao, desconhecidas or palavras, tipo, [])
+
+    consulta = ' '.join(palavras)
+    pontuados = [(rowid, similaridade(consulta, titulo, min_similaridade)) for rowid, titulo in candidatos]
+    pontuados = [item for item in pontuados if item[1] >= min_similaridade]
+    pontuados.sort(key=lambda item: item[1], reverse=True)
+    return pontuados[:limite]
+
+
+@instrumentar('buscar_titulos')
+def buscar_titulos(consulta, db_url = "sqlite:///data/imdb.db", limite = 10, tipo = None,
+                   prefixo = True, aproximado = True, min_similaridade = 0.6):
+    """
+    Busca filmes e séries pelo título, nos índices FTS5 do banco (ver
+    database.criar_indice_busca), depois de aplicar a eles os títulos
+    gravados desde a última sincronização (ver
+    database.sincronizar_indice_busca).
+
+    A busca é por palavras, sem diferença de acentos e maiúsculas ('poderoso
+    chefao' encontra 'O Poderoso Chefão'), aceita a última palavra incompleta
+    e ordena pela relevância (bm25). Se nenhum título tem todas as palavras,
+    a busca aproximada procura os títulos mais parecidos com a consulta
+    (erros de digitação, como 'godfater'), pela distância de edição.
+
+    Parâmetros:
+        consulta (str): Texto digitado.
+        db_url (str, opcional): URL de conexão com o banco.
+            Padrão: 'sqlite:///data/imdb.db'.
+        limite (int, opcional): Máximo de resultados. Padrão: 10.
+        tipo (str, opcional): 'movie' ou 'series' para buscar só um tipo.
+        prefixo (bool, opcional): Aceitar a última palavra incompleta.
+            Padrão: True.
+        aproximado (bool, opcional): Usar a busca aproximada quando a
+            busca por palavras não encontra nada. Padrão: True.
+        min_similaridade (float, opcional): Semelhança mínima (0 a 1) dos
+            resultados aproximados (ver similaridade). Padrão: 0.6.
+
+    Retorno:
+        list: Um dicionário por título, do mais para o menos relevante, com
+            'tipo', 'id', 'title', 'year', 'pontuacao' (bm25 invertido ou
+            semelhança) e 'aproximado' (True se veio da busca aproximada).
+
+    Exceções:
+        ValueError: Se o tipo for inválido ou o banco não tiver os índices
+            de busca (bancos que não são SQLite, ou SQLite sem FTS5).
+    """
+    _filtro_tipo(tipo)  # tipo inválido falha antes de consultar o banco
+    engine = obter_engine(db_url)
+    # Títulos gravados fora das funções de gravação (ex.: direto no banco)
+    sincronizar_indice_busca(engine)
+    with engine.connect() as conexao:
+        if engine.dialect.name != 'sqlite' or conexao.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'titulos_fts'"
+        )).first() is None:
+            raise ValueError(f'O banco {db_url} não tem os índices de busca por título (SQLite com FTS5)')
+
+        encontrados, foi_aproximado = _buscar_exato(conexao, consulta, limite, tipo, prefixo), False
+        if not encontrados and aproximado:
+            encontrados = _buscar_aproximado(conexao, consulta, limite, tipo, min_similaridade)
+            foi_aproximado = True
+
+        # Título e ano vêm das tabelas de origem, pelo id codificado no rowid
+        ids_por_tipo = {}
+        for rowid, _ in encontrados:
+            tipo_titulo = 'series' if rowid % 2 == ORIGENS_TIPO['series'] else 'movie'
+            ids_por_tipo.setdefault(tipo_titulo, []).append(rowid // 2)
+        dados = {}
+        for tipo_titulo, ids in ids_por_tipo.items():
+            tabela = TABELAS_TIPO[tipo_titulo]
+            for id_titulo, titulo, ano in conexao.execute(
+                select(tabela.c.id, tabela.c.title, tabela.c.year).where(tabela.c.id.in_(ids))
+            ):
+                dados[tipo_titulo, id_titulo] = (titulo, ano)
+
+    resultados = []
+    for rowid, pontuacao in encontrados:
+        tipo_titulo = 'series' if rowid % 2 == ORIGENS_TIPO['series'] else 'movie'
+        titulo, ano = dados[tipo_titulo, rowid // 2]
+        resultados.append({
+            'tipo': tipo_titulo, 'id': rowid // 2, 'title': titulo, 'year': ano,
+            'pontuacao': pontuacao, 'aproximado': foi_aproximado,
+        })
+    registrar(linhas=len(resultados))
+    return resultados
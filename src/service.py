@@ -0,0 +1,564 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+import pandas as pd
+from sqlalchemy import create_engine, event, or_, select
+from sqlalchemy.pool import QueuePool
+
+from .analysis import montar_consulta, resumo_das_contagens
+from .database import MovieDB, MovieResumoDB, SeriesDB
+
+
+# Tabelas servidas pelas rotas /movies e /series
+TABELAS_SERVICO = {'movies': MovieDB.__table__, 'series': SeriesDB.__table__}
+
+# PRAGMAs das conexões de leitura (as de gravação, como o WAL, ficam com
+# quem escreve no banco; ver database.PRAGMAS_SQLITE)
+PRAGMAS_LEITURA = {
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+
+# Filtros aceitos nas listas: nome na URL -> (parâmetro de montar_consulta, conversão)
+FILTROS_LISTA = {
+    'nota_min': ('nota_min', float),
+    'nota_max': ('nota_max', float),
+    'ano_min': ('ano_min', int),
+    'ano_max': ('ano_max', int),
+    'titulo': ('prefixo_titulo', str),
+    'ordem': ('ordenar_por', lambda valor: [nome for nome in valor.split(',') if nome]),
+    'limite': ('limite', int),
+    'deslocamento': ('deslocamento', int),
+}
+
+# Linhas por página das listas (padrão e máximo aceito em 'limite')
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+# Respostas menores que isto não são comprimidas (o gzip não compensa)
+MIN_GZIP = 1024
+
+# Conexões sem requisição por mais que isto (segundos) são fechadas
+TEMPO_OCIOSO = 15
+
+# Máximo de cabeçalhos aceitos em uma requisição
+MAX_CABECALHOS = 100
+
+
+class CacheResultados:
+    """
+    Cache LRU das respostas já montadas (JSON, JSON em gzip e ETag),
+    descartado inteiro quando o banco muda (ver versao_banco).
+
+    Atributos:
+        capacidade (int): Máximo de respostas guardadas.
+        tamanho_max_bytes (int): Máximo de bytes guardados (corpo + gzip).
+        versao (tuple ou None): Versão do banco das respostas guardadas.
+        invalidacoes (int): Vezes em que o cache foi descartado porque o
+            banco mudou.
+    """
+    def __init__(self, capacidade = 256, tamanho_max_mb = 64):
+        self.capacidade = capacidade
+        self.tamanho_max_bytes = int(tamanho_max_mb * 1024 * 1024)
+        self.versao = None
+        self.invalidacoes = 0
+        self._entradas = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def validar(self, versao):
+        """
+        Descarta as respostas guardadas se a versão do banco mudou.
+        """
+        if versao != self.versao:
+            if self._entradas:
+                self.invalidacoes += 1
+            self._entradas.clear()
+            self._bytes = 0
+            self.versao = versao
+
+    def obter(self, chave):
+        entrada = self._entradas.get(chave)
+        if entrada is not None:
+            self._entradas.move_to_end(chave)
+        return entrada
+
+    def guardar(self, chave, entrada, versao):
+        """
+        Guarda uma resposta montada com o banco na versão 'versao'
+        (respostas de uma versão que já não é a atual são ignoradas).
+        """
+        if versao != self.versao or chave in self._entradas:
+            return
+        self._entradas[chave] = entrada
+        self._bytes += entrada['bytes']
+        while self._entradas and (len(self._entradas) > self.capacidade
+                                  or self._bytes > self.tamanho_max_bytes):
+            _, removida = self._entradas.popitem(last=False)
+            self._bytes -= removida['bytes']
+
+
+def versao_banco(caminho):
+    """
+    Identifica o estado atual do arquivo do banco SQLite pela data de
+    modificação e pelo tamanho do arquivo e do seu WAL ('-wal'), que
+    mudam a cada gravação confirmada. Um checkpoint do WAL também muda
+    a versão (sem mudar os dados): no pior caso, o cache é descartado
+    sem necessidade.
+
+    Parâmetros:
+        caminho (str): Caminho do arquivo do banco.
+
+    Retorno:
+        tuple: Versão do banco (comparável com ==).
+    """
+    versao = []
+    for arquivo in (caminho, caminho + '-wal'):
+        try:
+            estado = os.stat(arquivo)
+        except FileNotFoundError:
+            versao.append(None)
+        else:
+            versao.append((estado.st_mtime_ns, estado.st_size))
+    return tuple(versao)
+
+
+def aplicar_pragmas_leitura(conexao_dbapi, registro_conexao):
+    # Evento 'connect' das conexões de leitura (ver PRAGMAS_LEITURA)
+    cursor = conexao_dbapi.cursor()
+    for nome, valor in PRAGMAS_LEITURA.items():
+        cursor.execute(f'PRAGMA {nome} = {valor}')
+    cursor.close()
+
+
+def criar_engine_leitura(caminho, conexoes = 4):
+    """
+    Cria uma engine somente leitura ('mode=ro') para o banco SQLite, com
+    um pool de no máximo 'conexoes' conexões (sem conexões extras).
+
+    Parâmetros:
+        caminho (str): Caminho do arquivo do banco.
+        conexoes (int, opcional): Tamanho do pool. Padrão: 4.
+
+    Retorno:
+        sqlalchemy.Engine: Engine de leitura.
+
+    Exceções:
+        FileNotFoundError: Se o banco não existir (o modo somente leitura
+        não cria o arquivo).
+    """
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f'Banco não encontrado: {caminho}')
+    engine = create_engine(
+        f'sqlite:///file:{os.path.abspath(caminho)}?mode=ro&uri=true',
+        poolclass=QueuePool,
+        pool_size=conexoes,
+        max_overflow=0,
+    )
+    event.listen(engine, 'connect', aplicar_pragmas_leitura)
+    return engine
+
+
+def serializar(valor):
+    # Valores que o json não converte sozinho (datas das colunas *_at)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f'Valor não serializável: {valor!r}')
+
+
+def montar_entrada(dados):
+    """
+    Converte o resultado de uma consulta na resposta guardada no cache:
+    JSON compacto, a versão em gzip (se compensar) e o ETag.
+
+    Parâmetros:
+        dados (dict ou list): Resultado da consulta.
+
+    Retorno:
+        dict: {'corpo', 'corpo_gzip' (ou None), 'etag', 'bytes'}.
+    """
+    corpo = json.dumps(dados, ensure_ascii=False, separators=(',', ':'), default=serializar).encode('utf-8')
+    corpo_gzip = gzip.compress(corpo, compresslevel=6) if len(corpo) >= MIN_GZIP else None
+    # ETag fraco: o mesmo conteúdo vale com ou sem gzip
+    etag = 'W/"' + hashlib.sha1(corpo).hexdigest()[:20] + '"'
+    return {
+        'corpo': corpo,
+        'corpo_gzip': corpo_gzip,
+        'etag': etag,
+        'bytes': len(corpo) + len(corpo_gzip or b''),
+    }
+
+
+def aceita_gzip(accept_encoding):
+    # 'gzip' (ou '*') no Accept-Encoding, sem 'q=0'
+    for item in accept_encoding.split(','):
+        codificacao, _, parametros = item.strip().partition(';')
+        if codificacao.strip().lower() in ('gzip', '*'):
+            parametros = parametros.replace(' ', '')
+            return parametros not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def etag_confere(if_none_match, etag):
+    # If-None-Match aceita uma lista de ETags (fracos ou não) ou '*'
+    if if_none_match.strip() == '*':
+        return True
+    sem_prefixo = etag[2:]
+    return any(candidato.strip().removeprefix('W/') == sem_prefixo
+               for candidato in if_none_match.split(','))
+
+
+class ServicoCatalogo:
+    """
+    Serviço HTTP (asyncio) somente leitura com os dados do banco:
+
+        GET /movies e /series: lista filtrada e paginada (filtros: nota_min,
+            nota_max, ano_min, ano_max, titulo (início do título), ordem
+            (ex.: '-rating,id'), limite (até LIMITE_MAXIMO) e deslocamento);
+        GET /movies/<id> e /series/<id>: um título, pelo id ou pelo
+            identificador do IMDb (ex.: /movies/tt0111161);
+        GET /resumo: quantidade de filmes por categoria e ano (Ex. 10),
+            lida de 'movies_resumo';
+        GET /saude: estado do serviço e contadores do cache.
+
+    As consultas rodam em um pool de threads do tamanho do pool de
+    conexões de leitura, de modo que no máximo 'conexoes' consultas usam
+    o banco ao mesmo tempo; o laço do asyncio só lê e escreve nas conexões
+    HTTP. As respostas ficam em um cache LRU, descartado quando o arquivo
+    do banco muda; a mesma consulta pedida por vários clientes ao mesmo
+    tempo roda uma vez só. Respostas levam ETag (com 304 para
+    'If-None-Match') e vão em gzip quando o cliente aceita.
+
+    Atributos:
+        caminho_banco (str): Caminho do arquivo do banco SQLite.
+        faixas (dict ou None): Faixas das categorias do resumo (ver
+            analysis.validar_faixas).
+        cache (CacheResultados): Respostas já montadas.
+        estatisticas (dict): Contadores 'requisicoes', 'acertos_cache',
+            'faltas_cache', 'nao_modificadas' e 'erros'.
+    """
+    def __init__(self, caminho_banco = 'data/imdb.db', conexoes = 4, tamanho_cache = 256,
+                 tamanho_cache_mb = 64, faixas = None):
+        self.caminho_banco = caminho_banco
+        self.faixas = faixas
+        self.engine = criar_engine_leitura(caminho_banco, conexoes)
+        self.cache = CacheResultados(tamanho_cache, tamanho_cache_mb)
+        self.estatisticas = {'requisicoes': 0, 'acertos_cache': 0, 'faltas_cache': 0,
+                             'nao_modificadas': 0, 'erros': 0}
+        self._executor = ThreadPoolExecutor(max_workers=conexoes, thread_name_prefix='leitura')
+        self._pendentes = {}  # (versão, chave) -> consulta em andamento
+
+    # Consultas (rodam nas threads do pool)
+
+    def _consultar(self, consulta):
+        with self.engine.connect() as conexao:
+            return [dict(linha._mapping) for linha in conexao.execute(consulta)]
+
+    def listar(self, nome_tabela, parametros):
+        """
+        Lista os títulos de uma tabela com os filtros da URL.
+
+        Exceções:
+            ValueError: Filtro desconhecido ou com valor inválido.
+        """
+        argumentos = {'limite': LIMITE_PADRAO, 'ordenar_por': ['id']}
+        for nome, valor in parametros.items():
+            if nome not in FILTROS_LISTA:
+                raise ValueError(f'Filtro desconhecido: "{nome}"')
+            destino, converter = FILTROS_LISTA[nome]
+            try:
+                argumentos[destino] = converter(valor)
+            except ValueError:
+                raise ValueError(f'Valor inválido para "{nome}": "{valor}"') from None
+        if not 0 < argumentos['limite'] <= LIMITE_MAXIMO:
+            raise ValueError(f'"limite" deve estar entre 1 e {LIMITE_MAXIMO}')
+        if argumentos.get('deslocamento', 0) < 0:
+            raise ValueError('"deslocamento" não pode ser negativo')
+
+        itens = self._consultar(montar_consulta(TABELAS_SERVICO[nome_tabela], **argumentos))
+        return {'itens': itens, 'limite': argumentos['limite'],
+                'deslocamento': argumentos.get('deslocamento', 0)}
+
+    def buscar(self, nome_tabela, identificador):
+        """
+        Devolve um título pelo id ou pelo identificador do IMDb.
+
+        Exceções:
+            LookupError: Se o título não existir.
+        """
+        tabela = TABELAS_SERVICO[nome_tabela]
+        condicao = tabela.c.imdb_id == identificador
+        if identificador.isdigit():
+            condicao = or_(tabela.c.id == int(identificador), condicao)
+        linhas = self._consultar(select(tabela).where(condicao).order_by(tabela.c.id).limit(1))
+        if not linhas:
+            raise LookupError(f'Título não encontrado em "{nome_tabela}": {identificador}')
+        return linhas[0]
+
+    def resumo(self):
+        """
+        Resumo de filmes por categoria e ano (ver analysis.resumo_das_contagens).
+        """
+        with self.engine.connect() as conexao:
+            contagens = pd.read_sql(select(MovieResumoDB.__table__), con=conexao)
+        tabela = resumo_das_contagens(contagens, self.faixas)
+        return {
+            'categorias': [str(categoria) for categoria in tabela.index],
+            'anos': [int(ano) for ano in tabela.columns],
+            'quantidades': tabela.to_numpy().tolist(),
+        }
+
+    def _executar_rota(self, partes, parametros):
+        # Resolve a rota e devolve a resposta montada (na thread do pool)
+        if len(partes) == 1 and partes[0] == 'resumo' and not parametros:
+            return montar_entrada(self.resumo())
+        if partes and partes[0] in TABELAS_SERVICO:
+            if len(partes) == 1:
+                return montar_entrada(self.listar(partes[0], parametros))
+            if len(partes) == 2 and not parametros:
+                return montar_entrada(self.buscar(partes[0], partes[1]))
+        raise FileNotFoundError('Rota desconhecida')
+
+    # Cache e HTTP (no laço do asyncio)
+
+    async def obter_resposta(self, caminho, parametros):
+        """
+        Devolve a resposta de uma rota, do cache ou consultando o banco.
+
+        Parâmetros:
+            caminho (str): Caminho da URL (ex.: '/movies').
+            parametros (dict): Parâmetros da query string.
+
+        Retorno:
+            dict: Resposta montada (ver montar_entrada).
+        """
+        versao = versao_banco(self.caminho_banco)
+        self.cache.validar(versao)
+        chave = (caminho, tuple(sorted(parametros.items())))
+        entrada = self.cache.obter(chave)
+        if entrada is not None:
+            self.estatisticas['acertos_cache'] += 1
+            return entrada
+
+        pendente = self._pendentes.get((versao, chave))
+        if pendente is None:
+            self.estatisticas['faltas_cache'] += 1
+            partes = [parte for parte in caminho.split('/') if parte]
+            pendente = asyncio.get_running_loop().run_in_executor(
+                self._executor, self._executar_rota, partes, parametros
+            )
+            self._pendentes[(versao, chave)] = pendente
+            pendente.add_done_callback(lambda futuro: self._concluir(versao, chave, futuro))
+        # shield: um cliente que desconecta não cancela a consulta dos demais
+        return await asyncio.shield(pendente)
+
+    def _concluir(self, versao, chave, futuro):
+        self._pendentes.pop((versao, chave), None)
+        if not futuro.cancelled() and futuro.exception() is None:
+            self.cache.guardar(chave, futuro.result(), versao)
+
+    def saude(self):
+        return {
+            'situacao': 'ok',
+            'banco': self.caminho_banco,
+            'respostas_em_cache': len(self.cache),
+            'invalidacoes_cache': self.cache.invalidacoes,
+            **self.estatisticas,
+        }
+
+    async def responder(self, metodo, alvo, cabecalhos):
+        """
+        Atende uma requisição já lida.
+
+        Retorno:
+            tuple: (status, cabeçalhos da resposta, corpo).
+        """
+        self.estatisticas['requisicoes'] += 1
+        if metodo not in ('GET', 'HEAD'):
+            return self._erro(HTTPStatus.METHOD_NOT_ALLOWED, 'Apenas GET e HEAD', {'Allow': 'GET, HEAD'})
+
+        url = urlsplit(alvo)
+        caminho = '/' + url.path.strip('/')
+        try:
+            parametros = dict(parse_qsl(url.query, strict_parsing=bool(url.query)))
+        except ValueError:
+            return self._erro(HTTPStatus.BAD_REQUEST, 'Query string inválida')
+
+        if caminho == '/saude':
+            entrada = montar_entrada(self.saude())
+        else:
+            try:
+                entrada = await self.obter_resposta(caminho, parametros)
+            except ValueError as erro:
+                return self._erro(HTTPStatus.BAD_REQUEST, str(erro))
+            except (LookupError, FileNotFoundError) as erro:
+                return self._erro(HTTPStatus.NOT_FOUND, str(erro))
+            except Exception as erro:
+                return self._erro(HTTPStatus.INTERNAL_SERVER_ERROR, f'{type(erro).__name__}: {erro}')
+
+        extras = {'ETag': entrada['etag'], 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if_none_match = cabecalhos.get('if-none-match')
+        if if_none_match is not None and etag_confere(if_none_match, entrada['etag']):
+            self.estatisticas['nao_modificadas'] += 1
+            return HTTPStatus.NOT_MODIFIED, extras, b''
+
+        corpo = entrada['corpo']
+        if entrada['corpo_gzip'] is not None and aceita_gzip(cabecalhos.get('accept-encoding', '')):
+            corpo = entrada['corpo_gzip']
+            extras['Content-Encoding'] = 'gzip'
+        extras['Content-Type'] = 'application/json; charset=utf-8'
+        return HTTPStatus.OK, extras, corpo
+
+    def _erro(self, status, mensagem, extras = None):
+        self.estatisticas['erros'] += 1
+        corpo = json.dumps({'erro': mensagem}, ensure_ascii=False).encode('utf-8')
+        return status, {'Content-Type': 'application/json; charset=utf-8', **(extras or {})}, corpo
+
+    async def tratar_conexao(self, leitor, escritor):
+        """
+        Atende as requisições de uma conexão HTTP/1.1 (com keep-alive),
+        uma de cada vez, até o cliente fechar a conexão ou ficar
+        TEMPO_OCIOSO segundos sem enviar nada.
+        """
+        try:
+            while True:
+                try:
+                    linha = await asyncio.wait_for(leitor.readline(), TEMPO_OCIOSO)
+                except asyncio.TimeoutError:
+                    break
+                if not linha.strip():
+                    if not linha:
+                        break
+                    continue  # linhas vazias entre requisições são toleradas
+
+                partes = linha.decode('latin-1').split()
+                cabecalhos = {}
+                while True:
+                    linha = await leitor.readline()
+                    if linha in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = linha.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                    if len(cabecalhos) > MAX_CABECALHOS:
+                        break
+
+                if len(partes) != 3 or not partes[2].startswith('HTTP/') or len(cabecalhos) > MAX_CABECALHOS:
+                    status, extras, corpo = self._erro(HTTPStatus.BAD_REQUEST, 'Requisição inválida')
+                    manter = False
+                    metodo = 'GET'
+                else:
+                    metodo, alvo, versao = partes
+                    # Corpo da requisição (não usado) é descartado para ler a próxima
+                    tamanho = int(cabecalhos.get('content-length') or 0)
+                    if tamanho:
+                        await leitor.readexactly(tamanho)
+                    conexao = cabecalhos.get('connection', '').lower()
+                    manter = conexao != 'close' if versao == 'HTTP/1.1' else conexao == 'keep-alive'
+                    status, extras, corpo = await self.responder(metodo, alvo, cabecalhos)
+
+                cabecalho = [f'HTTP/1.1 {status.value} {status.phrase}']
+                cabecalho += [f'{nome}: {valor}' for nome, valor in extras.items()]
+                cabecalho.append(f'Content-Length: {len(corpo)}')
+                cabecalho.append('Connection: ' + ('keep-alive' if manter else 'close'))
+                escritor.write(('\r\n'.join(cabecalho) + '\r\n\r\n').encode('latin-1'))
+                if metodo != 'HEAD':
+                    escritor.write(corpo)
+                await escritor.drain()
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Cliente desconectou no meio, ou linha grande demais
+            pass
+        finally:
+            escritor.close()
+
+    async def iniciar(self, host = '127.0.0.1', porta = 8080):
+        """
+        Abre o servidor na porta informada (0: uma porta livre qualquer).
+
+        Retorno:
+            asyncio.Server: Servidor já aceitando conexões.
+        """
+        return await asyncio.start_server(self.tratar_conexao, host, porta)
+
+    def fechar(self):
+        """
+        Encerra o pool de threads e fecha as conexões com o banco.
+        """
+        self._executor.shutdown(wait=True)
+        self.engine.dispose()
+
+
+async def servir(servico, host = '127.0.0.1', porta = 8080):
+    """
+    Atende requisições até o processo ser interrompido.
+    """
+    servidor = await servico.iniciar(host, porta)
+    endereco = servidor.sockets[0].getsockname()
+    print(f'Serviço do catálogo em http://{endereco[0]}:{endereco[1]} '
+          f'(banco: {servico.caminho_banco}) - Ctrl+C para encerrar', flush=True)
+    async with servidor:
+        await servidor.serve_forever()
+
+
+def main(argv = None):
+    """
+    Sobe o serviço do catálogo com as opções da seção 'servico' do
+    config.json (banco, host, porta, conexoes, tamanho_cache,
+    tamanho_cache_mb) e as faixas de 'categorias'; os argumentos da linha
+    de comando têm prioridade.
+
+    Execução (na pasta raiz do projeto):
+        python -m src.service [--config config.json] [--banco data/imdb.db] [--porta 8080]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m src.service',
+                                     description='Serviço HTTP somente leitura do catálogo do IMDb.')
+    parser.add_argument('--config', default='config.json',
+                        help='arquivo de configuração (padrão: config.json; opcional)')
+    parser.add_argument('--banco', help='arquivo do banco SQLite (padrão: data/imdb.db)')
+    parser.add_argument('--host', help='endereço de escuta (padrão: 127.0.0.1)')
+    parser.add_argument('--porta', type=int, help='porta (padrão: 8080)')
+    parser.add_argument('--conexoes', type=int, help='conexões de leitura com o banco (padrão: 4)')
+    argumentos = parser.parse_args(argv)
+
+    config = {}
+    if os.path.exists(argumentos.config):
+        from src.main import carregar_config
+        config = carregar_config(argumentos.config)
+    config_servico = config.get('servico', {})
+
+    servico = ServicoCatalogo(
+        caminho_banco=argumentos.banco or config_servico.get('banco', 'data/imdb.db'),
+        conexoes=argumentos.conexoes or config_servico.get('conexoes', 4),
+        tamanho_cache=config_servico.get('tamanho_cache', 256),
+        tamanho_cache_mb=config_servico.get('tamanho_cache_mb', 64),
+        faixas=config.get('categorias'),
+    )
+    try:
+        asyncio.run(servir(
+            servico,
+            host=argumentos.host or config_servico.get('host', '127.0.0.1'),
+            porta=argumentos.porta if argumentos.porta is not None else config_servico.get('porta', 8080),
+        ))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servico.fechar()
+
+
+if __name__ == '__main__':
+    main()
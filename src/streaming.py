@@ -0,0 +1,134 @@
+"""
+Ligação entre etapas em streaming: cada etapa é um gerador, e em_fila
+roda um gerador em outra thread, entregando os valores por uma fila
+limitada. Com as etapas ligadas assim (ex.: extração das páginas ->
+catálogo -> gravação no banco), a extração da próxima página acontece
+enquanto a anterior é gravada, e a memória depende do tamanho das filas,
+e não do tamanho do catálogo: quando a gravação fica para trás, a fila
+enche e a extração espera (contrapressão).
+"""
+import queue
+import threading
+import time
+
+from .metrics import em_contexto
+
+# Marcador de fim do gerador na fila
+_FIM = object()
+
+
+class _Falha:
+    # Exceção do gerador, levada pela fila até a thread que consome
+    def __init__(self, erro):
+        self.erro = erro
+
+
+def agrupar(itens, tamanho):
+    """
+    Agrupa os valores de um iterável em listas de até 'tamanho' itens,
+    de modo que a fila passe um bloco por vez, e não um valor por vez.
+
+    Parâmetros:
+        itens (iterable): Valores a agrupar.
+        tamanho (int): Quantidade máxima de valores por bloco.
+
+    Retorno:
+        generator: Listas com os valores, na ordem original.
+    """
+    bloco = []
+    for item in itens:
+        bloco.append(item)
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def em_fila(itens, tamanho_fila = 4, estatisticas = None):
+    """
+    Percorre 'itens' (em geral, um gerador) em uma thread própria e
+    entrega os valores, na mesma ordem, por uma fila com no máximo
+    'tamanho_fila' valores prontos.
+
+    A thread produtora fica no máximo 'tamanho_fila' valores à frente de
+    quem consome: com a fila cheia, ela espera (contrapressão). Uma
+    exceção do gerador é lançada de novo na thread que consome. Se o
+    consumo for interrompido (ex.: exceção ou break), a produção para e
+    'itens' é fechado, o que também encerra um em_fila anterior na cadeia.
+
+    Parâmetros:
+        itens (iterable): Valores a produzir na outra thread.
+        tamanho_fila (int, opcional): Valores prontos guardados na fila.
+            Padrão: 4.
+        estatisticas (dict, opcional): Se informado, recebe 'itens'
+            (valores entregues), 'max_na_fila' (maior ocupação da fila),
+            'espera_produtor' (segundos com a fila cheia, ou seja, com a
+            produção à frente do consumo) e 'espera_consumidor' (segundos
+            com a fila vazia).
+
+    A produção conta para as medições abertas quando em_fila é chamada
+    (ver metrics.em_contexto), mesmo que o consumo comece dentro de outra
+    medição (ex.: a gravação que consome a fila).
+
+    Retorno:
+        generator: Os valores de 'itens'.
+    """
+    return _consumir_fila(itens, tamanho_fila, estatisticas, em_contexto(_chamar))
+
+
+def _chamar(funcao):
+    return funcao()
+
+
+def _consumir_fila(itens, tamanho_fila, estatisticas, executar):
+    # Corpo de em_fila: a thread produtora só começa no primeiro next()
+    fila = queue.Queue(maxsize=max(1, tamanho_fila))
+    parar = threading.Event()
+    if estatisticas is None:
+        estatisticas = {}
+    for chave in ('itens', 'max_na_fila', 'espera_produtor', 'espera_consumidor'):
+        estatisticas.setdefault(chave, 0)
+
+    def colocar(item):
+        # Espera por espaço na fila, desistindo se o consumo for interrompido
+        inicio = time.perf_counter()
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            estatisticas['espera_produtor'] += time.perf_counter() - inicio
+            estatisticas['max_na_fila'] = max(estatisticas['max_na_fila'], fila.qsize())
+            return True
+        return False
+
+    def produzir():
+        try:
+            for item in itens:
+                if not colocar(item):
+                    return
+            colocar(_FIM)
+        except BaseException as erro:
+            colocar(_Falha(erro))
+        finally:
+            fechar = getattr(itens, 'close', None)
+            if fechar is not None:
+                fechar()
+
+    produtor = threading.Thread(target=executar, args=(produzir,), name='em_fila', daemon=True)
+    produtor.start()
+    try:
+        while True:
+            inicio = time.perf_counter()
+            item = fila.get()
+            estatisticas['espera_consumidor'] += time.perf_counter() - inicio
+            if item is _FIM:
+                return
+            if isinstance(item, _Falha):
+                raise item.erro
+            estatisticas['itens'] += 1
+            yield item
+    finally:
+        parar.set()
+        produtor.join()
@@ -0,0 +1,97 @@
+"""
+Confere as leituras em blocos de src/analysis.py (carregar_movies_em_blocos,
+resumo_categoria_ano_em_blocos e melhores_movies_em_blocos) com os
+resultados calculados com a tabela 'movies' inteira, para vários
+tamanhos de bloco.
+
+Execução (na pasta raiz do projeto):
+    python -m pytest -q tests/test_em_blocos.py
+"""
+import pandas as pd
+import pytest
+
+from src.analysis import (
+    TIPOS_COMPACTOS,
+    adicionar_categoria,
+    carregar_dataframe_movies,
+    carregar_movies_em_blocos,
+    compactar_tipos,
+    consultar_movies,
+    melhores_movies_em_blocos,
+    resumo_categoria_ano,
+    resumo_categoria_ano_em_blocos,
+)
+from src.database import criar_engine, criar_tabelas, descartar_engines, salvar_catalogo_em_lote
+from src.models import Catalog
+
+FAIXAS_PERSONALIZADAS = {'limites': [5.0, 8.5], 'rotulos': ['Fraco', 'Regular', 'Ótimo']}
+
+TAMANHOS_BLOCO = [1, 3, 7, 1000]
+
+# Notas com empates, notas nos limites das faixas, filmes sem nota e sem ano
+NOTAS = [9.3, 9.0, 9.1, 8.0, 9.3, 7.0, None, 8.5, 9.1, 6.2, 5.0, 9.3, 7.9, 8.9, 9.0, 4.4]
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    db_url = f'sqlite:///{tmp_path / "blocos.db"}'
+    engine = criar_engine(db_url)
+    criar_tabelas(engine)
+    catalog = Catalog()
+    for i in range(40):
+        ano = None if i % 11 == 0 else 1990 + i % 5
+        catalog.adicionar_movie(f'Filme {i:02d}', ano, NOTAS[i % len(NOTAS)])
+    salvar_catalogo_em_lote(catalog, engine)
+    yield db_url
+    descartar_engines()
+
+
+@pytest.mark.parametrize('tamanho_bloco', TAMANHOS_BLOCO)
+def test_carregar_movies_em_blocos(db_url, tamanho_bloco):
+    blocos = list(carregar_movies_em_blocos(db_url, tamanho_bloco))
+    assert all(len(bloco) <= tamanho_bloco for bloco in blocos)
+    em_blocos = pd.concat(blocos, ignore_index=True).drop(columns='updated_at')
+
+    df_movies = carregar_dataframe_movies(db_url).sort_values('id', ignore_index=True)
+    tipos = {nome: tipo for nome, tipo in TIPOS_COMPACTOS.items()
+             if nome in df_movies.columns and tipo != 'category'}
+    pd.testing.assert_frame_equal(em_blocos, df_movies.astype(tipos).drop(columns='updated_at'))
+
+
+@pytest.mark.parametrize('tamanho_bloco', TAMANHOS_BLOCO)
+@pytest.mark.parametrize('faixas', [None, FAIXAS_PERSONALIZADAS])
+def test_resumo_categoria_ano_em_blocos(db_url, tamanho_bloco, faixas):
+    em_blocos = resumo_categoria_ano_em_blocos(db_url, faixas, tamanho_bloco)
+    df_movies = compactar_tipos(carregar_dataframe_movies(db_url))
+    pd.testing.assert_frame_equal(em_blocos, resumo_categoria_ano(adicionar_categoria(df_movies, faixas)))
+
+
+@pytest.mark.parametrize('tamanho_bloco', TAMANHOS_BLOCO)
+@pytest.mark.parametrize('n, nota_min, inclusiva', [
+    (5, 9.0, False),
+    (5, 9.0, True),
+    (3, None, True),
+    (10, 8.0, True),
+    (100, 8.5, False),
+])
+def test_melhores_movies_em_blocos(db_url, tamanho_bloco, n, nota_min, inclusiva):
+    em_blocos = melhores_movies_em_blocos(db_url, n=n, nota_min=nota_min,
+                                          nota_min_inclusiva=inclusiva, tamanho_bloco=tamanho_bloco)
+    no_banco = consultar_movies(db_url, nota_min=nota_min, nota_min_inclusiva=inclusiva,
+                                ordenar_por=['-rating', 'id'], limite=n)
+    colunas = ['id', 'title', 'year', 'rating']
+    pd.testing.assert_frame_equal(em_blocos[colunas], no_banco[colunas], check_dtype=False)
+
+
+def test_tabela_vazia(tmp_path):
+    db_url = f'sqlite:///{tmp_path / "vazio.db"}'
+    criar_tabelas(criar_engine(db_url))
+    try:
+        assert all(bloco.empty for bloco in carregar_movies_em_blocos(db_url, 3))
+        assert melhores_movies_em_blocos(db_url, tamanho_bloco=3).empty
+        pd.testing.assert_frame_equal(
+            resumo_categoria_ano_em_blocos(db_url, tamanho_bloco=3),
+            resumo_categoria_ano(adicionar_categoria(compactar_tipos(carregar_dataframe_movies(db_url)))),
+        )
+    finally:
+        descartar_engines()
@@ -0,0 +1,119 @@
+"""
+Confere a exportação incremental (exporting.exportar_incremental) com a
+marca d'água em 'seq', numerada pelos gatilhos de
+database.gatilhos_sequencia na ordem dos commits.
+
+Execução (na pasta raiz do projeto):
+    python -m pytest -q tests/test_exportacao_incremental.py
+"""
+import json
+import os
+
+import pytest
+from sqlalchemy import text
+
+from src.database import (
+    criar_engine,
+    criar_sequencia_alteracoes,
+    criar_tabelas,
+    descartar_engines,
+    gatilhos_sequencia,
+    salvar_catalogo_em_lote,
+)
+from src.exporting import NOME_MANIFESTO, exportar_incremental
+from src.models import Catalog
+
+
+@pytest.fixture
+def banco(tmp_path):
+    engine = criar_engine(f'sqlite:///{tmp_path / "incremental.db"}')
+    criar_tabelas(engine)
+    yield engine
+    descartar_engines()
+
+
+def catalogo(*filmes):
+    catalog = Catalog()
+    for titulo, ano, nota in filmes:
+        catalog.adicionar_movie(titulo, ano, nota)
+    return catalog
+
+
+def exportar(engine, pasta):
+    return {resultado['tabela']: resultado for resultado in exportar_incremental(engine, str(pasta))}
+
+
+def linhas_exportadas(pasta, tabela = 'movies'):
+    with open(os.path.join(pasta, NOME_MANIFESTO), encoding='utf-8') as arquivo:
+        estado = json.load(arquivo)['tabelas'][tabela]
+    with open(os.path.join(pasta, estado['arquivo']), encoding='utf-8') as arquivo:
+        return [json.loads(linha) for linha in arquivo]
+
+
+def sequencias(engine, tabela = 'movies'):
+    with engine.connect() as conexao:
+        return dict(conexao.execute(text(f'SELECT title, seq FROM {tabela}')).all())
+
+
+def test_gravacoes_recebem_seq_crescente(banco):
+    salvar_catalogo_em_lote(catalogo(('Filme A', 1994, 9.3), ('Filme B', 2008, 8.0)), banco)
+    antes = sequencias(banco)
+    salvar_catalogo_em_lote(catalogo(('Filme B', 2008, 8.5)), banco, atualizar=True)
+    depois = sequencias(banco)
+    assert sorted(antes.values()) == [1, 2]
+    assert depois['Filme A'] == antes['Filme A']
+    assert depois['Filme B'] > max(antes.values())
+
+
+def test_alteracao_com_hora_anterior_a_marca(banco, tmp_path):
+    pasta = tmp_path / 'incremental'
+    salvar_catalogo_em_lote(catalogo(('Filme A', 1994, 9.3), ('Filme B', 2008, 8.0)), banco)
+    assert exportar(banco, pasta)['movies']['tipo'] == 'completo'
+
+    # Transação que tomou a hora antes da exportação e só confirmou depois
+    with banco.begin() as conexao:
+        conexao.execute(text(
+            "UPDATE movies SET rating = 7.0, updated_at = '2000-01-01 00:00:00' WHERE title = 'Filme A'"
+        ))
+    resultado = exportar(banco, pasta)['movies']
+    assert resultado['tipo'] == 'incremental'
+    assert resultado['linhas'] == 1
+    assert linhas_exportadas(pasta)[-1]['rating'] == 7.0
+
+    # Sem mudanças, nada é escrito
+    assert exportar(banco, pasta)['movies']['tipo'] is None
+
+
+def test_manifesto_antigo_recomeca_com_snapshot(banco, tmp_path):
+    pasta = tmp_path / 'incremental'
+    salvar_catalogo_em_lote(catalogo(('Filme A', 1994, 9.3)), banco)
+    exportar(banco, pasta)
+    caminho = os.path.join(pasta, NOME_MANIFESTO)
+    with open(caminho, encoding='utf-8') as arquivo:
+        manifesto = json.load(arquivo)
+    manifesto['versao'] = 1
+    manifesto['tabelas']['movies']['marca'] = '2024-01-01T00:00:00'
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo)
+
+    resultado = exportar(banco, pasta)['movies']
+    assert resultado['tipo'] == 'completo'
+    assert len(linhas_exportadas(pasta)) == 1
+
+
+def test_preenchimento_de_banco_existente(banco):
+    # Banco de uma versão anterior: títulos gravados sem os gatilhos nem 'seq'
+    with banco.begin() as conexao:
+        for tabela in ('movies', 'series'):
+            for nome in gatilhos_sequencia(tabela):
+                conexao.execute(text(f'DROP TRIGGER {nome}'))
+        conexao.execute(text('DELETE FROM sequencia_alteracoes'))
+    salvar_catalogo_em_lote(catalogo(('Filme A', 1994, 9.3), ('Filme B', 2008, 8.0)), banco)
+    assert set(sequencias(banco).values()) == {None}
+
+    assert criar_sequencia_alteracoes(banco) is True
+    assert sorted(sequencias(banco).values()) == [1, 2]
+    salvar_catalogo_em_lote(catalogo(('Filme C', 2010, 7.5)), banco)
+    assert sequencias(banco)['Filme C'] == 3
+    # Com os gatilhos já criados, nada é refeito
+    assert criar_sequencia_alteracoes(banco) is False
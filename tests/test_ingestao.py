@@ -0,0 +1,77 @@
+"""
+Confere a carga dos arquivos de dados do IMDb (ingestion.ingerir_datasets)
+com títulos homônimos: vale sempre o primeiro lido, qualquer que seja o
+tamanho do lote.
+
+Execução (na pasta raiz do projeto):
+    python -m pytest -q tests/test_ingestao.py
+"""
+import gzip
+
+import pytest
+from sqlalchemy import text
+
+from src.database import criar_engine, criar_tabelas, descartar_engines
+from src.ingestion import ingerir_datasets
+
+# (tconst, titleType, primaryTitle, startYear, nota): 'Duplo' e 'Série'
+# repetidos em posições que caem em lotes diferentes conforme o tamanho
+TITULOS = [
+    ('tt0000001', 'movie', 'Duplo', '1990', '7.1'),
+    ('tt0000002', 'movie', 'Filme A', '1991', '8.0'),
+    ('tt0000003', 'tvSeries', 'Série', '2001', None),
+    ('tt0000004', 'movie', 'Filme B', '1992', '6.5'),
+    ('tt0000005', 'movie', 'Duplo', '2015', '9.2'),
+    ('tt0000006', 'tvMiniSeries', 'Série', '2019', None),
+    ('tt0000007', 'movie', 'Filme C', '1993', None),
+    ('tt0000008', 'movie', 'Duplo', '2020', '5.0'),
+]
+
+
+@pytest.fixture
+def datasets(tmp_path):
+    caminho_basics = tmp_path / 'title.basics.tsv.gz'
+    caminho_ratings = tmp_path / 'title.ratings.tsv.gz'
+    with gzip.open(caminho_basics, 'wt', encoding='utf-8') as basics, \
+            gzip.open(caminho_ratings, 'wt', encoding='utf-8') as ratings:
+        basics.write('tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\tstartYear\t'
+                     'endYear\truntimeMinutes\tgenres\n')
+        ratings.write('tconst\taverageRating\tnumVotes\n')
+        for tconst, tipo, titulo, ano, nota in TITULOS:
+            basics.write(f'{tconst}\t{tipo}\t{titulo}\t{titulo}\t0\t{ano}\t\\N\t90\tDrama\n')
+            if nota is not None:
+                ratings.write(f'{tconst}\t{nota}\t1000\n')
+    yield str(caminho_basics), str(caminho_ratings)
+    descartar_engines()
+
+
+def carregar(caminho_db, datasets, tamanho_lote, atualizar = True):
+    engine = criar_engine(f'sqlite:///{caminho_db}')
+    criar_tabelas(engine)
+    contagem = ingerir_datasets(engine, *datasets, tamanho_lote=tamanho_lote,
+                                atualizar=atualizar, tamanho_fila=0)
+    with engine.connect() as conexao:
+        linhas = [
+            conexao.execute(text(f'SELECT title, year, imdb_id FROM {tabela} ORDER BY title')).all()
+            for tabela in ('movies', 'series')
+        ]
+    return contagem, linhas
+
+
+@pytest.mark.parametrize('tamanho_lote', [1, 2, 3, 1000])
+def test_homonimos_primeiro_lido(tmp_path, datasets, tamanho_lote):
+    contagem, (movies, series) = carregar(tmp_path / 'carga.db', datasets, tamanho_lote)
+    assert ('Duplo', 1990, 'tt0000001') in movies
+    assert series == [('Série', 2001, 'tt0000003')]
+    assert contagem['inseridos'] == 5
+    assert contagem['ignorados'] == 3
+
+
+def test_nova_carga_atualiza_pelo_primeiro_lido(tmp_path, datasets):
+    # Uma segunda carga no mesmo banco continua com o primeiro homônimo
+    caminho_db = tmp_path / 'carga.db'
+    carregar(caminho_db, datasets, 2)
+    contagem, (movies, _) = carregar(caminho_db, datasets, 2)
+    assert ('Duplo', 1990, 'tt0000001') in movies
+    assert contagem['inseridos'] == 0
+    assert contagem['ignorados'] == 8
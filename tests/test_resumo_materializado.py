@@ -0,0 +1,167 @@
+"""
+Confere o resumo do Ex. 10 lido de 'movies_resumo' (mantida pelos
+gatilhos de database.GATILHOS_RESUMO_MOVIES) com o calculado com Pandas
+a partir da tabela 'movies' inteira (com e sem os tipos compactos),
+depois de cada tipo de gravação.
+
+Execução (na pasta raiz do projeto):
+    python -m pytest -q tests/test_resumo_materializado.py
+"""
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from src.analysis import (
+    TIPOS_COMPACTOS,
+    adicionar_categoria,
+    carregar_dataframe_movies,
+    compactar_tipos,
+    resumo_categoria_ano,
+    resumo_categoria_ano_materializado,
+)
+from src.database import (
+    GATILHOS_RESUMO_MOVIES,
+    criar_engine,
+    criar_resumo_movies,
+    criar_tabelas,
+    descartar_engines,
+    salvar_catalogo_em_lote,
+)
+from src.models import Catalog
+
+FAIXAS_PERSONALIZADAS = {'limites': [5.0, 8.5], 'rotulos': ['Fraco', 'Regular', 'Ótimo']}
+
+
+@pytest.fixture
+def banco(tmp_path):
+    db_url = f'sqlite:///{tmp_path / "resumo.db"}'
+    engine = criar_engine(db_url)
+    criar_tabelas(engine)
+    yield db_url, engine
+    descartar_engines()
+
+
+def catalogo(*filmes):
+    catalog = Catalog()
+    for titulo, ano, nota in filmes:
+        catalog.adicionar_movie(titulo, ano, nota)
+    return catalog
+
+
+def conferir(db_url, faixas = None):
+    materializado = resumo_categoria_ano_materializado(db_url, faixas)
+    df_movies = carregar_dataframe_movies(db_url)
+    # Com os tipos compactos e com o DataFrame como lido do banco (notas
+    # em float64); só o ano é convertido, para as colunas do resumo saírem
+    # com o mesmo tipo
+    for df in (compactar_tipos(df_movies), df_movies.astype({'year': TIPOS_COMPACTOS['year']})):
+        calculado = resumo_categoria_ano(adicionar_categoria(df, faixas))
+        pd.testing.assert_frame_equal(materializado, calculado)
+    return materializado
+
+
+def contagens_do_resumo(engine):
+    with engine.connect() as conexao:
+        return conexao.execute(text(
+            'SELECT year, rating, quantidade FROM movies_resumo ORDER BY year, rating'
+        )).all()
+
+
+FILMES = [
+    ('Filme A', 1994, 9.3),
+    ('Filme B', 1994, 8.0),
+    ('Filme C', 2008, 9.0),
+    ('Filme D', 2008, 6.9),
+    ('Filme E', 2010, None),
+    ('Filme F', None, 7.5),
+    ('Filme G', 2010, 8.0),
+]
+
+
+def test_insercao(banco):
+    db_url, engine = banco
+    salvar_catalogo_em_lote(catalogo(*FILMES), engine)
+    resumo = conferir(db_url)
+    # Filmes sem ano ficam fora do resumo
+    assert int(resumo.to_numpy().sum()) == 6
+
+
+def test_atualizacao_com_on_conflict(banco):
+    db_url, engine = banco
+    salvar_catalogo_em_lote(catalogo(*FILMES), engine)
+    # Mesmos títulos com outro ano e outra nota: ON CONFLICT DO UPDATE
+    contagem = salvar_catalogo_em_lote(catalogo(
+        ('Filme A', 1995, 9.3),
+        ('Filme B', 1994, 9.5),
+        ('Filme D', 2009, 7.2),
+        ('Filme F', 2001, 7.5),
+    ), engine, atualizar=True)
+    assert contagem['atualizados'] == 4
+    conferir(db_url)
+
+
+def test_remocao(banco):
+    db_url, engine = banco
+    salvar_catalogo_em_lote(catalogo(*FILMES), engine)
+    with engine.begin() as conexao:
+        conexao.execute(text("DELETE FROM movies WHERE title IN ('Filme A', 'Filme E', 'Filme F')"))
+    conferir(db_url)
+    # Contagens que chegam a zero saem da tabela
+    assert all(quantidade > 0 for _, _, quantidade in contagens_do_resumo(engine))
+
+
+def test_ano_e_nota_nulos(banco):
+    db_url, engine = banco
+    salvar_catalogo_em_lote(catalogo(*FILMES), engine)
+    with engine.begin() as conexao:
+        conexao.execute(text("UPDATE movies SET rating = NULL WHERE title = 'Filme C'"))
+        conexao.execute(text("UPDATE movies SET year = NULL WHERE title = 'Filme B'"))
+        conexao.execute(text("UPDATE movies SET year = 2020 WHERE title = 'Filme F'"))
+    conferir(db_url)
+
+
+def test_preenchimento_de_banco_existente(banco):
+    db_url, engine = banco
+    # Banco de uma versão anterior: filmes gravados sem os gatilhos
+    with engine.begin() as conexao:
+        for nome in GATILHOS_RESUMO_MOVIES:
+            conexao.execute(text(f'DROP TRIGGER {nome}'))
+    salvar_catalogo_em_lote(catalogo(*FILMES), engine)
+    with engine.begin() as conexao:
+        conexao.execute(text('DELETE FROM movies_resumo'))
+
+    assert criar_resumo_movies(engine) is True
+    conferir(db_url)
+    # Com os gatilhos já criados, nada é refeito
+    assert criar_resumo_movies(engine) is False
+
+
+def test_tabela_vazia(banco):
+    db_url, engine = banco
+    assert conferir(db_url).empty
+    salvar_catalogo_em_lote(catalogo(*FILMES), engine)
+    with engine.begin() as conexao:
+        conexao.execute(text('DELETE FROM movies'))
+    assert conferir(db_url).empty
+    assert contagens_do_resumo(engine) == []
+
+
+def test_faixas_personalizadas(banco):
+    db_url, engine = banco
+    salvar_catalogo_em_lote(catalogo(*FILMES), engine)
+    resumo = conferir(db_url, FAIXAS_PERSONALIZADAS)
+    assert set(resumo.index) <= set(FAIXAS_PERSONALIZADAS['rotulos'])
+    # Nota exatamente no limite entra na faixa de cima, como no Pandas
+    salvar_catalogo_em_lote(catalogo(('Filme H', 1994, 8.5), ('Filme I', 1994, 5.0)), engine)
+    conferir(db_url, FAIXAS_PERSONALIZADAS)
+
+
+@pytest.mark.parametrize('faixas', [None, FAIXAS_PERSONALIZADAS])
+def test_notas_nos_limites(banco, faixas):
+    db_url, engine = banco
+    # Notas exatamente nos limites das faixas padrão e das personalizadas
+    salvar_catalogo_em_lote(catalogo(*[
+        (f'Limite {nota}', 2000 + i, nota) for i, nota in enumerate([5.0, 7.0, 8.0, 8.5, 9.0])
+    ]), engine)
+    resumo = conferir(db_url, faixas)
+    assert int(resumo.to_numpy().sum()) == 5